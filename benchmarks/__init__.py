@@ -0,0 +1,5 @@
+"""Benchmarks for the JSON Canvas library and MCP server.
+
+Run individual benchmarks as modules from the repository root, e.g.
+``python -m benchmarks.startup``. They are not collected by pytest.
+"""
@@ -0,0 +1,198 @@
+"""Deterministic synthetic canvases for benchmarks.
+
+Each generator takes a target element count (nodes plus edges) and a seed
+and returns the canvas as a JSON Canvas dictionary — the form tools receive
+and files store — so building it costs no more than the dict literals and
+sizes into the millions of elements stay practical. The same arguments always
+produce the same canvas.
+
+Shapes:
+
+- ``grid``: a lattice of titled notes, each linked to its right and lower
+  neighbour (about two edges per node), with a few coloured nodes.
+- ``chain``: one long path, ``n0 -> n1 -> ... ``, the deepest possible
+  traversal for the Markdown exporter.
+- ``hub``: a handful of hub nodes that every other node links to several
+  times, giving very high fan-in.
+- ``groups``: large group nodes each enclosing hundreds of notes, with few
+  edges.
+- ``markdown``: notes carrying long Markdown bodies (headings, lists, links,
+  code), linked in short runs; stresses text handling over structure.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Any, Callable
+
+Generator = Callable[[int, int], dict[str, Any]]
+
+_COLORS = [None, None, None, "1", "2", "4", "6", "#336699"]
+
+
+def _text_node(
+    i: int, x: int, y: int, text: str, color: str | None = None
+) -> dict[str, Any]:
+    node = {
+        "id": f"n{i}",
+        "type": "text",
+        "x": x,
+        "y": y,
+        "width": 240,
+        "height": 120,
+        "text": text,
+    }
+    if color is not None:
+        node["color"] = color
+    return node
+
+
+def _edge(j: int, a: int, b: int, **extra: Any) -> dict[str, Any]:
+    return {"id": f"e{j}", "fromNode": f"n{a}", "toNode": f"n{b}", **extra}
+
+
+def grid(elements: int, seed: int = 0) -> dict[str, Any]:
+    """A square lattice; each node links right and down."""
+    rng = random.Random(seed)
+    count = max(1, elements // 3)
+    columns = max(1, int(count**0.5))
+    nodes = [
+        _text_node(
+            i,
+            (i % columns) * 320,
+            (i // columns) * 220,
+            f"# Note {i}\n\nlorem ipsum dolor sit amet",
+            rng.choice(_COLORS),
+        )
+        for i in range(count)
+    ]
+    edges = []
+    for i in range(count):
+        if (i + 1) % columns and i + 1 < count:
+            edges.append(_edge(len(edges), i, i + 1, fromSide="right", toSide="left"))
+        if i + columns < count:
+            edges.append(_edge(len(edges), i, i + columns, fromSide="bottom"))
+    return {"nodes": nodes, "edges": edges}
+
+
+def chain(elements: int, seed: int = 0) -> dict[str, Any]:
+    """A single path through every node, snaking across rows."""
+    rng = random.Random(seed)
+    count = max(1, (elements + 1) // 2)
+    nodes = [
+        _text_node(i, (i % 100) * 300, (i // 100) * 200, f"Step {i}")
+        for i in range(count)
+    ]
+    edges = [
+        _edge(i, i, i + 1, label=f"then {i}" if rng.random() < 0.1 else None)
+        for i in range(count - 1)
+    ]
+    for edge in edges:
+        if edge["label"] is None:
+            del edge["label"]
+    return {"nodes": nodes, "edges": edges}
+
+
+def hub(elements: int, seed: int = 0) -> dict[str, Any]:
+    """Ten hubs; every other node links to three of them."""
+    rng = random.Random(seed)
+    count = max(11, elements // 4)
+    hubs = 10
+    nodes = [
+        _text_node(i, (i % 200) * 300, (i // 200) * 200, f"Item {i}")
+        for i in range(count)
+    ]
+    for i in range(hubs):
+        nodes[i].update(text=f"# Hub {i}", width=600, height=400, color="1")
+    edges = [
+        _edge(j, i, target, toEnd="arrow")
+        for j, (i, target) in enumerate(
+            (i, rng.randrange(hubs)) for i in range(hubs, count) for _ in range(3)
+        )
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+def groups(elements: int, seed: int = 0) -> dict[str, Any]:
+    """Groups of 500 notes each, laid out in blocks, with sparse links."""
+    rng = random.Random(seed)
+    count = max(2, int(elements / 1.1))
+    per_group = 500
+    nodes: list[dict[str, Any]] = []
+    i = 0
+    while i < count:
+        block = len(nodes) // (per_group + 1)
+        ox, oy = (block % 10) * 8000, (block // 10) * 6000
+        nodes.append(
+            {
+                "id": f"n{i}",
+                "type": "group",
+                "x": ox,
+                "y": oy,
+                "width": 7600,
+                "height": 5600,
+                "label": f"Group {block}",
+            }
+        )
+        i += 1
+        for k in range(min(per_group, count - i)):
+            nodes.append(
+                _text_node(
+                    i, ox + 40 + (k % 25) * 300, oy + 60 + (k // 25) * 260, f"Card {i}"
+                )
+            )
+            i += 1
+    edges = [
+        _edge(j, a, rng.randrange(count))
+        for j, a in enumerate(rng.randrange(count) for _ in range(count // 10))
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+_MARKDOWN_BODY = """## Section {i}
+
+Some **bold** and _italic_ prose about item {i}, with a [link](https://example.com/{i})
+and `inline code`.
+
+- first point for {i}
+- second point, a little longer than the first one
+  - a nested detail
+- third point
+
+```python
+def item_{i}():
+    return {i}
+```
+
+> A quote to close the note, long enough to wrap in most viewers.
+"""
+
+
+def markdown(elements: int, seed: int = 0) -> dict[str, Any]:
+    """Notes with ~500-character Markdown bodies, linked in runs of ten."""
+    rng = random.Random(seed)
+    count = max(1, int(elements / 1.9))
+    nodes = [
+        _text_node(
+            i,
+            (i % 50) * 500,
+            (i // 50) * 400,
+            f"# Note {i}\n\n" + _MARKDOWN_BODY.format(i=i),
+            rng.choice(_COLORS),
+        )
+        for i in range(count)
+    ]
+    edges = [
+        _edge(j, i, i + 1)
+        for j, i in enumerate(k for k in range(count - 1) if (k + 1) % 10)
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+GENERATORS: dict[str, Generator] = {
+    "grid": grid,
+    "chain": chain,
+    "hub": hub,
+    "groups": groups,
+    "markdown": markdown,
+}
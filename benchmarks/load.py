@@ -0,0 +1,364 @@
+"""End-to-end load test over the stdio and Streamable HTTP transports.
+
+Micro-benchmarks time the library; this drives the real server through an MCP
+client, so MCP framing, tool-argument and output validation, and transport
+cost are all included. ``--clients`` concurrent clients each create a canvas
+of their own and then issue ``--requests`` tool calls drawn from a weighted
+mix of create, read, edit, search and export.
+
+Over stdio every client spawns its own server process (as stdio hosts do);
+over HTTP a single server on a free localhost port serves every client, one
+session each. Everything runs offline against a temporary ``OUTPUT_PATH``.
+
+Reports throughput and p50/p95/p99 latency per transport, overall and per
+operation; the warm-up create is not counted.
+
+Usage::
+
+    python -m benchmarks.load [--transport stdio http] [--clients 8]
+        [--requests 50] [--mix default|read|write] [--nodes 50] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+# Relative weights of each operation in a client's request stream.
+MIXES: dict[str, dict[str, int]] = {
+    "default": {"create": 1, "read": 4, "edit": 3, "search": 2, "export": 2},
+    "read": {"create": 0, "read": 6, "edit": 1, "search": 3, "export": 2},
+    "write": {"create": 2, "read": 1, "edit": 6, "search": 1, "export": 0},
+}
+
+
+def _nodes(count: int, tag: str) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": f"{tag}-n{i}",
+            "type": "text",
+            "x": (i % 10) * 300,
+            "y": (i // 10) * 200,
+            "width": 240,
+            "height": 120,
+            "text": f"# {tag} note {i}\n\nload test body",
+        }
+        for i in range(count)
+    ]
+
+
+def _edges(count: int, tag: str) -> list[dict[str, Any]]:
+    return [
+        {"id": f"{tag}-e{i}", "fromNode": f"{tag}-n{i}", "toNode": f"{tag}-n{i + 1}"}
+        for i in range(count - 1)
+    ]
+
+
+class Client:
+    """One session issuing a seeded, weighted stream of tool calls."""
+
+    def __init__(self, index: int, session: ClientSession, nodes: int) -> None:
+        self.tag = f"c{index}"
+        self.session = session
+        self.nodes = nodes
+        self.rng = random.Random(index)
+        self.filename = ""
+        self.finished = 0.0
+        self.samples: list[tuple[str, float, bool]] = []  # (op, seconds, ok)
+
+    async def _call(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        result = await self.session.call_tool(name, arguments)
+        if result.isError:
+            raise RuntimeError(f"{name} failed: {result.content}")
+        return result.structuredContent or {}
+
+    async def setup(self) -> None:
+        """Create the canvas this client reads and edits."""
+        result = await self._call(
+            "create_canvas",
+            {
+                "filename": f"load-{self.tag}",
+                "nodes": _nodes(self.nodes, self.tag),
+                "edges": _edges(self.nodes, self.tag),
+            },
+        )
+        self.filename = os.path.basename(result["path"])
+
+    async def step(self, op: str) -> None:
+        """Issue one ``op`` and record its latency."""
+        start = time.perf_counter()
+        ok = True
+        try:
+            await self._run(op)
+        except Exception:
+            ok = False
+        self.samples.append((op, time.perf_counter() - start, ok))
+
+    async def _run(self, op: str) -> None:
+        if op == "create":
+            await self._call(
+                "create_canvas",
+                {
+                    "filename": f"load-{self.tag}-{len(self.samples)}",
+                    "nodes": _nodes(self.nodes, self.tag),
+                    "edges": _edges(self.nodes, self.tag),
+                },
+            )
+        elif op == "read":
+            await self._call("read_canvas", {"filename": self.filename})
+        elif op == "edit":
+            node = f"{self.tag}-n{self.rng.randrange(self.nodes)}"
+            await self._call(
+                "edit_canvas",
+                {
+                    "filename": self.filename,
+                    "update_nodes": [{"id": node, "x": self.rng.randrange(3000)}],
+                    "response": "delta",
+                },
+            )
+        elif op == "search":
+            await self._call(
+                "search_canvases",
+                {"query": f"note {self.rng.randrange(self.nodes)}"},
+            )
+        elif op == "export":
+            await self._call(
+                "export_canvas",
+                {
+                    "filename": self.filename,
+                    "format": self.rng.choice(["svg", "markdown"]),
+                },
+            )
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+
+
+async def _drive(client: Client, requests: int, mix: dict[str, int]) -> None:
+    ops = [op for op, weight in mix.items() if weight]
+    weights = [mix[op] for op in ops]
+    for op in client.rng.choices(ops, weights, k=requests):
+        await client.step(op)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def _http_server(env: dict[str, str]) -> AsyncIterator[str]:
+    """Start a Streamable HTTP server; yield its MCP endpoint URL."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "jsoncanvas",
+            "--transport",
+            "streamable-http",
+            "--port",
+            str(port),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"HTTP server exited with {proc.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("HTTP server did not start") from None
+                await asyncio.sleep(0.05)
+        yield f"http://127.0.0.1:{port}/mcp"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+@asynccontextmanager
+async def _stdio_session(env: dict[str, str]) -> AsyncIterator[ClientSession]:
+    params = StdioServerParameters(
+        command=sys.executable, args=["-m", "jsoncanvas"], env=env
+    )
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+
+
+@asynccontextmanager
+async def _http_session(url: str) -> AsyncIterator[ClientSession]:
+    async with streamable_http_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
+
+
+async def _run_client(
+    index: int, connect: Any, args: argparse.Namespace, start: _StartLine
+) -> Client:
+    async with connect() as session:
+        client = Client(index, session, args.nodes)
+        await client.setup()
+        await start.arrive()
+        await _drive(client, args.requests, MIXES[args.mix])
+        client.finished = time.perf_counter()
+        return client
+
+
+class _StartLine:
+    """Holds clients until all are connected so the timed phase overlaps fully."""
+
+    def __init__(self, clients: int) -> None:
+        self.waiting = clients
+        self.ready = asyncio.Event()
+        self.go = asyncio.Event()
+
+    async def arrive(self) -> None:
+        self.waiting -= 1
+        if self.waiting == 0:
+            self.ready.set()
+        await self.go.wait()
+
+
+async def run_transport(transport: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Run the load against one transport and return its summary."""
+
+    async def timed(connect: Any) -> tuple[list[Client], float]:
+        start = _StartLine(args.clients)
+        tasks = [
+            asyncio.create_task(_run_client(i, connect, args, start))
+            for i in range(args.clients)
+        ]
+        ready = asyncio.create_task(start.ready.wait())
+        await asyncio.wait([ready, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        if not ready.done():  # a client failed to connect or set up
+            ready.cancel()
+            await asyncio.gather(*tasks)
+        began = time.perf_counter()
+        start.go.set()
+        clients = await asyncio.gather(*tasks)
+        return clients, max(client.finished for client in clients) - began
+
+    with tempfile.TemporaryDirectory() as output_path:
+        env = {**os.environ, "OUTPUT_PATH": output_path}
+        if transport == "stdio":
+            clients, elapsed = await timed(lambda: _stdio_session(env))
+        else:
+            async with _http_server(env) as url:
+                clients, elapsed = await timed(lambda: _http_session(url))
+    samples = [sample for client in clients for sample in client.samples]
+    return summarise(transport, samples, elapsed, args.clients)
+
+
+def _latency(seconds: list[float]) -> dict[str, float]:
+    ms = sorted(s * 1000 for s in seconds)
+    if len(ms) == 1:
+        cuts = ms * 99
+    else:
+        cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {f"p{p}": round(cuts[p - 1], 2) for p in (50, 95, 99)}
+
+
+def summarise(
+    transport: str,
+    samples: list[tuple[str, float, bool]],
+    elapsed: float,
+    clients: int,
+) -> dict[str, Any]:
+    """Aggregate ``(op, seconds, ok)`` samples into throughput and percentiles."""
+    by_op: dict[str, list[float]] = {}
+    for op, seconds, _ in samples:
+        by_op.setdefault(op, []).append(seconds)
+    return {
+        "transport": transport,
+        "clients": clients,
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": _latency([s for _, s, _ in samples]) if samples else {},
+        "operations": {
+            op: {"requests": len(times), "latency_ms": _latency(times)}
+            for op, times in sorted(by_op.items())
+        },
+    }
+
+
+def _print_summary(summary: dict[str, Any]) -> None:
+    latency = summary["latency_ms"]
+    print(
+        f"{summary['transport']}: {summary['requests']} requests from "
+        f"{summary['clients']} clients in {summary['seconds']:.2f}s -> "
+        f"{summary['throughput_rps']} req/s, {summary['errors']} errors"
+    )
+    print(
+        f"  {'all':<8} p50 {latency['p50']:>8.2f}  p95 {latency['p95']:>8.2f}  "
+        f"p99 {latency['p99']:>8.2f} ms"
+    )
+    for op, row in summary["operations"].items():
+        ms = row["latency_ms"]
+        print(
+            f"  {op:<8} p50 {ms['p50']:>8.2f}  p95 {ms['p95']:>8.2f}  "
+            f"p99 {ms['p99']:>8.2f} ms  ({row['requests']} calls)"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--transport",
+        nargs="+",
+        choices=["stdio", "http"],
+        default=["stdio", "http"],
+        help="Transports to load (default: both).",
+    )
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients.")
+    parser.add_argument(
+        "--requests", type=int, default=50, help="Timed tool calls per client."
+    )
+    parser.add_argument(
+        "--mix", choices=sorted(MIXES), default="default", help="Operation weights."
+    )
+    parser.add_argument(
+        "--nodes", type=int, default=50, help="Nodes in each client's canvas."
+    )
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    summaries = []
+    for transport in args.transport:
+        summary = asyncio.run(run_transport(transport, args))
+        _print_summary(summary)
+        summaries.append(summary)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"mix": MIXES[args.mix], "results": summaries}, fh, indent=2)
+    return 1 if any(summary["errors"] for summary in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
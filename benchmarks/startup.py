@@ -0,0 +1,134 @@
+"""Cold-start benchmark for the stdio server.
+
+Spawn-per-session stdio clients launch a fresh ``mcp-server-jsoncanvas``
+process for every session, so start-up latency is paid on every connection.
+This measures the wall time from ``exec`` to the ``initialize`` response and
+reports the slowest imports from ``python -X importtime``.
+
+Usage::
+
+    python -m benchmarks.startup [--runs 5] [--max-ms 1500] [--json out.json]
+
+Exits non-zero when the median time-to-initialize exceeds ``--max-ms``, so it
+can gate CI against start-up regressions.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-11-25",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "0"},
+    },
+}
+
+
+def time_to_initialize(output_path: str) -> float:
+    """Return seconds from process spawn to the ``initialize`` response."""
+    env = {**os.environ, "OUTPUT_PATH": output_path}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "jsoncanvas"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+    )
+    try:
+        assert proc.stdin is not None and proc.stdout is not None
+        proc.stdin.write(json.dumps(_INITIALIZE) + "\n")
+        proc.stdin.flush()
+        line = proc.stdout.readline()
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+    response = json.loads(line)
+    if response.get("id") != 1 or "result" not in response:
+        raise RuntimeError(f"Unexpected initialize response: {line!r}")
+    return elapsed
+
+
+def import_times(module: str = "jsoncanvas.server", top: int = 15) -> list[dict]:
+    """Return the ``top`` slowest imports (cumulative µs) for ``module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented name>"
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = (
+            field.strip() for field in line[len("import time:") :].split("|")
+        )
+        if not self_us.isdigit():
+            continue  # header row
+        rows.append(
+            {
+                "module": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    rows.sort(key=lambda row: row["cumulative_us"], reverse=True)
+    return rows[:top]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to time.")
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=float(os.environ.get("STARTUP_MAX_MS", "1500")),
+        help="Fail when the median time-to-initialize exceeds this (ms).",
+    )
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as output_path:
+        samples = [time_to_initialize(output_path) * 1000 for _ in range(args.runs)]
+    median = statistics.median(samples)
+    result = {
+        "runs": args.runs,
+        "initialize_ms": {
+            "median": round(median, 1),
+            "min": round(min(samples), 1),
+            "max": round(max(samples), 1),
+        },
+        "max_ms": args.max_ms,
+        "slowest_imports": import_times(),
+    }
+
+    print(f"time to initialize: median {median:.1f} ms over {args.runs} runs")
+    for row in result["slowest_imports"]:
+        print(f"  {row['cumulative_us'] / 1000:8.1f} ms  {row['module']}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+    if median > args.max_ms:
+        print(f"FAIL: median {median:.1f} ms > {args.max_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Server-side cost of canvas tool results: default FastMCP path vs prebuilt.
+
+FastMCP's default handling of a returned model validates and copies it,
+dumps it for the structured content, serialises it again for the text
+fallback, and checks the structured content against the output schema.
+``read_canvas``, ``create_canvas`` and ``edit_canvas`` build their protocol
+result directly instead. This times one ``tools/call`` through the server's
+request handler plus the JSON-RPC response encoding the transport performs,
+with each path, on grid canvases of increasing size.
+
+Usage::
+
+    python -m benchmarks.structured_output [--sizes 1000 10000 50000]
+        [--ops read edit] [--runs 5] [--json out.json]
+
+``--ops create`` is available but slow at large sizes (building a canvas from
+arguments is quadratic in its node count).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from mcp import types
+from mcp.server.fastmcp.utilities.func_metadata import FuncMetadata
+
+from benchmarks.generators import grid
+
+_TOOLS = {"read": "read_canvas", "edit": "edit_canvas", "create": "create_canvas"}
+
+
+@contextmanager
+def _default_output(tool_names: list[str]) -> Iterator[None]:
+    """Temporarily restore FastMCP's default result handling for the tools."""
+    from jsoncanvas.server import mcp
+
+    saved = []
+    for name in tool_names:
+        tool = mcp._tool_manager.get_tool(name)
+        saved.append((tool, tool.fn, tool.fn_metadata))
+        tool.fn = tool.fn.__wrapped__
+        tool.fn_metadata = FuncMetadata.model_construct(**dict(tool.fn_metadata))
+    try:
+        yield
+    finally:
+        for tool, fn, metadata in saved:
+            tool.fn, tool.fn_metadata = fn, metadata
+
+
+async def _call(name: str, arguments: dict[str, Any]) -> int:
+    """Run one tools/call and encode its response; return the response size."""
+    from jsoncanvas.server import mcp
+
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+    request = types.CallToolRequest(
+        params=types.CallToolRequestParams(name=name, arguments=arguments)
+    )
+    response = await handler(request)
+    if response.root.isError:
+        raise RuntimeError(response.root.content[0].text)
+    message = types.JSONRPCResponse(
+        jsonrpc="2.0",
+        id=1,
+        result=response.model_dump(by_alias=True, mode="json", exclude_none=True),
+    )
+    return len(message.model_dump_json(by_alias=True, exclude_none=True))
+
+
+def _arguments(op: str, data: dict[str, Any], filename: str) -> dict[str, Any]:
+    if op == "read":
+        return {"filename": filename}
+    if op == "edit":
+        node = data["nodes"][0]
+        return {"filename": filename, "update_nodes": [{"id": node["id"], "x": 1}]}
+    return {"filename": "bench", "nodes": data["nodes"], "edges": data["edges"]}
+
+
+def _time(op: str, arguments: dict[str, Any], runs: int) -> tuple[list[float], int]:
+    samples = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        size = asyncio.run(_call(_TOOLS[op], arguments))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, size
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="Element counts (nodes + edges).",
+    )
+    parser.add_argument(
+        "--ops", nargs="+", choices=sorted(_TOOLS), default=["read", "edit"]
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Timed calls per case.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OUTPUT_PATH"] = tmp
+        os.environ["MCP_MAX_NODES"] = os.environ["MCP_MAX_EDGES"] = "0"
+        from jsoncanvas import server
+
+        filename = "bench.canvas"
+        print(
+            f"{'op':<6} {'elements':>8} {'default ms':>11} {'prebuilt ms':>12} "
+            f"{'speedup':>8} {'response MB':>12}"
+        )
+        for size in args.sizes:
+            data = grid(size)
+            (Path(tmp) / filename).write_text(json.dumps(data, indent=2))
+            for op in args.ops:
+                arguments = _arguments(op, data, filename)
+                with _default_output(list(_TOOLS.values())):
+                    default, _ = _time(op, arguments, args.runs)
+                prebuilt, response_bytes = _time(op, arguments, args.runs)
+                server._background().submit(lambda: None).result()
+                row = {
+                    "op": op,
+                    "elements": len(data["nodes"]) + len(data["edges"]),
+                    "default_ms": round(statistics.median(default), 2),
+                    "prebuilt_ms": round(statistics.median(prebuilt), 2),
+                    "response_bytes": response_bytes,
+                }
+                row["speedup"] = round(row["default_ms"] / row["prebuilt_ms"], 2)
+                rows.append(row)
+                print(
+                    f"{op:<6} {row['elements']:>8} {row['default_ms']:>11.1f} "
+                    f"{row['prebuilt_ms']:>12.1f} {row['speedup']:>7.2f}x "
+                    f"{response_bytes / 1e6:>12.1f}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"runs": args.runs, "results": rows}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
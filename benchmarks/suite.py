@@ -0,0 +1,239 @@
+"""Core operation timings across canvas shapes and sizes, with regression checks.
+
+For every generator in :mod:`benchmarks.generators` and every size, times:
+
+- ``from_dict`` / ``to_dict``: :meth:`Canvas.from_dict` and :meth:`Canvas.to_dict`
+- ``build_canvas``: the server's ``_build_canvas`` (used by ``create_canvas``)
+- ``edit_canvas``: one ``edit_canvas`` call patching 100 nodes of the stored
+  file (read, parse, edit, serialise, write)
+- ``to_svg`` / ``to_markdown``: the exporters, uncached
+- ``search_canvases``: a query matching about 1% of element IDs
+
+Each timing is the best (and median) of ``--runs`` runs. Operations whose
+linear projection from the previous size would exceed ``--budget`` seconds
+per run are skipped at larger sizes and recorded as such, so a super-linear
+operation cannot stall the suite.
+
+Results are written as JSON with ``--json``. Pass an earlier results file to
+``--compare`` to flag operations that became slower than ``--tolerance``; the
+exit status is 1 when any did, so the suite can gate CI.
+
+Usage::
+
+    python -m benchmarks.suite [--sizes 1000 10000 100000] [--generators grid chain]
+        [--ops from_dict to_svg] [--runs 3] [--json out.json]
+        [--compare baseline.json --tolerance 0.25]
+
+Sizes are element counts (nodes plus edges); ``--sizes 1000000`` runs the
+million-element tier, which needs a few GB of memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.generators import GENERATORS
+
+OPS = (
+    "from_dict",
+    "to_dict",
+    "build_canvas",
+    "edit_canvas",
+    "to_svg",
+    "to_markdown",
+    "search_canvases",
+)
+# Timings below this many milliseconds are too noisy to call a regression.
+_NOISE_FLOOR_MS = 1.0
+
+
+def _setup(data: dict[str, Any], workdir: Path) -> dict[str, Callable[[], object]]:
+    """Return a zero-argument callable per operation for one canvas."""
+    from jsoncanvas import Canvas, server
+    from jsoncanvas.export import to_markdown, to_svg
+
+    canvas = Canvas.from_dict(data)
+    name = "bench.canvas"
+    (workdir / name).write_text(json.dumps(data, indent=2))
+    nodes = data["nodes"]
+    step = max(1, len(nodes) // 100)
+    patches = [{"id": node["id"], "x": node["x"] + 1} for node in nodes[::step][:100]]
+    return {
+        "from_dict": lambda: Canvas.from_dict(data),
+        "to_dict": canvas.to_dict,
+        "build_canvas": lambda: server._build_canvas(nodes, data["edges"]),
+        "edit_canvas": lambda: server.edit_canvas(
+            name, update_nodes=patches, response="delta"
+        ),
+        "to_svg": lambda: to_svg(canvas),
+        "to_markdown": lambda: to_markdown(canvas),
+        "search_canvases": lambda: server.search_canvases("n42", filename=name),
+    }
+
+
+def _time(fn: Callable[[], object], runs: int) -> list[float]:
+    from jsoncanvas import server
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        # Drain deferred work (thumbnails) so it does not bleed into the next run.
+        server._background().submit(lambda: None).result()
+    return samples
+
+
+def run(
+    sizes: list[int],
+    generators: list[str],
+    ops: list[str],
+    runs: int = 3,
+    budget: float = 10.0,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Time ``ops`` on every generator at every size; return one row per timing."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["OUTPUT_PATH"] = tmp
+        os.environ["MCP_EXPORT_CACHE"] = "off"
+        for generator in generators:
+            last: dict[str, tuple[int, float]] = {}  # op -> (elements, best ms)
+            for size in sorted(sizes):
+                data = GENERATORS[generator](size, seed)
+                elements = len(data["nodes"]) + len(data["edges"])
+                fns = _setup(data, Path(tmp))
+                for op in ops:
+                    row: dict[str, Any] = {
+                        "generator": generator,
+                        "size": size,
+                        "elements": elements,
+                        "op": op,
+                    }
+                    rows.append(row)
+                    if op in last:
+                        prev_elements, prev_ms = last[op]
+                        projected = prev_ms * elements / max(prev_elements, 1)
+                        if projected > budget * 1000:
+                            row["skipped"] = f"projected {projected / 1000:.1f}s/run"
+                            last[op] = (elements, projected)
+                            _print_row(row)
+                            continue
+                    samples = _time(fns[op], runs)
+                    row["best_ms"] = round(min(samples), 3)
+                    row["median_ms"] = round(statistics.median(samples), 3)
+                    row["us_per_element"] = round(min(samples) * 1000 / elements, 3)
+                    last[op] = (elements, min(samples))
+                    _print_row(row)
+    return rows
+
+
+def compare(
+    rows: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float
+) -> list[dict[str, Any]]:
+    """Return the rows slower than their baseline by more than ``tolerance``."""
+    before = {
+        (r["generator"], r["size"], r["op"]): r for r in baseline if "best_ms" in r
+    }
+    regressions = []
+    for row in rows:
+        old = before.get((row["generator"], row["size"], row["op"]))
+        if old is None or "best_ms" not in row:
+            continue
+        ratio = row["best_ms"] / max(old["best_ms"], 1e-9)
+        row["baseline_ms"] = old["best_ms"]
+        row["ratio"] = round(ratio, 3)
+        slower_by = row["best_ms"] - old["best_ms"]
+        if ratio > 1 + tolerance and slower_by > _NOISE_FLOOR_MS:
+            regressions.append(row)
+    return regressions
+
+
+def _print_row(row: dict[str, Any]) -> None:
+    head = f"{row['generator']:>9} {row['elements']:>8} {row['op']:<16}"
+    if "skipped" in row:
+        print(f"{head} skipped ({row['skipped']})", flush=True)
+        return
+    print(
+        f"{head} {row['best_ms']:>11.2f} ms  {row['us_per_element']:>8.3f} us/element",
+        flush=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Element counts (nodes + edges).",
+    )
+    parser.add_argument(
+        "--generators",
+        nargs="+",
+        choices=sorted(GENERATORS),
+        default=list(GENERATORS),
+        help="Canvas shapes.",
+    )
+    parser.add_argument(
+        "--ops", nargs="+", choices=OPS, default=list(OPS), help="Operations."
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs (best of).")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=10.0,
+        help="Skip sizes projected to take longer than this many seconds per run.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown before a timing counts as a regression (0.25 = 25%%).",
+    )
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, args.generators, args.ops, args.runs, args.budget, args.seed)
+    regressions = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(rows, baseline, args.tolerance)
+        for row in regressions:
+            print(
+                f"REGRESSION {row['generator']} {row['elements']} {row['op']}: "
+                f"{row['baseline_ms']} -> {row['best_ms']} ms ({row['ratio']}x)"
+            )
+    if args.json:
+        from jsoncanvas import __version__
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "version": __version__,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "runs": args.runs,
+                "seed": args.seed,
+            },
+            "results": rows,
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Re-export cost after a small edit, with and without the SVG fragment cache.
+
+For each canvas size this exports once to warm a
+:class:`~jsoncanvas.cache.FragmentCache`, applies a single-node edit (a text
+change, then a move), re-parses the canvas as the server does, and exports
+again. It reports how many fragments were rendered (cache misses) — which stays
+constant as the canvas grows — alongside wall times for the cached re-export
+and an uncached full render.
+
+Usage::
+
+    python -m benchmarks.svg_incremental [--nodes 1000 5000 20000] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.svg_size import synthetic_canvas
+from jsoncanvas import Canvas
+from jsoncanvas.cache import FragmentCache
+from jsoncanvas.export import to_svg
+
+
+def _edited(data: dict, index: int, **changes) -> Canvas:
+    nodes = [dict(n) for n in data["nodes"]]
+    nodes[index].update(changes)
+    return Canvas.from_dict({**data, "nodes": nodes})
+
+
+def _export(canvas: Canvas, fragments: FragmentCache | None) -> tuple[float, int]:
+    """Return (ms, fragments rendered) for one export of ``canvas``."""
+    before = fragments.misses if fragments is not None else 0
+    start = time.perf_counter()
+    to_svg(canvas, fragments=fragments)
+    elapsed = (time.perf_counter() - start) * 1000
+    rendered = (fragments.misses - before) if fragments is not None else -1
+    return round(elapsed, 2), rendered
+
+
+def measure(nodes: int) -> dict:
+    """Cold, uncached and incremental export timings for one canvas size."""
+    data = synthetic_canvas(nodes).to_dict()
+    fragments = FragmentCache(max_entries=4 * nodes)
+    cold_ms, cold_rendered = _export(Canvas.from_dict(data), fragments)
+    full_ms, _ = _export(Canvas.from_dict(data), None)
+
+    # Pick a text node away from the bounds so the edits keep the offset.
+    index = next(
+        i for i in range(nodes // 2, nodes) if data["nodes"][i]["type"] == "text"
+    )
+    node = data["nodes"][index]
+    attached = sum(
+        node["id"] in (e["fromNode"], e["toNode"]) for e in data.get("edges", [])
+    )
+    text_ms, text_rendered = _export(
+        _edited(data, index, text="# Edited\n\nnew body"), fragments
+    )
+    move_ms, move_rendered = _export(
+        _edited(data, index, x=node["x"] + 10, y=node["y"] + 10), fragments
+    )
+    return {
+        "nodes": nodes,
+        "edges": len(data.get("edges", [])),
+        "cold": {"ms": cold_ms, "rendered": cold_rendered},
+        "uncached_ms": full_ms,
+        "text_edit": {"ms": text_ms, "rendered": text_rendered},
+        "move_edit": {"ms": move_ms, "rendered": move_rendered, "attached": attached},
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        nargs="+",
+        default=[1000, 5000, 20000],
+        help="Canvas sizes.",
+    )
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = [measure(n) for n in args.nodes]
+    for row in results:
+        print(
+            f"{row['nodes']:>6} nodes: uncached {row['uncached_ms']} ms; "
+            f"after text edit {row['text_edit']['ms']} ms "
+            f"({row['text_edit']['rendered']} rendered); "
+            f"after move {row['move_edit']['ms']} ms "
+            f"({row['move_edit']['rendered']} rendered, "
+            f"{row['move_edit']['attached']} attached edges)"
+        )
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
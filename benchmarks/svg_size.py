@@ -0,0 +1,139 @@
+"""SVG export size and speed: default vs ``compact=True`` (and gzip).
+
+Builds deterministic synthetic canvases, exports each in both SVG forms and
+reports document size, gzip size, export time and — when the ``png`` extra is
+installed — resvg render time, so the compact mode's byte savings can be
+weighed against any render cost.
+
+Usage::
+
+    python -m benchmarks.svg_size [--nodes 100 1000 5000] [--runs 3] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from importlib.util import find_spec
+from typing import Callable
+
+from jsoncanvas import Canvas, Edge, GroupNode, TextNode
+from jsoncanvas.export import to_svg
+
+_COLORS = [None, None, "1", "2", "4", "6", "#336699"]
+
+
+def synthetic_canvas(nodes: int, seed: int = 0) -> Canvas:
+    """A grid-ish canvas with titled text nodes, some groups, and ~1.3 edges/node."""
+    rng = random.Random(seed)
+    canvas = Canvas()
+    columns = max(1, int(nodes**0.5))
+    for i in range(nodes):
+        x = (i % columns) * 320 + rng.randint(-40, 40)
+        y = (i // columns) * 220 + rng.randint(-40, 40)
+        if i % 25 == 0:
+            canvas.add_node(
+                GroupNode(
+                    id=f"n{i}",
+                    x=x - 20,
+                    y=y - 20,
+                    width=700,
+                    height=480,
+                    label=f"Group {i}",
+                    color=rng.choice(_COLORS),
+                )
+            )
+            continue
+        canvas.add_node(
+            TextNode(
+                id=f"n{i}",
+                x=x,
+                y=y,
+                width=rng.randint(160, 260),
+                height=rng.randint(80, 160),
+                text=f"# Note {i}\n\n" + "lorem ipsum dolor sit amet " * 3,
+                color=rng.choice(_COLORS),
+            )
+        )
+    for j in range(int(nodes * 1.3)):
+        a = rng.randrange(nodes)
+        b = min(nodes - 1, a + rng.choice([1, columns, rng.randrange(nodes)]))
+        canvas.add_edge(
+            Edge(
+                id=f"e{j}",
+                from_node=f"n{a}",
+                to_node=f"n{b}",
+                label=f"rel {j}" if rng.random() < 0.3 else None,
+                color=rng.choice(_COLORS),
+            )
+        )
+    return canvas
+
+
+def _best_ms(runs: int, fn: Callable[..., object], *args, **kwargs) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+
+def measure(canvas: Canvas, runs: int = 3) -> dict:
+    """Size and timing of both SVG forms of ``canvas``."""
+    render = None
+    if find_spec("resvg_py") is not None:
+        from jsoncanvas.raster import svg_to_png
+
+        render = svg_to_png
+    result = {}
+    for name, compact in (("default", False), ("compact", True)):
+        svg = to_svg(canvas, compact=compact)
+        row = {
+            "bytes": len(svg.encode("utf-8")),
+            "gzip_bytes": len(gzip.compress(svg.encode("utf-8"), 9)),
+            "export_ms": round(_best_ms(runs, to_svg, canvas, compact=compact), 2),
+        }
+        if render is not None:
+            row["render_ms"] = round(_best_ms(runs, render, svg, 1.0), 1)
+        result[name] = row
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--nodes", type=int, nargs="+", default=[100, 1000, 5000], help="Canvas sizes."
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs (best of).")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for nodes in args.nodes:
+        row = measure(synthetic_canvas(nodes), args.runs)
+        results[str(nodes)] = row
+        default, compact = row["default"], row["compact"]
+        ratio = compact["bytes"] / default["bytes"]
+        print(
+            f"{nodes:>6} nodes: {default['bytes']:>9} -> {compact['bytes']:>9} bytes "
+            f"({ratio:.0%}), gzip {default['gzip_bytes']} -> {compact['gzip_bytes']}, "
+            f"export {default['export_ms']} -> {compact['export_ms']} ms"
+            + (
+                f", render {default['render_ms']} -> {compact['render_ms']} ms"
+                if "render_ms" in default
+                else ""
+            )
+        )
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
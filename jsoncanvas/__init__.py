@@ -6,6 +6,7 @@ from .errors import (
     DuplicateIdError,
     InvalidEdgeError,
     InvalidNodeError,
+    LimitExceededError,
     McpError,
     ReferenceError,
     ValidationError,
@@ -29,4 +30,5 @@ __all__ = [
     "InvalidEdgeError",
     "DuplicateIdError",
     "ReferenceError",
+    "LimitExceededError",
 ]
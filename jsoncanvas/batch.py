@@ -0,0 +1,239 @@
+"""Export many canvases to many formats in one pass.
+
+:func:`batch_export` renders every ``(canvas, format)`` pair, spreading the
+work over a process pool, and writes the results under a target directory
+next to a ``manifest.json`` describing each output. Two layers keep repeated
+runs cheap:
+
+- The manifest records the cache key (source content hash plus options) of
+  every output. A later run skips outputs whose key is unchanged and whose
+  file still exists, without rendering or rewriting anything.
+- An optional :class:`~jsoncanvas.cache.ExportCache` supplies documents
+  rendered earlier, e.g. by the server's ``export_canvas`` tool, which uses
+  the same keys (see :func:`export_key`).
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+from .cache import ExportCache, content_hash
+
+# Batch formats and the extension of the file each one writes.
+BATCH_FORMATS = {"markdown": ".md", "svg": ".svg", "svgz": ".svgz"}
+MANIFEST_NAME = "manifest.json"
+
+
+def export_key(canvas_hash: str, fmt: str, title: str, compact: bool = False) -> str:
+    """Return the export cache key for one canvas export.
+
+    SVGZ shares the compact SVG entry (it is compressed on the way out), and
+    only Markdown depends on the title.
+    """
+    if fmt == "markdown":
+        return ExportCache.key(canvas_hash, "markdown", title=title)
+    if compact or fmt == "svgz":
+        return ExportCache.key(canvas_hash, "svg", compact=True)
+    return ExportCache.key(canvas_hash, "svg")
+
+
+def render_exports(
+    raw: bytes, jobs: list[tuple[str, str, bool]]
+) -> list[tuple[bool, str]]:
+    """Render one canvas to several formats, parsing it once.
+
+    ``jobs`` holds ``(format, title, compact)`` triples. Returns one
+    ``(ok, document_or_error)`` pair per job; SVGZ jobs return the uncompressed
+    compact SVG. Runs in pool workers, so it must stay a top-level function.
+    """
+    from .canvas import Canvas
+    from .export import to_markdown, to_svg
+
+    try:
+        canvas = Canvas.from_dict(json.loads(raw))
+    except Exception as exc:  # reported per output, not raised across the pool
+        return [(False, f"{type(exc).__name__}: {exc}")] * len(jobs)
+    results = []
+    for fmt, title, compact in jobs:
+        try:
+            if fmt == "markdown":
+                results.append((True, to_markdown(canvas, title=title)))
+            else:
+                results.append((True, to_svg(canvas, compact or fmt == "svgz")))
+        except Exception as exc:
+            results.append((False, f"{type(exc).__name__}: {exc}"))
+    return results
+
+
+def read_manifest(target_dir: Path) -> dict[str, Any] | None:
+    """Return the manifest written by the last batch into ``target_dir``."""
+    try:
+        return json.loads((Path(target_dir) / MANIFEST_NAME).read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def batch_export(
+    sources: Iterable[Path],
+    formats: Iterable[str],
+    target_dir: Path,
+    compact: bool = False,
+    cache: ExportCache | None = None,
+    max_workers: int | None = None,
+) -> dict[str, Any]:
+    """Export each canvas in ``sources`` to each of ``formats``.
+
+    Outputs are written to ``target_dir/<stem><ext>`` and summarised in
+    ``target_dir/manifest.json``, which is also returned. Each manifest entry
+    has ``canvas``, ``format``, ``path``, ``key``, ``bytes`` and a ``status`` of
+    ``rendered``, ``cached`` (served from ``cache``), ``skipped`` (unchanged
+    since the previous manifest) or ``error`` (with an ``error`` message).
+
+    Args:
+        sources: ``.canvas`` files to export
+        formats: Any of ``markdown``, ``svg`` and ``svgz``
+        target_dir: Directory for the outputs and manifest (created if needed)
+        compact: Emit compact SVG for the ``svg`` format
+        cache: Optional export cache to read from and fill
+        max_workers: Worker processes for rendering (default: CPU count);
+            ``1`` renders in-process
+
+    Raises:
+        ValueError: If a format is not supported
+    """
+    formats = list(dict.fromkeys(formats))
+    for fmt in formats:
+        if fmt not in BATCH_FORMATS:
+            raise ValueError(f"Unsupported batch export format: {fmt}")
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    previous = {
+        (entry["canvas"], entry["format"]): entry
+        for entry in (read_manifest(target_dir) or {}).get("entries", [])
+    }
+
+    entries: list[dict[str, Any]] = []
+    # Per canvas still needing a render: (raw bytes, [(entry, title)]).
+    pending: dict[Path, tuple[bytes, list[tuple[dict[str, Any], str]]]] = {}
+    for source in sources:
+        source = Path(source)
+        try:
+            raw = source.read_bytes()
+        except OSError as exc:
+            for fmt in formats:
+                entries.append(_entry(source, fmt, None, None, "error", error=str(exc)))
+            continue
+        canvas_hash = content_hash(raw)
+        for fmt in formats:
+            out = target_dir / (source.stem + BATCH_FORMATS[fmt])
+            key = export_key(canvas_hash, fmt, source.stem, compact)
+            entry = _entry(source, fmt, out, key, "rendered")
+            entries.append(entry)
+            before = previous.get((source.name, fmt))
+            if before is not None and before.get("key") == key and out.is_file():
+                entry.update(status="skipped", bytes=out.stat().st_size)
+                continue
+            document = cache.get(key) if cache is not None else None
+            if document is not None:
+                entry["status"] = "cached"
+                _write_output(entry, out, fmt, document.decode("utf-8"))
+                continue
+            pending.setdefault(source, (raw, []))[1].append((entry, source.stem))
+
+    for source, rendered in _render_all(pending, compact, max_workers):
+        for (entry, _), (ok, document) in zip(
+            pending[source][1], rendered, strict=True
+        ):
+            if not ok:
+                entry.update(status="error", error=document, path=None)
+                continue
+            if cache is not None:
+                cache.put(entry["key"], document.encode("utf-8"))
+            _write_output(entry, Path(entry["path"]), entry["format"], document)
+
+    manifest = {
+        "target_dir": str(target_dir.resolve()),
+        "formats": formats,
+        "entries": entries,
+    }
+    _write_atomic(
+        target_dir / MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8")
+    )
+    return manifest
+
+
+def _entry(
+    source: Path,
+    fmt: str,
+    out: Path | None,
+    key: str | None,
+    status: str,
+    error: str | None = None,
+) -> dict[str, Any]:
+    entry: dict[str, Any] = {
+        "canvas": source.name,
+        "format": fmt,
+        "path": str(out.resolve()) if out is not None else None,
+        "key": key,
+        "status": status,
+        "bytes": None,
+    }
+    if error is not None:
+        entry["error"] = error
+    return entry
+
+
+def _render_all(
+    pending: dict[Path, tuple[bytes, list[tuple[dict[str, Any], str]]]],
+    compact: bool,
+    max_workers: int | None,
+) -> Iterable[tuple[Path, list[tuple[bool, str]]]]:
+    """Yield ``(source, results)`` for every pending canvas, in input order."""
+    jobs = {
+        source: (raw, [(entry["format"], title, compact) for entry, title in items])
+        for source, (raw, items) in pending.items()
+    }
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for source, (raw, formats) in jobs.items():
+            yield source, render_exports(raw, formats)
+        return
+    # forkserver/spawn rather than fork: the server process has live threads.
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {
+            source: pool.submit(render_exports, raw, formats)
+            for source, (raw, formats) in jobs.items()
+        }
+        for source, future in futures.items():
+            yield source, future.result()
+
+
+def _write_output(entry: dict[str, Any], out: Path, fmt: str, document: str) -> None:
+    data = document.encode("utf-8")
+    if fmt == "svgz":
+        data = gzip.compress(data, compresslevel=9, mtime=0)
+    _write_atomic(out, data)
+    entry["bytes"] = len(data)
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    """Write ``data`` via a temp file and rename; readers never see partial files."""
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, target)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
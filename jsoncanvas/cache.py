@@ -0,0 +1,183 @@
+"""Content-addressed caches for rendered canvas exports.
+
+Exports are pure functions of a canvas's serialised content and the export
+options, so they are cached under a key derived from a hash of the ``.canvas``
+file bytes. Any change to the file changes the hash and therefore the key, so
+entries never need explicit invalidation — stale ones simply stop being looked
+up and age out of the LRU.
+
+:class:`FragmentCache` applies the same idea one level down: it holds the
+rendered fragment of each individual element, keyed by that element's content,
+so re-rendering an edited canvas only renders the elements that changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable
+
+
+def content_hash(data: bytes | str) -> str:
+    """Return a short, stable hash of serialised canvas content.
+
+    Used both as the version token reported by the server and as the canvas
+    half of export cache keys.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class ExportCache:
+    """A two-tier (memory LRU, optional directory) cache of rendered exports.
+
+    Values are bytes. The memory tier holds up to ``max_entries`` results; the
+    optional disk tier stores one file per key under ``directory`` so results
+    survive restarts and are shared between processes. A disk hit costs one
+    ``open`` and one read, and is promoted into the memory tier.
+    """
+
+    def __init__(self, max_entries: int = 64, directory: Path | None = None) -> None:
+        """Initialize an export cache.
+
+        Args:
+            max_entries: Maximum number of results kept in memory
+            directory: Optional directory for the persistent tier
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(canvas_hash: str, fmt: str, **options: Any) -> str:
+        """Build a cache key from a canvas hash, a format, and export options.
+
+        Options are folded into a hash so arbitrary values (titles, scales)
+        yield filesystem-safe keys.
+        """
+        opts = ",".join(f"{name}={options[name]!r}" for name in sorted(options))
+        return f"{canvas_hash}-{fmt}-{content_hash(opts)}"
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached value for ``key``, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.directory is not None:
+            try:
+                value = (self.directory / key).read_bytes()
+            except OSError:
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store ``value`` under ``key`` in every tier."""
+        self._remember(key, value)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial file.
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(value)
+                os.replace(tmp, self.directory / key)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+
+    def evict(self, canvas_hash: str) -> int:
+        """Drop every entry for ``canvas_hash`` from all tiers; return the count.
+
+        Entries are never stale, but once a file's content has changed its old
+        renders are dead weight, so callers that know the previous hash can
+        release them early instead of waiting for them to age out.
+        """
+        prefix = f"{canvas_hash}-"
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+        removed = set(stale)
+        if self.directory is not None and self.directory.is_dir():
+            for path in self.directory.glob(f"{prefix}*"):
+                path.unlink(missing_ok=True)
+                removed.add(path.name)
+        return len(removed)
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the disk tier is left in place)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FragmentCache:
+    """An in-memory LRU of rendered per-element export fragments.
+
+    Keys are tuples describing everything a fragment depends on (the element's
+    content plus any document-level state such as the bounds offset), so like
+    :class:`ExportCache` entries never need explicit invalidation.
+    """
+
+    def __init__(self, max_entries: int = 50_000) -> None:
+        """Initialize a fragment cache.
+
+        Args:
+            max_entries: Maximum number of fragments kept
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        """Return the cached fragment for ``key``, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        """Store the fragment ``value`` under ``key``."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every fragment."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
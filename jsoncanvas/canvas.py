@@ -2,6 +2,7 @@
 
 from typing import Dict, List, Optional
 
+from . import tracing
 from .edges import Edge
 from .errors import DuplicateIdError, ReferenceError, ValidationError
 from .nodes import FileNode, GroupNode, LinkNode, Node, TextNode
@@ -237,10 +238,13 @@ class Canvas:
         """
         canvas_dict: Dict[str, list] = {}
 
-        if self.nodes:
-            canvas_dict["nodes"] = [node.to_dict() for node in self.nodes]
-        if self.edges:
-            canvas_dict["edges"] = [edge.to_dict() for edge in self.edges]
+        with tracing.span(
+            "canvas.to_dict", nodes=len(self.nodes), edges=len(self.edges)
+        ):
+            if self.nodes:
+                canvas_dict["nodes"] = [node.to_dict() for node in self.nodes]
+            if self.edges:
+                canvas_dict["edges"] = [edge.to_dict() for edge in self.edges]
 
         return canvas_dict
 
@@ -257,8 +261,17 @@ class Canvas:
         Raises:
             ValidationError: If the dictionary is invalid
         """
-        nodes = []
-        edges = []
+        with tracing.span("canvas.from_dict") as span:
+            nodes, edges = cls._elements_from_dict(data)
+            span.set(nodes=len(nodes), edges=len(edges))
+            with tracing.span("canvas.validate", nodes=len(nodes), edges=len(edges)):
+                return cls(nodes=nodes, edges=edges)
+
+    @staticmethod
+    def _elements_from_dict(data: Dict) -> "tuple[List[Node], List[Edge]]":
+        """Build the node and edge objects of a canvas dictionary, in order."""
+        nodes: List[Node] = []
+        edges: List[Edge] = []
 
         # Parse nodes. Missing required keys surface as a friendly ValidationError
         # (rather than a bare KeyError) so callers like validate_canvas can report
@@ -335,4 +348,4 @@ class Canvas:
                     f"Edge {edge_id!r} is missing required field {exc.args[0]!r}"
                 ) from exc
 
-        return cls(nodes=nodes, edges=edges)
+        return nodes, edges
@@ -115,3 +115,23 @@ class ReferenceError(McpError):
             data: Optional reference error details
         """
         super().__init__(ErrorCode.REFERENCE_ERROR, message, data)
+
+
+class LimitExceededError(McpError):
+    """Error raised when a request or stored canvas exceeds a size limit."""
+
+    def __init__(
+        self,
+        message: str,
+        data: Optional[Any] = None,
+        code: ErrorCode = ErrorCode.INVALID_PARAMS,
+    ) -> None:
+        """Initialize limit exceeded error.
+
+        Args:
+            message: Human-readable error message
+            data: Optional details (``limit``, ``max``, ``actual``)
+            code: Error code; ``INVALID_PARAMS`` unless the whole request
+                (rather than its arguments) is rejected
+        """
+        super().__init__(code, message, data)
@@ -4,14 +4,26 @@
 standalone vector image. Both are dependency-free and operate on the typed
 ``Canvas`` model. SVG renders each node's title line only (plain SVG cannot
 render Markdown).
+
+``iter_markdown`` and ``iter_svg`` yield the same documents as a stream of
+string chunks, so large exports can be written to a file without holding the
+whole output in memory. ``to_thumbnail_svg`` draws a boxes-only preview from
+the same geometry.
+
+``to_svg(canvas, compact=True)`` renders the same image in fewer bytes: shared
+styles move into a ``<style>`` block of per-role and per-colour classes,
+coordinates are rounded to whole canvas units, and arrow markers are only
+defined for colours that use them.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 
 if TYPE_CHECKING:
+    from .cache import FragmentCache
     from .canvas import Canvas
+    from .edges import Edge
     from .nodes import Node
 
 # JSON Canvas preset colours 1-6 (Obsidian palette); hex colours pass through.
@@ -80,6 +92,26 @@ def to_markdown(canvas: Canvas, title: str = "Canvas") -> str:
     (nodes with no incoming edge), so connected flows read top to bottom; any
     remaining nodes (cycles/disconnected) follow. Edges are listed at the end.
     """
+    return "".join(iter_markdown(canvas, title=title))
+
+
+def iter_markdown(canvas: Canvas, title: str = "Canvas") -> Iterator[str]:
+    """Yield the :func:`to_markdown` document as a sequence of chunks."""
+    # Join lines with "\n" as they stream, holding back trailing newlines so the
+    # document ends with exactly one — the streaming form of ``rstrip + "\n"``.
+    held = ""
+    for i, line in enumerate(_markdown_lines(canvas, title)):
+        piece = line if i == 0 else "\n" + line
+        body = piece.rstrip("\n")
+        if body:
+            yield held + body
+            held = piece[len(body) :]
+        else:
+            held += piece
+    yield "\n"
+
+
+def _markdown_lines(canvas: Canvas, title: str) -> Iterator[str]:
     nodes_by_id = {n.id: n for n in canvas.nodes}
     children: dict[str, list[str]] = {}
     indegree = {n.id: 0 for n in canvas.nodes}
@@ -113,18 +145,19 @@ def to_markdown(canvas: Canvas, title: str = "Canvas") -> str:
     for node in canvas.nodes:  # leftovers
         visit(node.id)
 
-    lines = [f"# {title}", ""]
+    yield f"# {title}"
+    yield ""
     for node_id in order:
         node = nodes_by_id[node_id]
-        lines.append(f"## {_node_title(node)}")
+        yield f"## {_node_title(node)}"
         body = _node_body(node)
         if body:
-            lines.append("")
-            lines.append(body)
-        lines.append("")
+            yield ""
+            yield body
+        yield ""
 
     if canvas.edges:
-        lines.append("## Connections")
+        yield "## Connections"
         for edge in canvas.edges:
             frm = (
                 _node_title(nodes_by_id[edge.from_node])
@@ -137,10 +170,8 @@ def to_markdown(canvas: Canvas, title: str = "Canvas") -> str:
                 else edge.to_node
             )
             label = f" — {edge.label}" if edge.label else ""
-            lines.append(f"- {frm} → {to}{label}")
-        lines.append("")
-
-    return "\n".join(lines).rstrip("\n") + "\n"
+            yield f"- {frm} → {to}{label}"
+        yield ""
 
 
 # --------------------------------------------------------------------------- #
@@ -190,6 +221,18 @@ def _anchor(node: Node, side: str, min_x: int, min_y: int) -> tuple[float, float
     return x + node.width, cy
 
 
+def _edge_curve(
+    a: Node, b: Node, from_side: str, to_side: str, min_x: int, min_y: int
+) -> tuple[float, float, float, float, float, float, float, float]:
+    """Cubic bezier ``(ax, ay, c1x, c1y, c2x, c2y, bx, by)`` from ``a`` to ``b``."""
+    ax, ay = _anchor(a, from_side, min_x, min_y)
+    bx, by = _anchor(b, to_side, min_x, min_y)
+    k = max(40.0, ((bx - ax) ** 2 + (by - ay) ** 2) ** 0.5 * 0.4)
+    nax, nay = _normal(from_side)
+    nbx, nby = _normal(to_side)
+    return ax, ay, ax + nax * k, ay + nay * k, bx + nbx * k, by + nby * k, bx, by
+
+
 def _wrap(title: str, width: int, height: int) -> list[str]:
     """Greedy word-wrap of a title to fit a node box (rough px estimate)."""
     char_w = 7.5  # ~13px sans-serif
@@ -223,35 +266,59 @@ def _wrap(title: str, width: int, height: int) -> list[str]:
     return lines
 
 
-def to_svg(canvas: Canvas) -> str:
-    """Render a canvas as a standalone SVG string (light theme, titles only)."""
+def _bounds(nodes: list[Node], pad: int = 40) -> tuple[int, int, int, int]:
+    """Padded bounding box of ``nodes`` as ``(min_x, min_y, width, height)``."""
+    min_x = min(n.x for n in nodes) - pad
+    min_y = min(n.y for n in nodes) - pad
+    max_x = max(n.x + n.width for n in nodes) + pad
+    max_y = max(n.y + n.height for n in nodes) + pad
+    return min_x, min_y, max(1, max_x - min_x), max(1, max_y - min_y)
+
+
+def to_svg(
+    canvas: Canvas, compact: bool = False, fragments: FragmentCache | None = None
+) -> str:
+    """Render a canvas as a standalone SVG string (light theme, titles only).
+
+    With ``compact=True`` the same drawing is emitted with class-based styles
+    and integer coordinates, which is typically about 40% smaller.
+
+    Pass a :class:`~jsoncanvas.cache.FragmentCache` as ``fragments`` to reuse
+    the markup of elements rendered by earlier calls: after an edit only the
+    changed elements (and edges whose endpoints moved) are rendered again.
+    """
+    return "".join(iter_svg(canvas, compact=compact, fragments=fragments))
+
+
+def iter_svg(
+    canvas: Canvas, compact: bool = False, fragments: FragmentCache | None = None
+) -> Iterator[str]:
+    """Yield the :func:`to_svg` document one element at a time."""
+    if compact:
+        yield from _iter_compact_svg(canvas, fragments)
+        return
     if not canvas.nodes:
-        return (
+        yield (
             '<svg xmlns="http://www.w3.org/2000/svg" width="320" height="120">'
             '<text x="20" y="60" font-family="sans-serif" font-size="14" '
             'fill="#666">Empty canvas</text></svg>'
         )
+        return
 
-    pad = 40
-    min_x = min(n.x for n in canvas.nodes) - pad
-    min_y = min(n.y for n in canvas.nodes) - pad
-    max_x = max(n.x + n.width for n in canvas.nodes) + pad
-    max_y = max(n.y + n.height for n in canvas.nodes) + pad
-    w = max(1, max_x - min_x)
-    h = max(1, max_y - min_y)
+    min_x, min_y, w, h = _bounds(canvas.nodes)
     nodes_by_id = {n.id: n for n in canvas.nodes}
 
-    parts: list[str] = [
+    yield (
         f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" '
         f'viewBox="0 0 {w} {h}" font-family="-apple-system, system-ui, sans-serif">'
-    ]
-    parts.append(f'<rect width="{w}" height="{h}" fill="#ffffff"/>')
+    )
+    yield f'<rect width="{w}" height="{h}" fill="#ffffff"/>'
 
     # Arrow markers, one per distinct edge colour.
     marker_ids: dict[str, str] = {}
     marker_defs: list[str] = []
-    for edge in canvas.edges:
-        col = _color(getattr(edge, "color", None))
+    edge_colors = [_color(getattr(edge, "color", None)) for edge in canvas.edges]
+    for col in edge_colors:
         if col not in marker_ids:
             mid = f"arrow{len(marker_ids)}"
             marker_ids[col] = mid
@@ -261,72 +328,303 @@ def to_svg(canvas: Canvas) -> str:
                 f'<path d="M0,0 L10,5 L0,10 z" fill="{col}"/></marker>'
             )
     if marker_defs:
-        parts.append("<defs>" + "".join(marker_defs) + "</defs>")
+        yield "<defs>" + "".join(marker_defs) + "</defs>"
 
     # Edges (drawn under nodes).
-    for edge in canvas.edges:
+    for edge, col in zip(canvas.edges, edge_colors, strict=True):
         a = nodes_by_id.get(edge.from_node)
         b = nodes_by_id.get(edge.to_node)
         if a is None or b is None:
             continue
-        from_side = getattr(edge, "from_side", None) or _auto_side(a, b)
-        to_side = getattr(edge, "to_side", None) or _auto_side(b, a)
-        ax, ay = _anchor(a, from_side, min_x, min_y)
-        bx, by = _anchor(b, to_side, min_x, min_y)
-        k = max(40.0, ((bx - ax) ** 2 + (by - ay) ** 2) ** 0.5 * 0.4)
-        nax, nay = _normal(from_side)
-        nbx, nby = _normal(to_side)
-        c1x, c1y = ax + nax * k, ay + nay * k
-        c2x, c2y = bx + nbx * k, by + nby * k
-        col = _color(getattr(edge, "color", None))
-        marker = ""
-        if (getattr(edge, "to_end", None) or "arrow") == "arrow":
-            marker = f' marker-end="url(#{marker_ids[col]})"'
-        start_marker = ""
-        if (getattr(edge, "from_end", None) or "none") == "arrow":
-            start_marker = f' marker-start="url(#{marker_ids[col]})"'
-        parts.append(
-            f'<path d="M{ax:.1f},{ay:.1f} C{c1x:.1f},{c1y:.1f} {c2x:.1f},{c2y:.1f} '
-            f'{bx:.1f},{by:.1f}" fill="none" stroke="{col}" stroke-width="2"'
-            f"{marker}{start_marker}/>"
+        marker_id = marker_ids[col]
+        if fragments is None:
+            yield _edge_fragment(edge, a, b, min_x, min_y, marker_id)
+            continue
+        key = ("edge", min_x, min_y, marker_id, _element_key(edge), _box(a), _box(b))
+        yield _cached(
+            fragments, key, _edge_fragment, edge, a, b, min_x, min_y, marker_id
         )
-        if getattr(edge, "label", None):
-            lx, ly = (ax + bx) / 2, (ay + by) / 2
-            parts.append(
-                f'<text x="{lx:.1f}" y="{ly:.1f}" font-size="12" fill="#333" '
-                f'text-anchor="middle" paint-order="stroke" stroke="#ffffff" '
-                f'stroke-width="3">{_esc(edge.label)}</text>'
-            )
 
     # Nodes (groups first so they sit behind).
     ordered = sorted(canvas.nodes, key=lambda n: 0 if n.type == "group" else 1)
     for node in ordered:
-        x = node.x - min_x
-        y = node.y - min_y
-        stroke = _color(getattr(node, "color", None), "#c8ccd2")
+        if fragments is None:
+            yield _node_fragment(node, min_x, min_y)
+            continue
+        key = ("node", min_x, min_y, _element_key(node))
+        yield _cached(fragments, key, _node_fragment, node, min_x, min_y)
+
+    yield "</svg>"
+
+
+def _element_key(element: Node | Edge) -> tuple:
+    """Hashable snapshot of everything an element's fragment depends on."""
+    return tuple(element.to_dict().items())
+
+
+def _box(node: Node) -> tuple[int, int, int, int]:
+    return node.x, node.y, node.width, node.height
+
+
+def _cached(
+    fragments: FragmentCache, key: tuple, render: Callable[..., str], *args: Any
+) -> str:
+    """Return the fragment for ``key``, rendering and storing it on a miss."""
+    fragment = fragments.get(key)
+    if fragment is None:
+        fragment = render(*args)
+        fragments.put(key, fragment)
+    return fragment
+
+
+def _edge_fragment(
+    edge: Edge, a: Node, b: Node, min_x: int, min_y: int, marker_id: str
+) -> str:
+    from_side = getattr(edge, "from_side", None) or _auto_side(a, b)
+    to_side = getattr(edge, "to_side", None) or _auto_side(b, a)
+    ax, ay, c1x, c1y, c2x, c2y, bx, by = _edge_curve(
+        a, b, from_side, to_side, min_x, min_y
+    )
+    col = _color(getattr(edge, "color", None))
+    marker = ""
+    if (getattr(edge, "to_end", None) or "arrow") == "arrow":
+        marker = f' marker-end="url(#{marker_id})"'
+    start_marker = ""
+    if (getattr(edge, "from_end", None) or "none") == "arrow":
+        start_marker = f' marker-start="url(#{marker_id})"'
+    fragment = (
+        f'<path d="M{ax:.1f},{ay:.1f} C{c1x:.1f},{c1y:.1f} {c2x:.1f},{c2y:.1f} '
+        f'{bx:.1f},{by:.1f}" fill="none" stroke="{col}" stroke-width="2"'
+        f"{marker}{start_marker}/>"
+    )
+    if getattr(edge, "label", None):
+        lx, ly = (ax + bx) / 2, (ay + by) / 2
+        fragment += (
+            f'<text x="{lx:.1f}" y="{ly:.1f}" font-size="12" fill="#333" '
+            f'text-anchor="middle" paint-order="stroke" stroke="#ffffff" '
+            f'stroke-width="3">{_esc(edge.label)}</text>'
+        )
+    return fragment
+
+
+def _node_fragment(node: Node, min_x: int, min_y: int) -> str:
+    x = node.x - min_x
+    y = node.y - min_y
+    stroke = _color(getattr(node, "color", None), "#c8ccd2")
+    if node.type == "group":
+        fragment = (
+            f'<rect x="{x}" y="{y}" width="{node.width}" height="{node.height}" '
+            f'rx="10" fill="{stroke}" fill-opacity="0.06" stroke="{stroke}" '
+            f'stroke-width="2" stroke-dasharray="6 4"/>'
+        )
+        label = getattr(node, "label", None)
+        if label:
+            fragment += (
+                f'<text x="{x + 10}" y="{y + 20}" font-size="13" '
+                f'font-weight="600" fill="#333">{_esc(label)}</text>'
+            )
+        return fragment
+    fragment = (
+        f'<rect x="{x}" y="{y}" width="{node.width}" height="{node.height}" '
+        f'rx="8" fill="#ffffff" stroke="{stroke}" stroke-width="2"/>'
+    )
+    title_lines = _wrap(_node_title(node), node.width, node.height)
+    for i, line in enumerate(title_lines):
+        fragment += (
+            f'<text x="{x + 10}" y="{y + 24 + i * 18}" font-size="13" '
+            f'fill="#1a1a1a">{_esc(line)}</text>'
+        )
+    return fragment
+
+
+# Shared styles for compact SVG by class; per-colour ``sN``/``fN`` classes
+# are generated per document. Only rules a document uses are emitted.
+_COMPACT_STYLE = {
+    "n": "fill:#fff;stroke-width:2",
+    "g": "fill-opacity:.06;stroke-width:2;stroke-dasharray:6 4",
+    "e": "fill:none;stroke-width:2",
+    "t": "font-size:13px;fill:#1a1a1a",
+    "h": "font-size:13px;font-weight:600;fill:#333",
+    "l": "font-size:12px;fill:#333;text-anchor:middle;paint-order:stroke;"
+    "stroke:#fff;stroke-width:3",
+}
+
+
+def _iter_compact_svg(
+    canvas: Canvas, fragments: FragmentCache | None = None
+) -> Iterator[str]:
+    """Yield the ``compact=True`` form of :func:`iter_svg`."""
+    if not canvas.nodes:
+        yield from iter_svg(canvas)
+        return
+
+    min_x, min_y, w, h = _bounds(canvas.nodes)
+    nodes_by_id = {n.id: n for n in canvas.nodes}
+
+    # One pass to assign colour classes, so styles and markers can be declared
+    # up front and only for colours in use.
+    colors: dict[str, int] = {}
+    fills: set[int] = set()
+    markers: set[int] = set()
+    roles: set[str] = set()
+
+    def color_class(value: str) -> int:
+        return colors.setdefault(value, len(colors))
+
+    edges = []
+    for edge in canvas.edges:
+        a = nodes_by_id.get(edge.from_node)
+        b = nodes_by_id.get(edge.to_node)
+        if a is None or b is None:
+            continue
+        c = color_class(_color(edge.color))
+        if (edge.to_end or "arrow") == "arrow" or (edge.from_end or "none") == "arrow":
+            markers.add(c)
+            fills.add(c)
+        roles.update("el" if edge.label else "e")
+        edges.append((edge, a, b, c))
+    ordered = sorted(canvas.nodes, key=lambda n: 0 if n.type == "group" else 1)
+    for node in ordered:
+        c = color_class(_color(node.color, "#c8ccd2"))
         if node.type == "group":
-            parts.append(
-                f'<rect x="{x}" y="{y}" width="{node.width}" height="{node.height}" '
-                f'rx="10" fill="{stroke}" fill-opacity="0.06" stroke="{stroke}" '
-                f'stroke-width="2" stroke-dasharray="6 4"/>'
+            fills.add(c)
+            roles.update("gh" if getattr(node, "label", None) else "g")
+        else:
+            roles.update("nt")
+
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" '
+        f'viewBox="0 0 {w} {h}" font-family="-apple-system, system-ui, sans-serif">'
+    )
+    style = [f".{k}{{{v}}}" for k, v in _COMPACT_STYLE.items() if k in roles]
+    for value, c in colors.items():
+        # Colours land in CSS here rather than an attribute; keep the backstop
+        # by dropping anything that could end a declaration or rule.
+        value = "".join(ch for ch in value if ch == "#" or ch.isalnum())
+        style.append(f".s{c}{{stroke:{value}}}")
+        if c in fills:
+            style.append(f".f{c}{{fill:{value}}}")
+    yield f"<style>{''.join(style)}</style>"
+    yield f'<rect width="{w}" height="{h}" fill="#fff"/>'
+    if markers:
+        yield (
+            "<defs>"
+            + "".join(
+                f'<marker id="a{c}" viewBox="0 0 10 10" refX="8" refY="5" '
+                f'markerWidth="7" markerHeight="7" orient="auto-start-reverse">'
+                f'<path class="f{c}" d="M0,0L10,5L0,10z"/></marker>'
+                for c in sorted(markers)
             )
-            label = getattr(node, "label", None)
-            if label:
-                parts.append(
-                    f'<text x="{x + 10}" y="{y + 20}" font-size="13" '
-                    f'font-weight="600" fill="#333">{_esc(label)}</text>'
-                )
+            + "</defs>"
+        )
+
+    for edge, a, b, c in edges:
+        if fragments is None:
+            yield _compact_edge_fragment(edge, a, b, min_x, min_y, c)
             continue
-        parts.append(
-            f'<rect x="{x}" y="{y}" width="{node.width}" height="{node.height}" '
-            f'rx="8" fill="#ffffff" stroke="{stroke}" stroke-width="2"/>'
+        key = ("cedge", min_x, min_y, c, _element_key(edge), _box(a), _box(b))
+        yield _cached(
+            fragments, key, _compact_edge_fragment, edge, a, b, min_x, min_y, c
         )
-        title_lines = _wrap(_node_title(node), node.width, node.height)
-        for i, line in enumerate(title_lines):
-            parts.append(
-                f'<text x="{x + 10}" y="{y + 24 + i * 18}" font-size="13" '
-                f'fill="#1a1a1a">{_esc(line)}</text>'
+
+    for node in ordered:
+        c = colors[_color(node.color, "#c8ccd2")]
+        if fragments is None:
+            yield _compact_node_fragment(node, min_x, min_y, c)
+            continue
+        key = ("cnode", min_x, min_y, c, _element_key(node))
+        yield _cached(fragments, key, _compact_node_fragment, node, min_x, min_y, c)
+
+    yield "</svg>"
+
+
+def _compact_edge_fragment(
+    edge: Edge, a: Node, b: Node, min_x: int, min_y: int, c: int
+) -> str:
+    from_side = edge.from_side or _auto_side(a, b)
+    to_side = edge.to_side or _auto_side(b, a)
+    ax, ay, c1x, c1y, c2x, c2y, bx, by = (
+        round(v) for v in _edge_curve(a, b, from_side, to_side, min_x, min_y)
+    )
+    marker = ""
+    if (edge.to_end or "arrow") == "arrow":
+        marker = f' marker-end="url(#a{c})"'
+    if (edge.from_end or "none") == "arrow":
+        marker += f' marker-start="url(#a{c})"'
+    fragment = (
+        f'<path class="e s{c}" d="M{ax},{ay}C{c1x},{c1y} {c2x},{c2y} {bx},{by}"'
+        f"{marker}/>"
+    )
+    if edge.label:
+        fragment += (
+            f'<text class="l" x="{round((ax + bx) / 2)}" '
+            f'y="{round((ay + by) / 2)}">{_esc(edge.label)}</text>'
+        )
+    return fragment
+
+
+def _compact_node_fragment(node: Node, min_x: int, min_y: int, c: int) -> str:
+    x = node.x - min_x
+    y = node.y - min_y
+    if node.type == "group":
+        fragment = (
+            f'<rect class="g s{c} f{c}" x="{x}" y="{y}" width="{node.width}" '
+            f'height="{node.height}" rx="10"/>'
+        )
+        label = getattr(node, "label", None)
+        if label:
+            fragment += (
+                f'<text class="h" x="{x + 10}" y="{y + 20}">{_esc(label)}</text>'
             )
+        return fragment
+    fragment = (
+        f'<rect class="n s{c}" x="{x}" y="{y}" width="{node.width}" '
+        f'height="{node.height}" rx="8"/>'
+    )
+    for i, line in enumerate(_wrap(_node_title(node), node.width, node.height)):
+        fragment += (
+            f'<text class="t" x="{x + 10}" y="{y + 24 + i * 18}">{_esc(line)}</text>'
+        )
+    return fragment
+
+
+# --------------------------------------------------------------------------- #
+# Thumbnails
+# --------------------------------------------------------------------------- #
+def to_thumbnail_svg(canvas: Canvas, size: int = 256, min_px: float = 2.0) -> str:
+    """Render a low-detail preview of a canvas, at most ``size`` px on a side.
 
+    Uses the same geometry as :func:`to_svg` but draws node boxes only — no
+    text, edges, or markers — and culls nodes whose larger side would be
+    smaller than ``min_px`` pixels at thumbnail scale. The viewBox stays in
+    canvas coordinates, so each box costs one short ``rect``.
+    """
+    if not canvas.nodes:
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" '
+            f'height="{size // 2}"><rect width="100%" height="100%" '
+            f'fill="#ffffff"/></svg>'
+        )
+    min_x, min_y, w, h = _bounds(canvas.nodes)
+    scale = size / max(w, h)
+    tw = max(1, round(w * scale))
+    th = max(1, round(h * scale))
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{tw}" height="{th}" '
+        f'viewBox="0 0 {w} {h}">',
+        f'<rect width="{w}" height="{h}" fill="#ffffff"/>',
+    ]
+    ordered = sorted(canvas.nodes, key=lambda n: 0 if n.type == "group" else 1)
+    for node in ordered:
+        if max(node.width, node.height) * scale < min_px:
+            continue
+        stroke = _color(getattr(node, "color", None), "#c8ccd2")
+        fill = stroke if node.type == "group" else "#ffffff"
+        opacity = ' fill-opacity="0.08"' if node.type == "group" else ""
+        parts.append(
+            f'<rect x="{node.x - min_x}" y="{node.y - min_y}" '
+            f'width="{node.width}" height="{node.height}" fill="{fill}"{opacity} '
+            f'stroke="{stroke}" stroke-width="1" vector-effect="non-scaling-stroke"/>'
+        )
     parts.append("</svg>")
     return "".join(parts)
@@ -0,0 +1,310 @@
+"""Append-only edit journals that spare small edits a full canvas rewrite.
+
+With journaling on, an edit to a canvas is stored as a one-line record of
+what it changed, appended to a hidden sidecar next to the ``.canvas`` file
+(``.{name}.journal``). The cost is proportional to the edit, not the canvas.
+Reading the canvas replays the records over the file. Once a journal reaches
+``max_records`` records or ``max_bytes`` bytes, the next save compacts it:
+the full canvas is written to the ``.canvas`` file and the journal starts
+over. :meth:`CanvasJournal.compact_all` and ``python -m jsoncanvas.journal compact
+DIRECTORY`` compact every journal, so the files are complete again for
+programs that do not know about journals.
+
+A journal's first line records the content hash of the file it applies to.
+That makes every step crash-safe:
+
+- The file is written by atomic rename, and the journal restarted by atomic
+  rename afterwards. A crash in between leaves a journal whose hash no longer
+  matches the file, so it is ignored, and the file already holds its records.
+- A file edited by another program likewise invalidates the journal, and the
+  other program's edit wins.
+- A record torn by a crash mid-append has no trailing newline (or is not
+  valid JSON) and is ignored. Its save never returned, so nothing was lost,
+  and the next save rewrites the file rather than append after the torn line.
+
+Records hold whole elements as :meth:`~jsoncanvas.Canvas.to_dict` produces
+them. Replaying one replaces updated elements in place, drops removed ones and
+appends added ones, which is exactly how :class:`~jsoncanvas.Canvas` applies
+an edit, so replayed content matches a full rewrite byte for byte.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .cache import content_hash
+
+_SUFFIX = ".journal"
+
+
+def journal_path(target: Path) -> Path:
+    """Return the journal sidecar of the canvas file ``target``."""
+    return target.with_name(f".{target.name}{_SUFFIX}")
+
+
+def replace_file(target: Path, content: bytes) -> None:
+    """Replace ``target`` with ``content`` by atomic rename."""
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, target)
+
+
+def serialise(data: dict[str, Any]) -> bytes:
+    """Return the stored (indented JSON) form of a canvas dictionary."""
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def apply_record(data: dict[str, Any], record: dict[str, Any]) -> dict[str, Any]:
+    """Apply one journal record to a canvas dictionary (modified in place)."""
+    for kind in ("node", "edge"):
+        key = f"{kind}s"
+        elements = data.get(key, [])
+        removed = set(record.get(f"remove_{kind}_ids", ()))
+        updates = {e["id"]: e for e in record.get(f"update_{kind}s", ())}
+        if removed or updates:
+            elements = [
+                updates.get(e.get("id"), e)
+                for e in elements
+                if e.get("id") not in removed
+            ]
+        elements = elements + record.get(f"add_{kind}s", [])
+        if elements:
+            data[key] = elements
+        else:
+            data.pop(key, None)
+    return data
+
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@dataclass
+class _State:
+    """What the last read or save established about one canvas's journal."""
+
+    base: tuple[int, int]  # (mtime_ns, size) of the .canvas file
+    size: int  # bytes of valid journal
+    records: int
+    content: bytes | None = None  # the replayed canvas, if cached
+
+
+def _replay(base: bytes, journal: bytes) -> tuple[bytes, int, int] | None:
+    """Replay ``journal`` over ``base``.
+
+    Returns ``(content, valid journal bytes, records)``, or None if the
+    journal does not belong to ``base``.
+    """
+    header, sep, rest = journal.partition(b"\n")
+    try:
+        if not sep or json.loads(header).get("base") != content_hash(base):
+            return None
+    except (ValueError, AttributeError):
+        return None
+    size = len(header) + 1
+    records = []
+    for line in rest.split(b"\n")[:-1]:  # the last piece is b"" or a torn record
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+        size += len(line) + 1
+    if not records:
+        return base, size, 0
+    data = json.loads(base)
+    for record in records:
+        apply_record(data, record)
+    return serialise(data), size, len(records)
+
+
+class CanvasJournal:
+    """Saves canvases as journal appends, compacting into full rewrites.
+
+    Replayed canvases are cached (up to ``max_cached``) against the sizes and
+    mtimes of the file and its journal, so repeated reads and edits of a
+    journaled canvas neither re-read the file nor replay the log.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Path, bytes], None],
+        max_records: int = 100,
+        max_bytes: int = 4 << 20,
+        max_cached: int = 16,
+    ) -> None:
+        """Initialize a journal.
+
+        Args:
+            write: Atomically replaces a canvas file with the given content
+            max_records: Records after which the next save compacts
+            max_bytes: Journal size after which the next save compacts
+            max_cached: Replayed canvases kept in memory
+        """
+        self.write = write
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_cached = max_cached
+        self._states: OrderedDict[Path, _State] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, target: Path) -> bytes | None:
+        """Return the canvas ``target`` with its journal replayed.
+
+        Returns None if there is no valid journal; the file alone is then
+        the canvas.
+        """
+        path = journal_path(target)
+        base_stat = _stat(target)
+        journal_stat = _stat(path)
+        if base_stat is None or journal_stat is None:
+            return None
+        with self._lock:
+            state = self._states.get(path)
+            if (
+                state is not None
+                and state.content is not None
+                and state.base == base_stat
+                and state.size == journal_stat[1]
+            ):
+                self._states.move_to_end(path)
+                return state.content
+        try:
+            base = target.read_bytes()
+            journal = path.read_bytes()
+        except OSError:
+            return None
+        replayed = _replay(base, journal)
+        if replayed is None:
+            with self._lock:
+                self._states.pop(path, None)
+            return None
+        content, size, records = replayed
+        self._remember(path, _State(base_stat, size, records, content))
+        return content
+
+    def save(
+        self,
+        target: Path,
+        content: bytes,
+        record: dict[str, Any] | None = None,
+        previous: bytes | None = None,
+    ) -> int:
+        """Persist ``content`` as the canvas ``target``.
+
+        ``record`` is the edit that turned ``previous`` (as returned by
+        :meth:`read`) into ``content``. It is appended to the journal if the
+        journal still ends at ``previous`` and is under its limits; otherwise
+        the file is rewritten and the journal restarted. Returns the bytes
+        appended (0 for a rewrite).
+        """
+        path = journal_path(target)
+        if record is not None and previous is not None:
+            appended = self._append(target, path, content, record, previous)
+            if appended:
+                return appended
+        self.write(target, content)
+        header = json.dumps({"base": content_hash(content)}).encode("utf-8") + b"\n"
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(header)
+        os.replace(tmp, path)
+        base_stat = _stat(target)
+        if base_stat is not None:
+            self._remember(path, _State(base_stat, len(header), 0, content))
+        return 0
+
+    def compact(self, target: Path) -> bool:
+        """Fold ``target``'s journal into its file; True if there was anything."""
+        content = self.read(target)
+        with self._lock:
+            state = self._states.get(journal_path(target))
+            records = state.records if state is not None else 0
+        if content is None or not records:
+            return False
+        self.save(target, content)
+        return True
+
+    def compact_all(self) -> None:
+        """Compact the journal of every canvas saved or read through this one."""
+        with self._lock:
+            paths = [path for path, state in self._states.items() if state.records]
+        for path in paths:
+            target = path.with_name(path.name[1 : -len(_SUFFIX)])
+            try:
+                self.compact(target)
+            except OSError as exc:
+                print(f"Compacting {path.name} failed: {exc!r}", file=sys.stderr)
+
+    def _append(
+        self,
+        target: Path,
+        path: Path,
+        content: bytes,
+        record: dict[str, Any],
+        previous: bytes,
+    ) -> int:
+        with self._lock:
+            state = self._states.get(path)
+            if (
+                state is None
+                # Another save since this edit's read (or the replayed content
+                # was evicted): rewrite rather than apply the edit to the wrong
+                # content.
+                or state.content != previous
+                or state.records >= self.max_records
+                or state.size >= self.max_bytes
+                or state.base != _stat(target)
+                or (_stat(path) or (0, -1))[1] != state.size
+            ):
+                return 0
+            line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            with path.open("ab") as fh:
+                fh.write(line)
+            state.size += len(line)
+            state.records += 1
+            state.content = content
+            self._states.move_to_end(path)
+        return len(line)
+
+    def _remember(self, path: Path, state: _State) -> None:
+        with self._lock:
+            self._states[path] = state
+            self._states.move_to_end(path)
+            # Keep the bookkeeping of every journal (compact_all() needs it),
+            # but only the newest replayed contents.
+            cached = [p for p, s in self._states.items() if s.content is not None]
+            for old in cached[: max(len(cached) - self.max_cached, 0)]:
+                self._states[old].content = None
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Fold the edit journals in a directory into their canvas files."""
+    parser = argparse.ArgumentParser(
+        prog="python -m jsoncanvas.journal", description=main.__doc__
+    )
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("directory", type=Path, help="The canvas directory.")
+    args = parser.parse_args(argv)
+
+    journal = CanvasJournal(replace_file)
+    compacted = 0
+    for path in sorted(args.directory.glob(f".*.canvas{_SUFFIX}")):
+        target = path.with_name(path.name[1 : -len(_SUFFIX)])
+        compacted += journal.compact(target)
+    print(f"Compacted {compacted} journals in {args.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Size limits for requests and stored canvases.
+
+A single runaway request (say, a 600 MB node array) should be refused before
+the server builds anything from it. :class:`Limits` holds the configured
+maxima and checks each stage as early as it can be checked:
+
+- :class:`RequestBodyLimit` caps HTTP request bodies while they stream in,
+  before they are parsed; :func:`jsoncanvas.transport.stdio_server` does the
+  same for stdio messages. Other transports (in-memory sessions) have no
+  early byte limit.
+- :meth:`Limits.check_arguments` runs on a tool call's raw JSON arguments
+  before they are validated into models or canvas elements.
+- :meth:`Limits.check_file_bytes` runs on a stored canvas's size before it
+  is read, and :meth:`Limits.check_counts` on its parsed element counts
+  before nodes are built.
+
+Each check raises :class:`~jsoncanvas.errors.LimitExceededError` with
+``limit``, ``max`` and ``actual`` in its data. A limit of ``0`` disables it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Mapping
+
+from .errors import ErrorCode, LimitExceededError
+
+# Argument keys holding node or edge arrays, at any depth (batch operations
+# and validate_canvas nest them).
+_NODE_KEYS = frozenset({"nodes", "add_nodes", "update_nodes"})
+_EDGE_KEYS = frozenset({"edges", "add_edges", "update_edges"})
+_MAX_DEPTH = 4
+
+_ENV = {
+    "max_nodes": "MCP_MAX_NODES",
+    "max_edges": "MCP_MAX_EDGES",
+    "max_text_bytes": "MCP_MAX_TEXT_BYTES",
+    "max_request_bytes": "MCP_MAX_REQUEST_BYTES",
+    "max_file_bytes": "MCP_MAX_FILE_BYTES",
+}
+
+
+@dataclass(frozen=True)
+class Limits:
+    """Maximum sizes accepted by the server (``0`` means unlimited)."""
+
+    max_nodes: int = 100_000
+    max_edges: int = 200_000
+    max_text_bytes: int = 1 << 20
+    max_request_bytes: int = 64 << 20
+    max_file_bytes: int = 256 << 20
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> Limits:
+        """Build limits from ``MCP_MAX_*`` variables, defaulting the rest."""
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(_ENV[field.name], "").strip()
+            if raw:
+                values[field.name] = int(raw)
+        return cls(**values)
+
+    def _check(self, limit: str, actual: int, what: str) -> None:
+        maximum = getattr(self, limit)
+        if maximum and actual > maximum:
+            raise LimitExceededError(
+                f"{what} is {actual}, over the limit of {maximum} ({_ENV[limit]})",
+                {"limit": limit, "max": maximum, "actual": actual},
+            )
+
+    def check_file_bytes(self, size: int, name: str) -> None:
+        """Reject a stored canvas file of ``size`` bytes before reading it."""
+        self._check("max_file_bytes", size, f"Size of {name} in bytes")
+
+    def check_counts(self, nodes: int, edges: int) -> None:
+        """Reject a canvas with too many nodes or edges."""
+        self._check("max_nodes", nodes, "Node count")
+        self._check("max_edges", edges, "Edge count")
+
+    def check_text(self, node: Mapping[str, Any]) -> None:
+        """Reject a node whose ``text`` is over the per-node byte limit."""
+        text = node.get("text")
+        limit = self.max_text_bytes
+        # UTF-8 needs 1-4 bytes per character; only encode when it matters.
+        if not limit or not isinstance(text, str) or len(text) * 4 <= limit:
+            return
+        size = len(text) if len(text) > limit else len(text.encode("utf-8"))
+        self._check(
+            "max_text_bytes",
+            size,
+            f"Text of node {str(node.get('id', '?'))[:64]!r} in bytes",
+        )
+
+    def check_arguments(self, arguments: Any, _depth: int = 0) -> None:
+        """Check node and edge arrays in raw tool arguments, before validation.
+
+        Array lengths are checked before any element is looked at, so an
+        oversized array is rejected without walking it.
+        """
+        if _depth > _MAX_DEPTH:
+            return
+        if isinstance(arguments, Mapping):
+            for key, value in arguments.items():
+                if isinstance(value, list) and key in _NODE_KEYS:
+                    self._check("max_nodes", len(value), f"Length of {key!r}")
+                    for node in value:
+                        if isinstance(node, Mapping):
+                            self.check_text(node)
+                elif isinstance(value, list) and key in _EDGE_KEYS:
+                    self._check("max_edges", len(value), f"Length of {key!r}")
+                else:
+                    self.check_arguments(value, _depth + 1)
+        elif isinstance(arguments, list):
+            for item in arguments:
+                self.check_arguments(item, _depth + 1)
+
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class RequestBodyLimit:
+    """ASGI middleware answering 413 to HTTP bodies over a byte limit.
+
+    The body is counted as it streams in: a ``Content-Length`` over the limit
+    is refused before any of it is read, and a chunked body is refused as soon
+    as it passes the limit, without buffering the rest. The response is a
+    JSON-RPC error (``INVALID_REQUEST``) so MCP clients can report it.
+    """
+
+    def __init__(self, app: Any, max_bytes: Callable[[], int]) -> None:
+        """Initialize the middleware.
+
+        Args:
+            app: The ASGI application to protect
+            max_bytes: Returns the current limit (``0`` for none)
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.max_bytes()
+        if scope["type"] != "http" or not limit:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await _reject(send, limit, int(declared))
+            return
+
+        messages = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            size += len(message.get("body", b""))
+            if size > limit:
+                await _reject(send, limit, size)
+                return
+            if not message.get("more_body", False):
+                break
+
+        async def replay() -> dict[str, Any]:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+
+def request_too_large(limit: int, size: int) -> LimitExceededError:
+    """Return the error refusing a whole request message of ``size`` bytes."""
+    return LimitExceededError(
+        f"Request body exceeds {limit} bytes (MCP_MAX_REQUEST_BYTES)",
+        {"limit": "max_request_bytes", "max": limit, "actual": size},
+        code=ErrorCode.INVALID_REQUEST,
+    )
+
+
+async def _reject(send: Send, limit: int, size: int) -> None:
+    error = request_too_large(limit, size)
+    body = json.dumps({"jsonrpc": "2.0", "id": None, "error": error.to_dict()})
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body.encode("utf-8")})
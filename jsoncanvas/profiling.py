@@ -0,0 +1,322 @@
+"""Opt-in per-call profiling with cProfile and tracemalloc.
+
+Install a :class:`Profiler` with :func:`set_profiler` and wrap each unit of
+work (the server wraps every tool call) in :func:`call`::
+
+    with profiling.call("edit_canvas", arguments) as record:
+        ...
+        record.set(status="ok")
+
+Each profiled call writes two files to the profiler's directory, named
+``<time>-<pid>-<seq>-<tool>``: a ``.prof`` file of cProfile stats (readable
+with :mod:`pstats` or tools such as snakeviz) and a ``.json`` record with the
+tool name, an argument summary, the canvas size it touched (reported with
+:func:`note`), its duration, the tracemalloc peak and the largest
+allocations still held when it finished.
+
+Profiling is off until a profiler is installed; until then, and for calls
+skipped by sampling, :func:`call` returns one shared no-op object. Only one
+call is profiled at a time: cProfile and tracemalloc are per-thread and
+process-wide respectively, so a call that starts while another is being
+profiled runs unprofiled. cProfile only sees the calling thread, and on a
+busy event loop it also sees whatever other work interleaves with the call.
+
+Summarise a directory of dumps with::
+
+    python -m jsoncanvas.profiling DIR [--tool NAME] [--top 20]
+"""
+
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar, Token
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+def summarise_arguments(arguments: dict[str, Any], limit: int = 80) -> dict[str, Any]:
+    """Return ``arguments`` with containers reduced to sizes and long text cut.
+
+    Keeps dumps small and free of canvas contents while still showing what a
+    call was asked to do, e.g. ``{"filename": "a.canvas", "nodes": "list[5000]"}``.
+    """
+    summary: dict[str, Any] = {}
+    for key, value in arguments.items():
+        if isinstance(value, str):
+            summary[key] = value if len(value) <= limit else value[:limit] + "..."
+        elif isinstance(value, (list, tuple)):
+            summary[key] = f"list[{len(value)}]"
+        elif isinstance(value, dict):
+            summary[key] = f"dict[{len(value)}]"
+        else:
+            summary[key] = value
+    return summary
+
+
+class CallProfile:
+    """One profiled call: cProfile and tracemalloc around the wrapped work."""
+
+    def __init__(
+        self, profiler: Profiler, tool: str, arguments: dict[str, Any]
+    ) -> None:
+        """Initialize a profile; measuring starts when entered."""
+        self.profiler = profiler
+        self.tool = tool
+        # Imported here so servers that never profile skip loading cProfile.
+        import cProfile
+
+        self.fields: dict[str, Any] = {"arguments": summarise_arguments(arguments)}
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._baseline = 0
+        self._start = 0.0
+        self._token: Token[CallProfile | None] | None = None
+
+    def set(self, **fields: Any) -> None:
+        """Add or overwrite fields of the JSON record, e.g. the call's status."""
+        self.fields.update(fields)
+
+    def note(self, **counts: int) -> None:
+        """Add ``counts`` (such as nodes and edges) to the record's totals."""
+        for key, value in counts.items():
+            self.fields[key] = self.fields.get(key, 0) + value
+
+    def __enter__(self) -> CallProfile:
+        self._token = _current.set(self)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.profiler.frames)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        self.fields["started"] = datetime.now().isoformat(timespec="milliseconds")
+        self._start = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        self._profile.disable()
+        duration = time.perf_counter() - self._start
+        try:
+            peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            if self._token is not None:
+                _current.reset(self._token)
+            if exc is not None:
+                self.fields["error"] = f"{type(exc).__name__}: {exc}"
+            top = snapshot.statistics("lineno")[: self.profiler.top]
+            self.fields.update(
+                duration_ms=round(duration * 1000, 3),
+                peak_bytes=max(peak - self._baseline, 0),
+                top_allocations=[
+                    {
+                        "location": f"{stat.traceback[0].filename}:"
+                        f"{stat.traceback[0].lineno}",
+                        "size_bytes": stat.size,
+                        "count": stat.count,
+                    }
+                    for stat in top
+                ],
+            )
+            self.profiler.write(self.tool, self._profile, self.fields)
+        finally:
+            self.profiler.release()
+
+
+class _NoopProfile:
+    """Stand-in returned by :func:`call` when a call is not profiled."""
+
+    __slots__ = ()
+
+    def set(self, **fields: Any) -> None:
+        pass
+
+    def note(self, **counts: int) -> None:
+        pass
+
+    def __enter__(self) -> _NoopProfile:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        pass
+
+
+class Profiler:
+    """Writes a profile of each sampled call to a directory."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        sample: float = 1.0,
+        top: int = 25,
+        frames: int = 1,
+    ) -> None:
+        """Initialize a profiler.
+
+        Args:
+            directory: Where dumps are written (created if missing)
+            sample: Fraction of calls to profile, 0.0-1.0
+            top: Number of allocation sites kept per call
+            frames: Traceback depth tracemalloc records per allocation
+        """
+        if not 0.0 <= sample <= 1.0:
+            raise ValueError(f"sample must be between 0 and 1, got {sample}")
+        self.directory = Path(directory)
+        self.sample = sample
+        self.top = top
+        self.frames = frames
+        self._busy = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def acquire(self) -> bool:
+        """Claim the profiler for one call if sampled and not already busy."""
+        if self.sample < 1.0 and random.random() >= self.sample:
+            return False
+        return self._busy.acquire(blocking=False)
+
+    def release(self) -> None:
+        """Free the profiler for the next call."""
+        self._busy.release()
+
+    def write(self, tool: str, profile: cProfile.Profile, fields: dict) -> Path:
+        """Write ``profile`` and the JSON record; return the record's path."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        safe_tool = re.sub(r"[^A-Za-z0-9_.-]", "_", tool)
+        stem = f"{stamp}-{os.getpid()}-{next(self._seq):04d}-{safe_tool}"
+        profile.dump_stats(self.directory / f"{stem}.prof")
+        record = {"tool": tool, **fields, "profile": f"{stem}.prof"}
+        path = self.directory / f"{stem}.json"
+        path.write_text(json.dumps(record, indent=2, default=str), encoding="utf-8")
+        return path
+
+
+_NOOP = _NoopProfile()
+_current: ContextVar[CallProfile | None] = ContextVar(
+    "jsoncanvas_profile", default=None
+)
+_profiler: Profiler | None = None
+
+
+def call(tool: str, arguments: dict[str, Any]) -> CallProfile | _NoopProfile:
+    """Return a context manager profiling one call of ``tool``.
+
+    A no-op unless a profiler is installed, the call is sampled, and no other
+    call is being profiled.
+    """
+    profiler = _profiler
+    if profiler is None or not profiler.acquire():
+        return _NOOP
+    return CallProfile(profiler, tool, arguments)
+
+
+def note(**counts: int) -> None:
+    """Add ``counts`` to the record of the call being profiled, if any."""
+    current = _current.get()
+    if current is not None:
+        current.note(**counts)
+
+
+def enabled() -> bool:
+    """Return whether a profiler is installed."""
+    return _profiler is not None
+
+
+def set_profiler(profiler: Profiler | None) -> None:
+    """Install ``profiler`` for all new calls; None turns profiling off."""
+    global _profiler
+    _profiler = profiler
+
+
+def summarise(directory: str | Path, tool: str | None = None, top: int = 20) -> str:
+    """Return a text report over the dumps in ``directory``.
+
+    Lists per-tool call counts, durations and peak memory, the slowest calls,
+    and the functions with the most cumulative time across all their profiles.
+    """
+    import pstats
+
+    directory = Path(directory)
+    records = []
+    for path in sorted(directory.glob("*.json")):
+        record = json.loads(path.read_text(encoding="utf-8"))
+        if tool is None or record.get("tool") == tool:
+            records.append(record)
+    if not records:
+        return f"No profiles in {directory}\n"
+
+    out = io.StringIO()
+    by_tool: dict[str, list[dict]] = {}
+    for record in records:
+        by_tool.setdefault(record["tool"], []).append(record)
+    out.write(
+        f"{'tool':<20} {'calls':>6} {'p50 ms':>10} {'max ms':>10} "
+        f"{'max peak MiB':>13} {'max nodes':>10}\n"
+    )
+    for name, group in sorted(by_tool.items()):
+        durations = [r["duration_ms"] for r in group]
+        out.write(
+            f"{name:<20} {len(group):>6} {statistics.median(durations):>10.1f} "
+            f"{max(durations):>10.1f} "
+            f"{max(r['peak_bytes'] for r in group) / 2**20:>13.2f} "
+            f"{max(r.get('nodes', 0) for r in group):>10}\n"
+        )
+
+    out.write(f"\nSlowest calls (of {len(records)}):\n")
+    slowest = sorted(records, key=lambda r: r["duration_ms"], reverse=True)
+    for record in slowest[:10]:
+        out.write(
+            f"  {record['duration_ms']:>10.1f} ms  {record['tool']}  "
+            f"nodes={record.get('nodes', 0)} edges={record.get('edges', 0)}  "
+            f"{json.dumps(record['arguments'])}  {record['profile']}\n"
+        )
+
+    profiles = [
+        str(directory / r["profile"])
+        for r in records
+        if (directory / r["profile"]).exists()
+    ]
+    if profiles:
+        out.write(f"\nTop functions by cumulative time ({len(profiles)} profiles):\n")
+        stats = pstats.Stats(*profiles, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Print :func:`summarise` for a dump directory."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m jsoncanvas.profiling",
+        description="Summarise per-call profiles written by MCP_PROFILE.",
+    )
+    parser.add_argument("directory", help="Directory of profile dumps.")
+    parser.add_argument("--tool", help="Only include calls to this tool.")
+    parser.add_argument(
+        "--top", type=int, default=20, help="Functions to list (default: 20)."
+    )
+    args = parser.parse_args(argv)
+    sys.stdout.write(summarise(args.directory, args.tool, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Rasterise exported SVG to PNG.
+
+PNG export reuses :func:`~jsoncanvas.export.to_svg` and converts its output
+with ``resvg`` (the optional ``png`` extra), so there is only ever one
+renderer. Rasterising a very large canvas can take a long time, so
+:func:`render_png` runs the conversion in a separate process and kills it when
+it overruns its timeout instead of stalling the server.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import multiprocessing
+import re
+
+MIN_SCALE = 1.0
+MAX_SCALE = 3.0
+# Cap on either output dimension, so huge boards x scale stay bounded.
+MAX_DIMENSION = 4096
+
+PNG_EXTRA_HINT = (
+    "PNG export requires the optional 'png' extra: "
+    'pip install "mcp-server-jsoncanvas[png]"'
+)
+
+_SIZE_RE = re.compile(r'<svg\b[^>]*?\bwidth="([\d.]+)"[^>]*?\bheight="([\d.]+)"')
+
+
+def clamp_scale(scale: float) -> float:
+    """Clamp a raster multiplier to the supported 1.0-3.0 range."""
+    return min(MAX_SCALE, max(MIN_SCALE, float(scale)))
+
+
+def svg_size(svg: str) -> tuple[float, float]:
+    """Return the intrinsic ``(width, height)`` declared on the root element."""
+    match = _SIZE_RE.search(svg)
+    if match is None:
+        raise ValueError("SVG root element has no width/height")
+    return float(match.group(1)), float(match.group(2))
+
+
+def svg_to_png(svg: str, scale: float = 2.0) -> bytes:
+    """Rasterise ``svg`` in-process and return PNG bytes.
+
+    The image is rendered at the SVG's intrinsic size times ``scale`` (clamped),
+    reduced further if needed so neither side exceeds :data:`MAX_DIMENSION`.
+
+    Raises:
+        RuntimeError: If the optional ``png`` extra is not installed
+    """
+    try:
+        import resvg_py
+    except ImportError as exc:
+        raise RuntimeError(PNG_EXTRA_HINT) from exc
+    width, height = svg_size(svg)
+    zoom = min(clamp_scale(scale), MAX_DIMENSION / width, MAX_DIMENSION / height)
+    return bytes(resvg_py.svg_to_bytes(svg_string=svg, zoom=zoom))
+
+
+def _render_worker(conn, svg: str, scale: float) -> None:
+    try:
+        conn.send(("ok", svg_to_png(svg, scale)))
+    except Exception as exc:  # noqa: BLE001 - relayed to the parent
+        conn.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally:
+        conn.close()
+
+
+def render_png(svg: str, scale: float = 2.0, timeout: float = 30.0) -> bytes:
+    """Rasterise ``svg`` in a worker process, giving up after ``timeout`` seconds.
+
+    Raises:
+        RuntimeError: If the ``png`` extra is missing or rendering fails
+        TimeoutError: If rendering does not finish within ``timeout``
+    """
+    # Fail fast in the parent rather than paying for a worker to find out.
+    if importlib.util.find_spec("resvg_py") is None:
+        raise RuntimeError(PNG_EXTRA_HINT)
+    methods = multiprocessing.get_all_start_methods()
+    # forkserver forks from a clean helper process (safe with the server's
+    # threads, cheap after the first call); spawn is the portable fallback.
+    ctx = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_render_worker, args=(child, svg, scale), daemon=True)
+    proc.start()
+    child.close()
+    try:
+        if not parent.poll(timeout):
+            proc.kill()
+            raise TimeoutError(f"PNG rasterisation exceeded {timeout:g}s")
+        status, payload = parent.recv()
+    except EOFError as exc:
+        raise RuntimeError("PNG rasteriser exited unexpectedly") from exc
+    finally:
+        parent.close()
+        proc.join(timeout=5)
+        if proc.is_alive():  # pragma: no cover - worker wedged after replying
+            proc.kill()
+            proc.join()
+    if status != "ok":
+        raise RuntimeError(f"PNG rasterisation failed: {payload}")
+    return payload
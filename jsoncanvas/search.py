@@ -0,0 +1,10 @@
+"""The element fields that canvas search looks in.
+
+Shared by the server's file scan and the SQLite canvas store
+(:mod:`jsoncanvas.store`), so that both match the same fields.
+"""
+
+# Fields searched per element kind (camelCase JSON keys), in match order.
+NODE_SEARCH_FIELDS = ("text", "label", "file", "subpath", "url", "id")
+EDGE_SEARCH_FIELDS = ("label", "id")
+SEARCH_FIELDS = {"node": NODE_SEARCH_FIELDS, "edge": EDGE_SEARCH_FIELDS}
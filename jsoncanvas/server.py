@@ -2,23 +2,52 @@
 """MCP server for JSON Canvas files.
 
 Built on the FastMCP API of the official ``mcp`` SDK, which negotiates the
-2025-11-25 Model Context Protocol revision. Exposes seven tools (create, validate,
-read, list, edit, export, search) plus a canvas-viewer UI resource over either
-stdio (default) or the Streamable HTTP transport.
+2025-11-25 Model Context Protocol revision. Exposes nine tools (create, validate,
+read, list, edit, batch canvas operations, export, batch export, search) plus a
+canvas-viewer UI resource over either stdio (default) or the Streamable HTTP
+transport.
 """
 
 from __future__ import annotations
 
 import argparse
+import atexit
+import base64
+import contextlib
+import fnmatch
+import functools
+import hashlib
 import json
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Literal
+from urllib.parse import quote, unquote
 
+import anyio
+import pydantic_core
 from mcp.server.fastmcp import FastMCP
-from pydantic import BaseModel, Field
+from mcp.server.fastmcp.utilities.func_metadata import FuncMetadata
+from mcp.shared.exceptions import McpError
+from mcp.types import (
+    CallToolRequest,
+    CallToolResult,
+    ErrorData,
+    ImageContent,
+    Resource,
+    ResourceLink,
+    ServerCapabilities,
+    ServerResult,
+    TextContent,
+)
+from pydantic import AnyUrl, BaseModel, Field, PrivateAttr
 
 from jsoncanvas import (
     Canvas,
@@ -28,8 +57,26 @@ from jsoncanvas import (
     LinkNode,
     TextNode,
     __version__,
+    tracing,
 )
-from jsoncanvas.export import to_markdown, to_svg
+from jsoncanvas.errors import LimitExceededError
+from jsoncanvas.metrics import Counter, Gauge, MetricsRegistry
+from jsoncanvas.search import SEARCH_FIELDS
+
+if TYPE_CHECKING:
+    from types import ModuleType
+
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    from jsoncanvas.cache import ExportCache, FragmentCache
+    from jsoncanvas.journal import CanvasJournal
+    from jsoncanvas.limits import Limits
+    from jsoncanvas.store import CanvasStore
+    from jsoncanvas.subscriptions import SubscriptionRegistry
+    from jsoncanvas.tiles import TileRenderer
+    from jsoncanvas.watch import CanvasWatcher
+    from jsoncanvas.writebehind import WriteBehindBuffer
 
 
 # --------------------------------------------------------------------------- #
@@ -44,6 +91,33 @@ class CanvasDocument(BaseModel):
     edges: list[dict[str, Any]] = Field(
         default_factory=list, description="JSON Canvas edge objects"
     )
+    # This document already serialised (e.g. the stored file), when known;
+    # reused as the text fallback instead of encoding the elements again.
+    _json: str | None = PrivateAttr(default=None)
+
+
+class CanvasDelta(BaseModel):
+    """The elements an edit added, updated, or removed."""
+
+    added_nodes: list[dict[str, Any]] = Field(
+        default_factory=list, description="Nodes added by the edit"
+    )
+    updated_nodes: list[dict[str, Any]] = Field(
+        default_factory=list, description="Nodes changed by the edit (new bodies)"
+    )
+    removed_node_ids: list[str] = Field(
+        default_factory=list, description="IDs of nodes removed by the edit"
+    )
+    added_edges: list[dict[str, Any]] = Field(
+        default_factory=list, description="Edges added by the edit"
+    )
+    updated_edges: list[dict[str, Any]] = Field(
+        default_factory=list, description="Edges changed by the edit (new bodies)"
+    )
+    removed_edge_ids: list[str] = Field(
+        default_factory=list,
+        description="IDs of edges removed by the edit (including cascaded edges)",
+    )
 
 
 class CreateCanvasResult(BaseModel):
@@ -52,8 +126,78 @@ class CreateCanvasResult(BaseModel):
     path: str = Field(description="Absolute path to the written .canvas file")
     node_count: int = Field(description="Number of nodes written")
     edge_count: int = Field(description="Number of edges written")
-    canvas: CanvasDocument = Field(
-        description="The full canvas document, for inline UI rendering"
+    version: str = Field(
+        description="Content hash of the written file; changes whenever it does"
+    )
+    canvas: CanvasDocument | None = Field(
+        default=None,
+        description="The full canvas document, for inline UI rendering "
+        "(omitted for delta responses)",
+    )
+    delta: CanvasDelta | None = Field(
+        default=None,
+        description="Only the changed elements (set for delta responses)",
+    )
+
+
+class CanvasOperation(BaseModel):
+    """One create or edit operation in a ``batch_canvas_ops`` call."""
+
+    op: Literal["create", "edit"] = Field(description="Operation kind")
+    filename: str = Field(
+        description=(
+            "create: output name (a YYYY-MM-DD- prefix and .canvas are added); "
+            "edit: name of an existing canvas file"
+        )
+    )
+    nodes: list[dict[str, Any]] | None = Field(
+        default=None, description="create: JSON Canvas node objects"
+    )
+    edges: list[dict[str, Any]] | None = Field(
+        default=None, description="create: JSON Canvas edge objects"
+    )
+    add_nodes: list[dict[str, Any]] | None = Field(
+        default=None, description="edit: nodes to add"
+    )
+    update_nodes: list[dict[str, Any]] | None = Field(
+        default=None, description="edit: partial nodes to patch (each with id)"
+    )
+    remove_node_ids: list[str] | None = Field(
+        default=None, description="edit: node IDs to remove"
+    )
+    add_edges: list[dict[str, Any]] | None = Field(
+        default=None, description="edit: edges to add"
+    )
+    update_edges: list[dict[str, Any]] | None = Field(
+        default=None, description="edit: partial edges to patch (each with id)"
+    )
+    remove_edge_ids: list[str] | None = Field(
+        default=None, description="edit: edge IDs to remove"
+    )
+
+
+class CanvasOperationResult(BaseModel):
+    """Outcome of one operation in a ``batch_canvas_ops`` call."""
+
+    index: int = Field(description="Position of the operation in the request")
+    op: str = Field(description="Operation kind")
+    path: str | None = Field(default=None, description="Absolute path of the canvas")
+    ok: bool = Field(description="Whether the operation's file was written")
+    version: str | None = Field(
+        default=None, description="Content hash of the file after this batch"
+    )
+    node_count: int | None = Field(default=None, description="Nodes after this batch")
+    edge_count: int | None = Field(default=None, description="Edges after this batch")
+    error: str | None = Field(default=None, description="Why the operation failed")
+
+
+class BatchCanvasOpsResult(BaseModel):
+    """Result of a ``batch_canvas_ops`` call."""
+
+    succeeded: int = Field(description="Operations whose file was written")
+    failed: int = Field(description="Operations that failed or were rolled back")
+    results: list[CanvasOperationResult] = Field(
+        default_factory=list, description="One result per operation, in order"
     )
 
 
@@ -69,9 +213,20 @@ class ValidateCanvasResult(BaseModel):
 class ExportResult(BaseModel):
     """Result of exporting a canvas to another format."""
 
-    format: str = Field(description="The export format (markdown or svg)")
+    format: str = Field(description="The export format (markdown, svg, svgz, or png)")
     mime_type: str = Field(description="MIME type of the exported content")
-    content: str = Field(description="The exported document text")
+    content: str = Field(
+        description=(
+            "The exported document text; empty whenever the export was written "
+            "to a file instead (output='file', svgz, png), see ``path``"
+        )
+    )
+    path: str | None = Field(
+        default=None, description="Absolute path of the written export file"
+    )
+    # Raster exports also ship as an MCP image content block (not structured
+    # content, where base64 would be bulky); see ``_with_image_content``.
+    _png: bytes | None = PrivateAttr(default=None)
 
 
 class SearchMatch(BaseModel):
@@ -84,6 +239,36 @@ class SearchMatch(BaseModel):
     snippet: str = Field(description="The matching value")
 
 
+class BatchExportEntry(BaseModel):
+    """One output of a batch export."""
+
+    canvas: str = Field(description="Source canvas filename")
+    format: str = Field(description="The export format")
+    path: str | None = Field(description="Absolute path of the output file")
+    status: Literal["rendered", "cached", "skipped", "error"] = Field(
+        description=(
+            "rendered, cached (reused a cached render), skipped (source unchanged "
+            "since the last batch), or error"
+        )
+    )
+    bytes: int | None = Field(default=None, description="Size of the output file")
+    error: str | None = Field(default=None, description="Why the export failed")
+
+
+class BatchExportResult(BaseModel):
+    """Result of exporting many canvases at once."""
+
+    target_dir: str = Field(description="Absolute path of the output directory")
+    manifest_path: str = Field(description="Path of the manifest.json written")
+    rendered: int = Field(description="Outputs rendered by this batch")
+    cached: int = Field(description="Outputs written from the export cache")
+    skipped: int = Field(description="Outputs left as-is (source unchanged)")
+    failed: int = Field(description="Outputs that could not be produced")
+    entries: list[BatchExportEntry] = Field(
+        default_factory=list, description="One entry per canvas and format"
+    )
+
+
 class SearchResult(BaseModel):
     """Result of searching across stored canvases."""
 
@@ -101,10 +286,14 @@ class SearchResult(BaseModel):
 mcp = FastMCP(
     "jsoncanvas",
     instructions=(
-        "Tools for creating, validating, reading, and listing JSON Canvas "
-        "(.canvas) files following the JSON Canvas 1.0 specification. Files are "
-        "written to and read from the directory named by the OUTPUT_PATH "
-        "environment variable (default ./output)."
+        "Tools for creating, validating, reading, listing, editing, exporting, and "
+        "searching JSON Canvas (.canvas) files following the JSON Canvas 1.0 "
+        "specification: create_canvas, validate_canvas, read_canvas, "
+        "list_canvases, edit_canvas, batch_canvas_ops (creates and edits across "
+        "many canvases in one call), export_canvas, batch_export (many canvases "
+        "and formats at once), and search_canvases. Files are written to and read "
+        "from the directory named by the OUTPUT_PATH environment variable "
+        "(default ./output)."
     ),
 )
 # FastMCP defaults serverInfo.version to the SDK version; report our own instead.
@@ -139,9 +328,49 @@ _UI_HTML_PATH = Path(__file__).parent / "_ui" / "viewer.html"
 # --------------------------------------------------------------------------- #
 # Helpers
 # --------------------------------------------------------------------------- #
+def _shared(maxsize: int) -> Callable[[Callable[..., Any]], Any]:
+    """Cache a factory like :func:`functools.lru_cache`, building each value once.
+
+    ``lru_cache`` calls the factory without holding a lock, so threads that
+    miss together (the workers of ``batch_canvas_ops``, say) would each build
+    their own buffer, journal, or store. Misses are serialised here instead.
+    ``factory.peek(*args)`` returns the value for ``args`` only if it was
+    already built (else None).
+    """
+
+    def decorate(factory: Callable[..., Any]) -> Any:
+        built: OrderedDict[tuple[Any, ...], Any] = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(factory)
+        def shared(*args: Any) -> Any:
+            with lock:
+                if args in built:
+                    built.move_to_end(args)
+                    return built[args]
+                value = built[args] = factory(*args)
+                if len(built) > maxsize:
+                    built.popitem(last=False)
+                return value
+
+        def peek(*args: Any) -> Any:
+            with lock:
+                return built.get(args)
+
+        shared.peek = peek
+        return shared
+
+    return decorate
+
+
+def _output_path() -> Path:
+    """Return the configured output directory without touching the filesystem."""
+    return Path(os.environ.get("OUTPUT_PATH", "./output"))
+
+
 def _output_dir() -> Path:
     """Return the configured output directory, creating it if needed."""
-    path = Path(os.environ.get("OUTPUT_PATH", "./output"))
+    path = _output_path()
     path.mkdir(parents=True, exist_ok=True)
     return path
 
@@ -164,19 +393,223 @@ def _safe_target(filename: str) -> Path:
     return target
 
 
-def _load_ui_html() -> str:
-    """Return the bundled single-file HTML for the canvas viewer.
+@dataclass(frozen=True)
+class _UiBundle:
+    """The viewer HTML plus its validator and precompressed variants."""
+
+    html: str
+    etag: str
+    gzip: bytes
+    brotli: bytes | None
+
+
+@functools.lru_cache(maxsize=1)
+def _ui_bundle() -> _UiBundle:
+    """Load, hash, and compress the viewer bundle once per process.
 
     The file is produced by the ``ui/`` Vite build and committed under
-    ``jsoncanvas/_ui/``. Raise a helpful error if it is missing.
+    ``jsoncanvas/_ui/``; it only changes with a package upgrade, so it is read
+    lazily on first use and kept in memory. The brotli variant is built only
+    when the optional ``brotli`` module is installed. Raise a helpful error if
+    the bundle is missing.
     """
+    import gzip
+
     try:
-        return _UI_HTML_PATH.read_text(encoding="utf-8")
+        raw = _UI_HTML_PATH.read_bytes()
     except FileNotFoundError as exc:  # pragma: no cover - build-time guard
         raise RuntimeError(
             f"Canvas viewer UI not found at {_UI_HTML_PATH}. "
             "Build it with: cd ui && npm install && npm run build"
         ) from exc
+    try:
+        import brotli
+    except ImportError:
+        compressed_br = None
+    else:  # pragma: no cover - optional dependency
+        compressed_br = brotli.compress(raw, mode=brotli.MODE_TEXT)
+    return _UiBundle(
+        html=raw.decode("utf-8"),
+        etag='"' + hashlib.sha256(raw).hexdigest()[:32] + '"',
+        gzip=gzip.compress(raw, compresslevel=9, mtime=0),
+        brotli=compressed_br,
+    )
+
+
+def _load_ui_html() -> str:
+    """Return the bundled single-file HTML for the canvas viewer (cached)."""
+    return _ui_bundle().html
+
+
+def _adapt_tool(name: str, adapter: Callable[[Callable], Callable]) -> None:
+    """Wrap the handler FastMCP invokes for tool ``name`` with ``adapter``.
+
+    The module-level function keeps its plain Python return type for library
+    callers and tests; only the protocol-facing result changes. Tool schemas
+    were already derived from the original signature at registration.
+    """
+    tool = mcp._tool_manager.get_tool(name)
+    tool.fn = adapter(tool.fn)
+
+
+class _PrebuiltOutputMetadata(FuncMetadata):
+    """Tool metadata that passes prebuilt :class:`CallToolResult` through.
+
+    FastMCP re-validates the structured content of a returned
+    ``CallToolResult`` against the output model, copying every node and edge
+    dict; results from :func:`_prebuilt_output` hold data the server has
+    already validated, so that pass is skipped.
+    """
+
+    def convert_result(self, result: Any) -> Any:
+        if isinstance(result, CallToolResult):
+            return result
+        return super().convert_result(result)
+
+
+def _json_fields(model: BaseModel) -> dict[str, Any]:
+    """Return ``model.model_dump(mode="json")`` without copying its values.
+
+    Only for models whose fields already hold JSON values (element dicts from
+    ``json.loads`` or ``to_dict``), so nested lists are shared, not rebuilt.
+    """
+    fields = {}
+    for name in type(model).model_fields:
+        value = getattr(model, name)
+        fields[name] = _json_fields(value) if isinstance(value, BaseModel) else value
+    return fields
+
+
+# Stands in for an already serialised canvas while the result around it is
+# serialised; random, so no other value can collide with it.
+_CANVAS_PLACEHOLDER = f"jsoncanvas-canvas-{os.urandom(8).hex()}"
+
+
+def _result_text(result: BaseModel, structured: dict[str, Any]) -> str:
+    """Return the text fallback for ``result``, reusing serialised documents."""
+    document = result if isinstance(result, CanvasDocument) else None
+    if document is not None and document._json is not None:
+        return document._json
+    canvas = getattr(result, "canvas", None)
+    if isinstance(canvas, CanvasDocument) and canvas._json is not None:
+        outer = pydantic_core.to_json(
+            {**structured, "canvas": _CANVAS_PLACEHOLDER}, indent=2
+        ).decode()
+        return outer.replace(f'"{_CANVAS_PLACEHOLDER}"', canvas._json, 1)
+    return pydantic_core.to_json(structured, indent=2).decode()
+
+
+def _large_result_policy() -> tuple[str, int]:
+    """Return the ``MCP_LARGE_RESULT`` mode and ``MCP_LARGE_RESULT_BYTES``.
+
+    Canvas JSON over the threshold is sent once, as structured content, and
+    the text fallback becomes a short summary (``summary``), the summary plus
+    a ``canvas://file/`` resource link (``link``, default), or stays the full
+    JSON (``full``).
+    """
+    mode = os.environ.get("MCP_LARGE_RESULT", "link")
+    if mode not in {"full", "summary", "link"}:
+        raise ValueError(f"Unknown MCP_LARGE_RESULT mode: {mode!r}")
+    return mode, int(os.environ.get("MCP_LARGE_RESULT_BYTES", "262144"))
+
+
+def _text_fallback(
+    result: BaseModel, structured: dict[str, Any], filename: str | None
+) -> list[TextContent | ResourceLink]:
+    """Return the unstructured content for a canvas tool result.
+
+    Small canvases get the full JSON, so text-only clients are unaffected;
+    large ones are summarised per :func:`_large_result_policy`.
+    """
+    mode, threshold = _large_result_policy()
+    document = (
+        result
+        if isinstance(result, CanvasDocument)
+        else getattr(result, "canvas", None)
+    )
+    if mode == "full" or not isinstance(document, CanvasDocument):
+        return [TextContent(type="text", text=_result_text(result, structured))]
+    if document._json is not None:
+        size = len(document._json)
+        if size <= threshold:
+            return [TextContent(type="text", text=_result_text(result, structured))]
+    else:
+        text = _result_text(result, structured)
+        if len(text) <= threshold:
+            return [TextContent(type="text", text=text)]
+        size = len(text)
+
+    if "path" in structured:
+        name = Path(structured["path"]).name
+    else:
+        name = _safe_target(filename or "").name
+    uri = _canvas_uri(name)
+    note = (
+        f"{name}: {len(document.nodes)} nodes, {len(document.edges)} edges. "
+        f"The canvas JSON ({size} bytes) is left out of this text to avoid "
+        "sending it twice; it is in the structured content"
+        + (f" and at {uri}." if mode == "link" else ".")
+    )
+    if result is not document:
+        head = {k: v for k, v in structured.items() if k != "canvas"}
+        note = pydantic_core.to_json(head, indent=2).decode() + "\n\n" + note
+    content: list[TextContent | ResourceLink] = [TextContent(type="text", text=note)]
+    if mode == "link":
+        content.append(
+            ResourceLink(
+                type="resource_link",
+                uri=AnyUrl(uri),
+                name=name,
+                mimeType="application/json",
+                size=size,
+            )
+        )
+    return content
+
+
+def _prebuilt_output(fn: Callable[..., BaseModel]) -> Callable[..., Any]:
+    """Adapt a canvas tool to return its protocol result ready-made.
+
+    FastMCP's default path validates and copies the returned model, dumps it
+    again for the structured content, serialises it a third time for the
+    text fallback, and checks the structured content against the output
+    schema. Canvas results are built from data the server has just validated
+    (or written), so the structured content references the element dicts
+    directly and the text fallback reuses the canvas JSON already produced
+    for the file (or, for large canvases, summarises it).
+    """
+
+    @functools.wraps(fn)
+    def handler(*args: Any, **kwargs: Any) -> CallToolResult:
+        result = fn(*args, **kwargs)
+        structured = _json_fields(result)
+        return CallToolResult(
+            content=_text_fallback(result, structured, kwargs.get("filename")),
+            structuredContent=structured,
+        )
+
+    return handler
+
+
+def _serve_prebuilt(name: str) -> None:
+    """Route tool ``name``'s results through :func:`_prebuilt_output`."""
+    _adapt_tool(name, _prebuilt_output)
+    tool = mcp._tool_manager.get_tool(name)
+    tool.fn_metadata = _PrebuiltOutputMetadata.model_construct(**dict(tool.fn_metadata))
+
+
+def _canvas_document(data: dict[str, Any], text: str | None = None) -> CanvasDocument:
+    """Wrap validated canvas data in a :class:`CanvasDocument` without copying.
+
+    ``text`` is ``data`` serialised; it is kept as the document's JSON when
+    ``data`` holds exactly the document's fields.
+    """
+    document = CanvasDocument.model_construct(
+        nodes=data.get("nodes", []), edges=data.get("edges", [])
+    )
+    if text is not None and data.keys() == {"nodes", "edges"}:
+        document._json = text
+    return document
 
 
 def _node_from_dict(node_data: dict[str, Any]):
@@ -199,20 +632,887 @@ def _build_canvas(
     nodes: list[dict[str, Any]], edges: list[dict[str, Any]] | None
 ) -> Canvas:
     """Build and validate a :class:`Canvas` from JSON Canvas node/edge dicts."""
-    canvas = Canvas()
-    for node_data in nodes:
+    with tracing.span("canvas.build", nodes=len(nodes), edges=len(edges or [])):
+        canvas = Canvas()
+        for node_data in nodes:
+            canvas.add_node(_node_from_dict(node_data))
+        for edge_data in edges or []:
+            canvas.add_edge(Edge.from_dict(edge_data))
+    _count_elements(len(canvas.nodes), len(canvas.edges))
+    return canvas
+
+
+def _apply_edits(
+    canvas: Canvas,
+    add_nodes: list[dict[str, Any]] | None = None,
+    update_nodes: list[dict[str, Any]] | None = None,
+    remove_node_ids: list[str] | None = None,
+    add_edges: list[dict[str, Any]] | None = None,
+    update_edges: list[dict[str, Any]] | None = None,
+    remove_edge_ids: list[str] | None = None,
+) -> None:
+    """Apply ``edit_canvas`` operations to ``canvas`` in place, in order."""
+    with tracing.span(
+        "canvas.edit",
+        add_nodes=len(add_nodes or []),
+        update_nodes=len(update_nodes or []),
+        remove_nodes=len(remove_node_ids or []),
+        add_edges=len(add_edges or []),
+        update_edges=len(update_edges or []),
+        remove_edges=len(remove_edge_ids or []),
+    ):
+        _apply_edit_ops(
+            canvas,
+            add_nodes,
+            update_nodes,
+            remove_node_ids,
+            add_edges,
+            update_edges,
+            remove_edge_ids,
+        )
+
+
+def _apply_edit_ops(
+    canvas: Canvas,
+    add_nodes: list[dict[str, Any]] | None,
+    update_nodes: list[dict[str, Any]] | None,
+    remove_node_ids: list[str] | None,
+    add_edges: list[dict[str, Any]] | None,
+    update_edges: list[dict[str, Any]] | None,
+    remove_edge_ids: list[str] | None,
+) -> None:
+    for node_data in add_nodes or []:
         canvas.add_node(_node_from_dict(node_data))
-    for edge_data in edges or []:
+
+    for patch in update_nodes or []:
+        node_id = patch.get("id")
+        existing = canvas.get_node(node_id) if node_id else None
+        if existing is None:
+            raise ValueError(f"No node with id {node_id!r} to update")
+        # A patch merges onto the existing node, preserving its type. Changing the
+        # type must supply a complete node — merging would carry the old type's
+        # fields (e.g. "text") into the new type's constructor and fail.
+        if "type" in patch and patch["type"] != existing.type:
+            merged = patch
+        else:
+            merged = {**existing.to_dict(), **patch}
+        canvas.update_node(_node_from_dict(merged))
+
+    for edge_data in add_edges or []:
         canvas.add_edge(Edge.from_dict(edge_data))
-    return canvas
 
+    for patch in update_edges or []:
+        edge_id = patch.get("id")
+        existing = canvas.get_edge(edge_id) if edge_id else None
+        if existing is None:
+            raise ValueError(f"No edge with id {edge_id!r} to update")
+        canvas.update_edge(Edge.from_dict({**existing.to_dict(), **patch}))
+
+    for edge_id in remove_edge_ids or []:
+        if canvas.remove_edge(edge_id) is None:
+            raise ValueError(f"No edge with id {edge_id!r} to remove")
+
+    for node_id in remove_node_ids or []:
+        if canvas.remove_node(node_id) is None:
+            raise ValueError(f"No node with id {node_id!r} to remove")
+
+
+def _limits() -> Limits:
+    """Return the size limits configured by the ``MCP_MAX_*`` variables."""
+    from jsoncanvas.limits import Limits
+
+    return Limits.from_env()
 
-def _load_canvas(filename: str) -> tuple[Path, Canvas]:
-    """Load a stored canvas as a validated :class:`Canvas`, with its file path."""
+
+def _read_canvas_bytes(filename: str) -> tuple[Path, bytes]:
+    """Return a stored canvas's path and raw content.
+
+    With write-behind on, a canvas held in memory is returned from there: it
+    may be newer than its file. With journaling on, the canvas's edit journal
+    is replayed over the file.
+    """
     target = _safe_target(filename)
+    buffer = _write_behind()
+    if buffer is not None and (raw := buffer.get(target.name)) is not None:
+        return target, raw
     if not target.is_file():
         raise ValueError(f"Canvas not found: {target.name}")
-    return target, Canvas.from_dict(json.loads(target.read_text()))
+    limits = _limits()
+    limits.check_file_bytes(target.stat().st_size, target.name)
+    journal = _journal()
+    if journal is not None and (raw := journal.read(target)) is not None:
+        # The replayed edits can grow the canvas past the file's size.
+        limits.check_file_bytes(len(raw), target.name)
+        return target, raw
+    with tracing.span("file.read") as span:
+        raw = target.read_bytes()
+        span.set(bytes=len(raw))
+    _count_file_bytes("read", len(raw))
+    return target, raw
+
+
+def _parse_canvas(raw: bytes) -> Canvas:
+    """Parse and validate serialised canvas content."""
+    with tracing.span("json.parse", bytes=len(raw)):
+        data = json.loads(raw)
+    if isinstance(data, dict):
+        # Before from_dict, which builds every node and edge.
+        _limits().check_counts(len(data.get("nodes", [])), len(data.get("edges", [])))
+    canvas = Canvas.from_dict(data)
+    _count_elements(len(canvas.nodes), len(canvas.edges))
+    return canvas
+
+
+def _serialise(canvas_dict: dict[str, Any]) -> str:
+    """Return the stored (indented JSON) form of a canvas dictionary."""
+    with tracing.span("json.serialise") as span:
+        text = json.dumps(canvas_dict, indent=2)
+        span.set(bytes=len(text))
+    return text
+
+
+def _write_chunks(target: Path, chunks: Iterable[str | bytes]) -> None:
+    """Stream ``chunks`` to ``target`` via a temp file and atomic rename.
+
+    Text chunks are written as UTF-8; bytes chunks are written verbatim.
+    """
+    tmp = target.with_name(f".{target.name}.tmp")
+    written = 0
+    try:
+        with tracing.span("file.write", file=target.name) as span:
+            with tmp.open("wb") as fh:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    fh.write(data)
+                    written += len(data)
+            os.replace(tmp, target)
+            span.set(bytes=written)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        _count_file_bytes("write", written)
+
+
+def _gzip_chunks(chunks: Iterable[str | bytes]) -> Iterator[bytes]:
+    """Gzip-compress a stream of chunks without buffering the whole document."""
+    import zlib
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(
+            chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        )
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@_shared(maxsize=8)
+def _export_cache_for(directory: Path | None, max_entries: int) -> ExportCache:
+    from jsoncanvas.cache import ExportCache
+
+    return ExportCache(max_entries=max_entries, directory=directory)
+
+
+def _export_cache() -> ExportCache | None:
+    """Return the export cache selected by ``MCP_EXPORT_CACHE``.
+
+    ``memory`` (default) keeps recent exports in an in-process LRU sized by
+    ``MCP_EXPORT_CACHE_SIZE``; ``disk`` adds a persistent tier under
+    ``OUTPUT_PATH/.cache/exports``; ``off`` disables caching.
+    """
+    config = _export_cache_config()
+    return _export_cache_for(*config) if config is not None else None
+
+
+def _export_cache_config() -> tuple[Path | None, int] | None:
+    """Return the export cache's directory and size, or None when it is off."""
+    mode = os.environ.get("MCP_EXPORT_CACHE", "memory")
+    if mode == "off":
+        return None
+    if mode not in {"memory", "disk"}:
+        raise ValueError(f"Unknown MCP_EXPORT_CACHE mode: {mode!r}")
+    directory = _cache_dir("exports") if mode == "disk" else None
+    max_entries = int(os.environ.get("MCP_EXPORT_CACHE_SIZE", "64"))
+    return directory, max_entries
+
+
+def _cache_dir(name: str) -> Path:
+    """Return the directory of the disk cache ``name`` (created on first put)."""
+    return _output_path().resolve() / ".cache" / name
+
+
+# The caches that always persist renders: name -> (directory, memory entries).
+_DISK_CACHES = {
+    "png": ("png", 4),
+    "thumbnail": ("thumbnails", 512),
+    "tile": ("tiles", 1024),
+}
+
+
+def _disk_cache(name: str) -> ExportCache:
+    """Return the disk cache ``name`` of :data:`_DISK_CACHES`."""
+    directory, max_entries = _DISK_CACHES[name]
+    return _export_cache_for(_cache_dir(directory), max_entries)
+
+
+@_shared(maxsize=2)
+def _svg_fragments_for(max_entries: int) -> FragmentCache:
+    from jsoncanvas.cache import FragmentCache
+
+    return FragmentCache(max_entries=max_entries)
+
+
+def _svg_fragments() -> FragmentCache | None:
+    """Return the per-element SVG fragment cache, or None when disabled.
+
+    Whole-document exports miss whenever a canvas changes; this cache keeps the
+    markup of each node and edge, so re-exporting after an edit only renders
+    the elements the edit touched. Sized by ``MCP_SVG_FRAGMENT_CACHE_SIZE``
+    (default 50000 fragments; ``0`` disables it).
+    """
+    max_entries = _svg_fragments_size()
+    return _svg_fragments_for(max_entries) if max_entries > 0 else None
+
+
+def _svg_fragments_size() -> int:
+    return int(os.environ.get("MCP_SVG_FRAGMENT_CACHE_SIZE", "50000"))
+
+
+def _thumbnail_cache() -> ExportCache:
+    """Return the thumbnail cache (on disk under ``OUTPUT_PATH/.cache``)."""
+    return _disk_cache("thumbnail")
+
+
+@_shared(maxsize=1)
+def _background() -> ThreadPoolExecutor:
+    """Single worker for deferred, best-effort work such as thumbnails."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="jsoncanvas-bg")
+
+
+def _thumbnail(version: str, cache: ExportCache, load: Callable[[], Canvas]) -> bytes:
+    """Return the cached thumbnail for ``version``, rendering ``load()`` on a miss."""
+    from jsoncanvas.cache import ExportCache
+    from jsoncanvas.export import to_thumbnail_svg
+
+    key = ExportCache.key(version, "thumbnail")
+    svg = cache.get(key)
+    if svg is None:
+        svg = to_thumbnail_svg(load()).encode("utf-8")
+        cache.put(key, svg)
+    return svg
+
+
+def _schedule_thumbnail(canvas: Canvas, version: str) -> None:
+    """Regenerate a written canvas's thumbnail off the request path.
+
+    The canvas is no longer mutated once written, so the worker can read it
+    safely; the cache is resolved now so the job is tied to this OUTPUT_PATH.
+    """
+    _background().submit(_thumbnail, version, _thumbnail_cache(), lambda: canvas)
+
+
+def _tile_cache() -> ExportCache:
+    """Return the SVG tile cache (on disk under ``OUTPUT_PATH/.cache``)."""
+    return _disk_cache("tile")
+
+
+# Spatially indexed renderers for recently tiled canvases, by content hash.
+# Indexing is O(canvas); keeping a few means each further tile costs only
+# O(visible elements).
+_TILE_RENDERERS: OrderedDict[str, TileRenderer] = OrderedDict()
+_TILE_RENDERERS_MAX = 4
+_TILE_RENDERERS_LOCK = threading.Lock()
+
+
+def _tile_renderer(version: str, raw: bytes) -> TileRenderer:
+    from jsoncanvas.tiles import TileRenderer
+
+    with _TILE_RENDERERS_LOCK:
+        renderer = _TILE_RENDERERS.get(version)
+        if renderer is not None:
+            _TILE_RENDERERS.move_to_end(version)
+            return renderer
+    renderer = TileRenderer(Canvas.from_dict(json.loads(raw)))
+    with _TILE_RENDERERS_LOCK:
+        _TILE_RENDERERS[version] = renderer
+        while len(_TILE_RENDERERS) > _TILE_RENDERERS_MAX:
+            _TILE_RENDERERS.popitem(last=False)
+    return renderer
+
+
+# Last content hash seen for each canvas file (by name). Caches are keyed by
+# content, so they are never stale, but when a file changes the renders of
+# its previous content can be released instead of aging out. Files with the
+# same content share renders, so each version counts the names it is current for.
+_VERSIONS: dict[str, str] = {}
+_VERSION_NAMES: dict[str, int] = {}
+_VERSIONS_LOCK = threading.Lock()
+
+
+def _canvas_version(target: Path, data: bytes | str) -> str:
+    """Return the version of ``target``'s content ``data`` and remember it."""
+    from jsoncanvas.cache import content_hash
+
+    version = content_hash(data)
+    _record_version(target.name, version)
+    return version
+
+
+def _record_version(name: str, version: str | None) -> bool:
+    """Remember ``name``'s current version (None: deleted); True if it changed.
+
+    Cached renders of the file's previous content are evicted in the
+    background, unless another file still has that content. The caches are
+    resolved now, tying the job to this OUTPUT_PATH.
+    """
+    with _VERSIONS_LOCK:
+        previous = _VERSIONS.pop(name, None)
+        if version is not None:
+            _VERSIONS[name] = version
+            _VERSION_NAMES[version] = _VERSION_NAMES.get(version, 0) + 1
+        unused = False
+        if previous is not None:
+            _VERSION_NAMES[previous] -= 1
+            if not _VERSION_NAMES[previous]:
+                del _VERSION_NAMES[previous]
+                unused = True
+    if unused:
+        caches = [_export_cache(), _png_cache(), _thumbnail_cache(), _tile_cache()]
+        _background().submit(_evict_version, previous, caches)
+    return previous != version
+
+
+def _evict_version(version: str, caches: list[ExportCache | None]) -> None:
+    """Drop every cached render of the canvas content ``version``."""
+    for cache in caches:
+        if cache is not None:
+            cache.evict(version)
+    with _TILE_RENDERERS_LOCK:
+        _TILE_RENDERERS.pop(version, None)
+
+
+# Callbacks run with the names of canvas files changed outside the server.
+_CHANGE_HOOKS: list[Callable[[set[str]], None]] = []
+
+
+def _on_canvas_change(hook: Callable[[set[str]], None]) -> Callable[[set[str]], None]:
+    """Register ``hook`` to run when the watcher reports changed canvas files."""
+    _CHANGE_HOOKS.append(hook)
+    return hook
+
+
+def _canvases_changed(names: set[str]) -> None:
+    """Run every change hook for ``names``; a failing hook does not stop the rest."""
+    for hook in _CHANGE_HOOKS:
+        try:
+            hook(names)
+        except Exception as exc:  # noqa: BLE001 - best effort, logged
+            print(
+                f"Canvas change hook {hook.__name__} failed: {exc!r}", file=sys.stderr
+            )
+
+
+@_on_canvas_change
+def _refresh_versions(names: set[str]) -> None:
+    """Re-hash changed files: evict renders of their old content, pre-render new.
+
+    Files whose content really changed are then published to subscribed
+    clients. The server's own writes also reach the watcher; their content
+    matches the recorded version, so they cost one read and hash and nothing
+    more (and are not notified twice).
+    """
+    from jsoncanvas.cache import content_hash
+
+    out = _output_dir().resolve()
+    # Canvases still held by the write-behind buffer are newer than any file
+    # content and will overwrite it when flushed.
+    names = names - _pending_names()
+    journal = _journal()
+    changed = set()
+    for name in names:
+        try:
+            # Versions are of the canvas as read, so with its journal replayed.
+            raw = journal.read(out / name) if journal is not None else None
+            if raw is None:
+                raw = (out / name).read_bytes()
+        except OSError:
+            _record_version(name, None)
+            changed.add(name)
+            continue
+        version = content_hash(raw)
+        if _record_version(name, version):
+            changed.add(name)
+            _background().submit(
+                _thumbnail,
+                version,
+                _thumbnail_cache(),
+                lambda raw=raw: Canvas.from_dict(json.loads(raw)),
+            )
+    _publish_changes(changed)
+
+
+@_on_canvas_change
+def _sync_store(names: set[str]) -> None:
+    """Re-import changed files into the canvas store, if one is enabled."""
+    store = _canvas_store()
+    if store is not None:
+        _sync_canvases(store, _output_dir().resolve(), names)
+
+
+def _sync_canvases(
+    store: CanvasStore, directory: Path, names: Iterable[str] | None = None
+) -> None:
+    """Import changed canvases into ``store`` as tools read them.
+
+    That is, within the file size limit and with edit journals replayed.
+    """
+    journal = _journal()
+    store.sync(
+        directory,
+        names,
+        max_bytes=_limits().max_file_bytes,
+        read=journal.read if journal is not None else None,
+    )
+
+
+def _start_watcher() -> CanvasWatcher:
+    """Watch OUTPUT_PATH for external edits and feed them to the change hooks."""
+    from jsoncanvas.watch import CanvasWatcher
+
+    debounce_ms = float(os.environ.get("MCP_WATCH_DEBOUNCE_MS", "200"))
+    watcher = CanvasWatcher(
+        _output_dir().resolve(), _canvases_changed, debounce=debounce_ms / 1000
+    ).start()
+    _WATCHING.set()
+    print(
+        f"Watching {watcher.directory} for changes ({watcher.backend})",
+        file=sys.stderr,
+    )
+    return watcher
+
+
+# Set once the watcher runs; it then keeps the canvas store current, and
+# searches need not re-check the directory first.
+_WATCHING = threading.Event()
+
+
+@_shared(maxsize=2)
+def _canvas_store_for(path: Path, directory: Path) -> CanvasStore | None:
+    from jsoncanvas.store import CanvasStore
+
+    try:
+        store = CanvasStore(path, SEARCH_FIELDS)
+    except RuntimeError as exc:
+        # Cached, so this is reported once; searches scan the files instead.
+        print(f"{exc} Searching the .canvas files instead.", file=sys.stderr)
+        return None
+    _sync_canvases(store, directory)
+    return store
+
+
+def _canvas_store() -> CanvasStore | None:
+    """Return the SQLite canvas store selected by ``MCP_STORE``, or None.
+
+    ``files`` (default) works on the ``.canvas`` files alone; ``sqlite`` also
+    indexes them in ``MCP_STORE_PATH`` (default ``OUTPUT_PATH/.jsoncanvas.db``)
+    so searches are indexed queries. The files stay authoritative: the store
+    is synced from them when opened and updated after every write. If this
+    Python's SQLite lacks FTS5 or its trigram tokenizer, a warning is printed
+    and None is returned, so the files are scanned as with ``files``.
+    """
+    mode = os.environ.get("MCP_STORE", "files")
+    if mode == "files":
+        return None
+    if mode != "sqlite":
+        raise ValueError(f"Unknown MCP_STORE mode: {mode!r}")
+    from jsoncanvas.store import DEFAULT_FILENAME
+
+    out = _output_dir().resolve()
+    path = os.environ.get("MCP_STORE_PATH")
+    return _canvas_store_for(Path(path) if path else out / DEFAULT_FILENAME, out)
+
+
+def _save_canvas(
+    target: Path,
+    canvas_dict: dict[str, Any],
+    text: str,
+    record: dict[str, Any] | None = None,
+    previous: bytes | None = None,
+) -> str:
+    """Persist a serialised canvas and return its version.
+
+    The file is written now and recorded in the canvas store; with
+    write-behind on, it is handed to the buffer to be written after the
+    burst of edits it belongs to. With journaling on, an edit ``record`` of
+    the ``previous`` content is appended to the canvas's journal instead of
+    rewriting the file.
+    """
+    buffer = _write_behind()
+    if buffer is not None:
+        raw = text.encode("utf-8")
+        version = _canvas_version(target, raw)
+        buffer.put(target.name, raw, version)
+        return version
+    journal = _journal()
+    if journal is not None:
+        appended = journal.save(target, text.encode("utf-8"), record, previous)
+        if appended:
+            _count_file_bytes("write", appended)
+    else:
+        _write_chunks(target, [text])
+    version = _canvas_version(target, text)
+    store = _canvas_store()
+    if store is not None:
+        store.put(target.name, canvas_dict, version, target.stat())
+    return version
+
+
+def _flush_canvas(
+    store: CanvasStore | None, target: Path, raw: bytes, version: str
+) -> None:
+    """Write a canvas held by the write-behind buffer (on the buffer's thread)."""
+    _write_chunks(target, [raw])
+    if store is not None:
+        store.put(target.name, json.loads(raw), version, target.stat())
+
+
+@_shared(maxsize=2)
+def _write_behind_for(
+    directory: Path, interval: float, max_bytes: int, store: CanvasStore | None
+) -> WriteBehindBuffer:
+    from jsoncanvas.writebehind import WriteBehindBuffer
+
+    buffer = WriteBehindBuffer(
+        directory,
+        functools.partial(_flush_canvas, store),
+        interval=interval,
+        max_delay=10 * interval,
+        max_bytes=max_bytes,
+    ).start()
+    atexit.register(buffer.close)
+    return buffer
+
+
+def _write_behind() -> WriteBehindBuffer | None:
+    """Return the write-behind buffer enabled by ``MCP_WRITE_BEHIND_MS``, or None.
+
+    With a positive interval, written canvases are kept in memory as the
+    source of truth and flushed to disk once they have not been written for
+    that long (and at least every ten intervals while edits keep coming), at
+    exit, and when ``MCP_WRITE_BEHIND_MAX_BYTES`` of canvases are held.
+    """
+    interval_ms = float(os.environ.get("MCP_WRITE_BEHIND_MS", "0"))
+    if interval_ms <= 0:
+        return None
+    max_bytes = int(os.environ.get("MCP_WRITE_BEHIND_MAX_BYTES", str(256 << 20)))
+    return _write_behind_for(
+        _output_dir().resolve(), interval_ms / 1000, max_bytes, _canvas_store()
+    )
+
+
+@_shared(maxsize=2)
+def _journal_for(max_records: int, max_bytes: int) -> CanvasJournal:
+    from jsoncanvas.journal import CanvasJournal
+
+    journal = CanvasJournal(
+        lambda target, content: _write_chunks(target, [content]),
+        max_records=max_records,
+        max_bytes=max_bytes,
+    )
+    atexit.register(journal.compact_all)
+    return journal
+
+
+def _journal() -> CanvasJournal | None:
+    """Return the edit journal enabled by ``MCP_JOURNAL``, or None.
+
+    Journaled edits append a record of what changed to a sidecar log; the
+    ``.canvas`` file is rewritten once the log holds
+    ``MCP_JOURNAL_MAX_RECORDS`` records or ``MCP_JOURNAL_MAX_BYTES`` bytes,
+    and at exit.
+    """
+    if os.environ.get("MCP_JOURNAL", "0").lower() not in {"1", "true", "yes"}:
+        return None
+    return _journal_for(
+        int(os.environ.get("MCP_JOURNAL_MAX_RECORDS", "100")),
+        int(os.environ.get("MCP_JOURNAL_MAX_BYTES", str(4 << 20))),
+    )
+
+
+def _settle_files() -> None:
+    """Bring every ``.canvas`` file up to date, for code that reads them directly.
+
+    Flushes the write-behind buffer and compacts edit journals.
+    """
+    buffer = _write_behind()
+    if buffer is not None:
+        buffer.flush()
+    journal = _journal()
+    if journal is not None:
+        journal.compact_all()
+
+
+def _pending_names() -> set[str]:
+    """Return the canvases written to the write-behind buffer but not to disk."""
+    buffer = _write_behind()
+    return buffer.pending() if buffer is not None else set()
+
+
+@_shared(maxsize=1)
+def _subscriptions() -> SubscriptionRegistry:
+    """Return the registry of client sessions subscribed to canvas resources."""
+    from jsoncanvas.subscriptions import SubscriptionRegistry
+
+    return SubscriptionRegistry()
+
+
+# The canvas names each output directory held when last listed (to detect
+# creates and deletes).
+_LISTED: dict[Path, frozenset[str]] = {}
+_LISTED_LOCK = threading.Lock()
+_CANVAS_URI_PREFIX = "canvas://file/"
+
+
+def _canvas_uri(name: str) -> str:
+    """Return the ``canvas://file/{name}`` resource URI of a canvas file."""
+    return _CANVAS_URI_PREFIX + quote(name)
+
+
+def _canvas_names(directory: Path) -> frozenset[str]:
+    names = {p.name for p in directory.glob("*.canvas")}
+    return frozenset(names | _pending_names())
+
+
+def _publish_changes(names: set[str]) -> None:
+    """Tell connected clients that the canvas files ``names`` changed.
+
+    Sessions subscribed to a file's ``canvas://file/`` URI get
+    ``resources/updated``; if a file was created or deleted, every known
+    session also gets ``resources/list_changed``. A no-op without clients.
+    """
+    subscriptions = _subscriptions()
+    if not names or not len(subscriptions):
+        return
+    subscriptions.resources_updated(_canvas_uri(name) for name in names)
+    out = _output_dir().resolve()
+    with _LISTED_LOCK:
+        listed = _LISTED.get(out)
+        if listed is None:
+            # Nobody has listed this directory yet, so any change may matter.
+            _LISTED[out] = _canvas_names(out)
+            membership_changed = True
+        else:
+            pending = _pending_names()
+            present = {n for n in names if n in pending or (out / n).is_file()}
+            current = (listed - names) | present
+            membership_changed = current != listed
+            _LISTED[out] = current
+    if membership_changed:
+        subscriptions.list_changed()
+
+
+def _png_cache() -> ExportCache:
+    """Return the PNG render cache (always on disk, under ``OUTPUT_PATH/.cache``).
+
+    Rasterising is far slower than re-reading a file, so rendered PNGs are
+    always persisted, keyed by canvas content hash and scale. Only a few are
+    held in memory since each can be megabytes.
+    """
+    return _disk_cache("png")
+
+
+def _diff_elements(
+    before: dict[str, Any], after: list[Any]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[str]]:
+    """Split ``after`` against the ``before`` id→element snapshot.
+
+    Returns ``(added, updated, removed_ids)``. Elements are compared by identity
+    first — ``Canvas.update_*`` swaps in a new object — so only replaced
+    elements are serialised to check whether the patch changed anything.
+    """
+    added: list[dict[str, Any]] = []
+    updated: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for element in after:
+        seen.add(element.id)
+        previous = before.get(element.id)
+        if previous is None:
+            added.append(element.to_dict())
+        elif previous is not element:
+            body = element.to_dict()
+            if body != previous.to_dict():
+                updated.append(body)
+    removed = [element_id for element_id in before if element_id not in seen]
+    return added, updated, removed
+
+
+# --------------------------------------------------------------------------- #
+# Metrics
+# --------------------------------------------------------------------------- #
+# Served as Prometheus text at /metrics (Streamable HTTP) and canvas://metrics.
+_METRICS = MetricsRegistry()
+_TOOL_CALLS = _METRICS.counter(
+    "jsoncanvas_tool_calls_total", "Tool calls by outcome.", ["tool", "status"]
+)
+_TOOL_SECONDS = _METRICS.histogram(
+    "jsoncanvas_tool_duration_seconds",
+    "Tool call latency, including argument validation and result serialisation.",
+    ["tool"],
+)
+_PAYLOAD_BYTES = _METRICS.counter(
+    "jsoncanvas_payload_bytes_total",
+    "Tool call payload bytes: request messages in (as the transport received "
+    "them), result content blocks out.",
+    ["tool", "direction"],
+)
+_FILE_BYTES = _METRICS.counter(
+    "jsoncanvas_file_bytes_total",
+    "Bytes of canvas and export files read and written.",
+    ["tool", "op"],
+)
+_ELEMENTS = _METRICS.counter(
+    "jsoncanvas_elements_total",
+    "Canvas nodes and edges parsed or built.",
+    ["tool", "kind"],
+)
+# The tool whose call is running; I/O outside a tool call (resource reads,
+# background renders) is attributed to "none".
+_CURRENT_TOOL: ContextVar[str] = ContextVar("jsoncanvas_tool", default="none")
+
+
+def _count_file_bytes(op: Literal["read", "write"], size: int) -> None:
+    _FILE_BYTES.inc(size, tool=_CURRENT_TOOL.get(), op=op)
+
+
+def _count_elements(nodes: int, edges: int) -> None:
+    tool = _CURRENT_TOOL.get()
+    _ELEMENTS.inc(nodes, tool=tool, kind="node")
+    _ELEMENTS.inc(edges, tool=tool, kind="edge")
+    profiling = _profiling()
+    if profiling is not None:
+        profiling.note(nodes=nodes, edges=edges)
+
+
+def _profiling() -> ModuleType | None:
+    """Return :mod:`jsoncanvas.profiling` if anything has imported it.
+
+    A profiler can only have been installed by importing the module, so a
+    server that never profiles does not load it (or tracemalloc) at all.
+    """
+    return sys.modules.get("jsoncanvas.profiling")
+
+
+def _content_bytes(result: CallToolResult) -> int:
+    size = 0
+    for block in result.content:
+        if isinstance(block, TextContent):
+            text = block.text
+            # isascii() is O(1); only non-ASCII text needs encoding to count.
+            size += len(text) if text.isascii() else len(text.encode("utf-8"))
+        elif isinstance(block, ImageContent):
+            size += len(block.data)
+    return size
+
+
+def _instrument_tool_calls() -> None:
+    """Check limits on, time, count, trace and profile every ``tools/call``.
+
+    Wraps the protocol-level handler rather than each tool function, so every
+    registered tool is covered and the measured latency and sizes are those
+    the client sees (validation and serialisation included). Each call is the
+    root ``tool.<name>`` span of the stages it runs.
+
+    Arguments over the configured node, edge and text limits are refused
+    here, before argument validation builds anything from them, with a
+    JSON-RPC ``INVALID_PARAMS`` error whose data names the limit. Whole
+    messages over ``MCP_MAX_REQUEST_BYTES`` never get this far: the HTTP and
+    stdio transports refuse them before parsing.
+    """
+    handlers = mcp._mcp_server.request_handlers
+    call_tool = handlers[CallToolRequest]
+
+    async def handler(request: CallToolRequest) -> ServerResult:
+        from jsoncanvas.transport import message_size
+
+        name = request.params.name
+        token = _CURRENT_TOOL.set(name)
+        # The size the transport read, not a re-encoding of the parsed arguments.
+        try:
+            size_in = message_size(mcp._mcp_server.request_context.request)
+        except LookupError:  # called outside a session (benchmarks, tests)
+            size_in = None
+        if size_in is not None:
+            _PAYLOAD_BYTES.inc(size_in, tool=name, direction="in")
+        status = "error"
+        start = time.perf_counter()
+        try:
+            try:
+                _limits().check_arguments(request.params.arguments or {})
+            except LimitExceededError as exc:
+                status = "rejected"
+                raise McpError(
+                    ErrorData(code=exc.code, message=exc.message, data=exc.data)
+                ) from exc
+            profiling = _profiling()
+            with (
+                profiling.call(name, request.params.arguments or {})
+                if profiling is not None
+                else contextlib.nullcontext() as profile,
+                tracing.span("tool." + name) as span,
+            ):
+                response = await call_tool(request)
+                result = response.root
+                if isinstance(result, CallToolResult):
+                    status = "error" if result.isError else "ok"
+                    size = _content_bytes(result)
+                    _PAYLOAD_BYTES.inc(size, tool=name, direction="out")
+                    span.set(status=status, bytes_out=size)
+                    if profile is not None:
+                        profile.set(status=status, bytes_out=size)
+            return response
+        finally:
+            _TOOL_SECONDS.observe(time.perf_counter() - start, tool=name)
+            _TOOL_CALLS.inc(tool=name, status=status)
+            _CURRENT_TOOL.reset(token)
+
+    handlers[CallToolRequest] = handler
+
+
+_instrument_tool_calls()
+
+
+@_METRICS.collector
+def _cache_metrics() -> list[Counter]:
+    """Report the hit and miss totals each cache already keeps.
+
+    Only caches that were already built are reported, so a scrape neither
+    creates OUTPUT_PATH nor builds caches nothing has used.
+    """
+    hits = Counter("jsoncanvas_cache_hits_total", "Cache lookups that hit.", ["cache"])
+    misses = Counter(
+        "jsoncanvas_cache_misses_total", "Cache lookups that missed.", ["cache"]
+    )
+    ratio = Gauge(
+        "jsoncanvas_cache_hit_ratio", "Hits over lookups since start.", ["cache"]
+    )
+    export = _export_cache_config()
+    caches: dict[str, ExportCache | FragmentCache | None] = {
+        "export": _export_cache_for.peek(*export) if export is not None else None,
+        "svg_fragment": _svg_fragments_for.peek(_svg_fragments_size()),
+    }
+    for name, (directory, max_entries) in _DISK_CACHES.items():
+        caches[name] = _export_cache_for.peek(_cache_dir(directory), max_entries)
+    for name, cache in caches.items():
+        if cache is None:
+            continue
+        hits.inc(cache.hits, cache=name)
+        misses.inc(cache.misses, cache=name)
+        lookups = cache.hits + cache.misses
+        if lookups:
+            ratio.set(cache.hits / lookups, cache=name)
+    return [hits, misses, ratio]
 
 
 # --------------------------------------------------------------------------- #
@@ -246,16 +1546,17 @@ def create_canvas(
     canvas_dict = canvas.to_dict()
     date_prefix = datetime.now().strftime("%Y-%m-%d")
     target = _safe_target(f"{date_prefix}-{filename}")
-    target.write_text(json.dumps(canvas_dict, indent=2))
+    text = _serialise(canvas_dict)
+    version = _save_canvas(target, canvas_dict, text)
     print(f"Wrote canvas to {target}", file=sys.stderr)
-    return CreateCanvasResult(
+    _schedule_thumbnail(canvas, version)
+    _publish_changes({target.name})
+    return CreateCanvasResult.model_construct(
         path=str(target),
         node_count=len(canvas.nodes),
         edge_count=len(canvas.edges),
-        canvas=CanvasDocument(
-            nodes=canvas_dict.get("nodes", []),
-            edges=canvas_dict.get("edges", []),
-        ),
+        version=version,
+        canvas=_canvas_document(canvas_dict, text),
     )
 
 
@@ -291,14 +1592,10 @@ def read_canvas(filename: str) -> CanvasDocument:
         filename: Name of the canvas file under OUTPUT_PATH (with or without the
             ``.canvas`` extension).
     """
-    target = _safe_target(filename)
-    if not target.is_file():
-        raise ValueError(f"Canvas not found: {target.name}")
-    data = json.loads(target.read_text())
-    return CanvasDocument(
-        nodes=data.get("nodes", []),
-        edges=data.get("edges", []),
-    )
+    _, raw = _read_canvas_bytes(filename)
+    data = json.loads(raw)
+    _count_elements(len(data.get("nodes", [])), len(data.get("edges", [])))
+    return _canvas_document(data, raw.decode("utf-8"))
 
 
 @mcp.tool(
@@ -307,7 +1604,7 @@ def read_canvas(filename: str) -> CanvasDocument:
 )
 def list_canvases() -> list[str]:
     """Return the names of ``.canvas`` files in the output directory."""
-    return sorted(p.name for p in _output_dir().glob("*.canvas"))
+    return sorted(_canvas_names(_output_dir()))
 
 
 @mcp.tool(
@@ -317,7 +1614,8 @@ def list_canvases() -> list[str]:
         "one atomic write. Operations apply in order — add_nodes, update_nodes, "
         "add_edges, update_edges, remove_edge_ids, remove_node_ids — and removing a "
         "node also removes its connected edges. If any operation fails the file is "
-        "left unchanged. Returns the updated canvas."
+        "left unchanged. Returns the updated canvas, or with response='delta' "
+        "only the added, updated, and removed elements plus the new version."
     ),
     meta=UI_TOOL_META,
 )
@@ -329,6 +1627,7 @@ def edit_canvas(
     add_edges: list[dict[str, Any]] | None = None,
     update_edges: list[dict[str, Any]] | None = None,
     remove_edge_ids: list[str] | None = None,
+    response: Literal["full", "delta"] = "full",
 ) -> CreateCanvasResult:
     """Apply a batch of edits to a stored canvas and persist the result.
 
@@ -347,56 +1646,198 @@ def edit_canvas(
             plus optional ``fromSide``/``toSide``/``color``/``label``).
         update_edges: Partial edge objects to patch; each must include ``id``.
         remove_edge_ids: Edge IDs to remove.
+        response: ``full`` (default) returns the whole updated canvas for UI
+            re-rendering; ``delta`` returns only the changed elements, which keeps
+            small edits to large canvases cheap.
     """
-    target, canvas = _load_canvas(filename)
+    target, raw = _read_canvas_bytes(filename)
+    canvas = _parse_canvas(raw)
+    nodes_before = {node.id: node for node in canvas.nodes}
+    edges_before = {edge.id: edge for edge in canvas.edges}
+    _apply_edits(
+        canvas,
+        add_nodes=add_nodes,
+        update_nodes=update_nodes,
+        remove_node_ids=remove_node_ids,
+        add_edges=add_edges,
+        update_edges=update_edges,
+        remove_edge_ids=remove_edge_ids,
+    )
 
-    for node_data in add_nodes or []:
-        canvas.add_node(_node_from_dict(node_data))
+    canvas_dict = canvas.to_dict()
+    text = _serialise(canvas_dict)
+    delta = None
+    if response == "delta" or _journal() is not None:
+        added_nodes, updated_nodes, removed_node_ids = _diff_elements(
+            nodes_before, canvas.nodes
+        )
+        added_edges, updated_edges, removed_edge_ids = _diff_elements(
+            edges_before, canvas.edges
+        )
+        delta = CanvasDelta.model_construct(
+            added_nodes=added_nodes,
+            updated_nodes=updated_nodes,
+            removed_node_ids=removed_node_ids,
+            added_edges=added_edges,
+            updated_edges=updated_edges,
+            removed_edge_ids=removed_edge_ids,
+        )
+    record = None
+    if delta is not None:
+        # The journal record uses the edit parameter names of the changes.
+        record = {
+            "add_nodes": delta.added_nodes,
+            "update_nodes": delta.updated_nodes,
+            "remove_node_ids": delta.removed_node_ids,
+            "add_edges": delta.added_edges,
+            "update_edges": delta.updated_edges,
+            "remove_edge_ids": delta.removed_edge_ids,
+        }
+        record = {key: value for key, value in record.items() if value}
+    version = _save_canvas(target, canvas_dict, text, record, raw)
+    print(f"Edited canvas {target}", file=sys.stderr)
+    _schedule_thumbnail(canvas, version)
+    _publish_changes({target.name})
+    result = CreateCanvasResult.model_construct(
+        path=str(target),
+        node_count=len(canvas.nodes),
+        edge_count=len(canvas.edges),
+        version=version,
+    )
+    if response == "delta":
+        result.delta = delta
+    else:
+        result.canvas = _canvas_document(canvas_dict, text)
+    return result
 
-    for patch in update_nodes or []:
-        node_id = patch.get("id")
-        existing = canvas.get_node(node_id) if node_id else None
-        if existing is None:
-            raise ValueError(f"No node with id {node_id!r} to update")
-        # A patch merges onto the existing node, preserving its type. Changing the
-        # type must supply a complete node — merging would carry the old type's
-        # fields (e.g. "text") into the new type's constructor and fail.
-        if "type" in patch and patch["type"] != existing.type:
-            merged = patch
-        else:
-            merged = {**existing.to_dict(), **patch}
-        canvas.update_node(_node_from_dict(merged))
 
-    for edge_data in add_edges or []:
-        canvas.add_edge(Edge.from_dict(edge_data))
+for _name in ("create_canvas", "read_canvas", "edit_canvas"):
+    _serve_prebuilt(_name)
 
-    for patch in update_edges or []:
-        edge_id = patch.get("id")
-        existing = canvas.get_edge(edge_id) if edge_id else None
-        if existing is None:
-            raise ValueError(f"No edge with id {edge_id!r} to update")
-        canvas.update_edge(Edge.from_dict({**existing.to_dict(), **patch}))
 
-    for edge_id in remove_edge_ids or []:
-        if canvas.remove_edge(edge_id) is None:
-            raise ValueError(f"No edge with id {edge_id!r} to remove")
+@mcp.tool(
+    title="Batch Canvas Operations",
+    description=(
+        "Create and edit many canvases in one call. Each operation is "
+        "{op: 'create'|'edit', filename, ...} with create_canvas fields (nodes, "
+        "edges) or edit_canvas fields (add_nodes, update_nodes, remove_node_ids, "
+        "add_edges, update_edges, remove_edge_ids). Operations on the same file "
+        "run in order and are all-or-nothing for that file; different files are "
+        "processed in parallel. Returns a compact result per operation."
+    ),
+)
+def batch_canvas_ops(operations: list[CanvasOperation]) -> BatchCanvasOpsResult:
+    """Apply create and edit operations across several canvas files.
+
+    Args:
+        operations: Operations to apply, in order. An edit may target a canvas
+            created earlier in the same batch by its full dated filename.
+    """
+    date_prefix = datetime.now().strftime("%Y-%m-%d")
+    results: list[CanvasOperationResult | None] = [None] * len(operations)
+    groups: dict[Path, list[tuple[int, CanvasOperation]]] = {}
+    for index, operation in enumerate(operations):
+        try:
+            if operation.op == "create":
+                target = _safe_target(f"{date_prefix}-{operation.filename}")
+            else:
+                target = _safe_target(operation.filename)
+        except ValueError as exc:
+            results[index] = CanvasOperationResult(
+                index=index, op=operation.op, ok=False, error=str(exc)
+            )
+            continue
+        groups.setdefault(target, []).append((index, operation))
+
+    # Files are independent, so each group runs on its own worker; within a
+    # group the operations apply in order to one in-memory canvas.
+    # Each job runs in a copy of this context so its I/O is counted for this tool.
+    workers = min(8, len(groups)) or 1
+    jobs = [(copy_context(), item) for item in groups.items()]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for group in pool.map(lambda job: job[0].run(_apply_file_ops, *job[1]), jobs):
+            for result in group:
+                results[result.index] = result
+
+    done = [result for result in results if result is not None]
+    succeeded = sum(result.ok for result in done)
+    return BatchCanvasOpsResult(
+        succeeded=succeeded, failed=len(done) - succeeded, results=done
+    )
 
-    for node_id in remove_node_ids or []:
-        if canvas.remove_node(node_id) is None:
-            raise ValueError(f"No node with id {node_id!r} to remove")
 
+def _apply_file_ops(
+    target: Path, operations: list[tuple[int, CanvasOperation]]
+) -> list[CanvasOperationResult]:
+    """Apply one file's operations, writing it only if all of them succeed."""
+    canvas: Canvas | None = None
+    failed: tuple[int, str] | None = None
+    for index, operation in operations:
+        try:
+            if operation.op == "create":
+                canvas = _build_canvas(operation.nodes or [], operation.edges)
+                continue
+            if canvas is None:
+                _, raw = _read_canvas_bytes(target.name)
+                canvas = _parse_canvas(raw)
+            _apply_edits(
+                canvas,
+                add_nodes=operation.add_nodes,
+                update_nodes=operation.update_nodes,
+                remove_node_ids=operation.remove_node_ids,
+                add_edges=operation.add_edges,
+                update_edges=operation.update_edges,
+                remove_edge_ids=operation.remove_edge_ids,
+            )
+        except Exception as exc:  # noqa: BLE001 - reported per operation
+            failed = (index, str(exc))
+            break
+
+    if failed is not None:
+        failed_index, message = failed
+        return [
+            CanvasOperationResult(
+                index=index,
+                op=operation.op,
+                path=str(target),
+                ok=False,
+                error=(
+                    message
+                    if index == failed_index
+                    else f"Not applied: operation {failed_index} on this file failed"
+                ),
+            )
+            for index, operation in operations
+        ]
+
+    assert canvas is not None  # every group starts with a create or a load
     canvas_dict = canvas.to_dict()
-    target.write_text(json.dumps(canvas_dict, indent=2))
-    print(f"Edited canvas {target}", file=sys.stderr)
-    return CreateCanvasResult(
-        path=str(target),
-        node_count=len(canvas.nodes),
-        edge_count=len(canvas.edges),
-        canvas=CanvasDocument(
-            nodes=canvas_dict.get("nodes", []),
-            edges=canvas_dict.get("edges", []),
-        ),
-    )
+    text = _serialise(canvas_dict)
+    version = _save_canvas(target, canvas_dict, text)
+    print(f"Wrote canvas to {target}", file=sys.stderr)
+    _schedule_thumbnail(canvas, version)
+    _publish_changes({target.name})
+    return [
+        CanvasOperationResult(
+            index=index,
+            op=operation.op,
+            path=str(target),
+            ok=True,
+            version=version,
+            node_count=len(canvas.nodes),
+            edge_count=len(canvas.edges),
+        )
+        for index, operation in operations
+    ]
+
+
+# Export format -> (file extension, MIME type).
+_EXPORT_FORMATS: dict[str, tuple[str, str]] = {
+    "markdown": (".md", "text/markdown"),
+    "svg": (".svg", "image/svg+xml"),
+    "svgz": (".svgz", "image/svg+xml"),
+    "png": (".png", "image/png"),
+}
 
 
 @mcp.tool(
@@ -404,29 +1845,196 @@ def edit_canvas(
     description=(
         "Export a stored canvas to another format: 'markdown' (an outline that "
         "follows the edges) or 'svg' (a standalone vector image). SVG renders each "
-        "node's title line only."
+        "node's title line only. With output='file' the export is streamed to "
+        "<name>.md / <name>.svg under OUTPUT_PATH and only its path is returned. "
+        "'png' (optional 'png' extra) rasterises the SVG at `scale`, writes "
+        "<name>.png, and returns it as an image. compact=True emits a smaller SVG "
+        "with shared styles; 'svgz' writes it gzip-compressed to <name>.svgz."
     ),
 )
-def export_canvas(filename: str, format: Literal["markdown", "svg"]) -> ExportResult:
-    """Export a stored canvas to Markdown or SVG.
+def export_canvas(
+    filename: str,
+    format: Literal["markdown", "svg", "svgz", "png"],
+    output: Literal["inline", "file"] = "inline",
+    scale: float = 2.0,
+    compact: bool = False,
+) -> ExportResult:
+    """Export a stored canvas to Markdown, SVG, gzip-compressed SVG, or PNG.
 
     Args:
         filename: Name of the canvas file under OUTPUT_PATH.
-        format: ``markdown`` or ``svg``.
+        format: ``markdown``, ``svg``, ``svgz``, or ``png``.
+        output: ``inline`` (default) returns the document as ``content``;
+            ``file`` writes it next to the canvas incrementally and returns its
+            ``path`` instead, so large exports are never held in memory whole.
+            SVGZ and PNG exports are always written to a file.
+        scale: PNG only; raster multiplier, clamped to 1.0-3.0.
+        compact: SVG only; emit class-based styles and integer coordinates
+            for a smaller document that renders the same. Always on for SVGZ.
     """
-    _, canvas = _load_canvas(filename)
+    # Imported on first use: most sessions never export, and stdio clients that
+    # spawn a server per session pay for every module loaded at startup.
+    from jsoncanvas.batch import export_key
+    from jsoncanvas.export import iter_markdown, iter_svg
+
+    target, raw = _read_canvas_bytes(filename)
+    extension, mime_type = _EXPORT_FORMATS[format]
+    if format == "png":
+        return _export_png(target, raw, scale)
     if format == "markdown":
+        options: dict[str, Any] = {"title": target.stem}
+    else:
+        options = {"compact": True} if compact or format == "svgz" else {}
+
+    # Exports are keyed by the file's content hash, so an edit invalidates them
+    # implicitly and an unchanged canvas is never re-parsed or re-rendered.
+    # SVGZ shares the compact SVG entry and is compressed on the way out.
+    cache = _export_cache()
+    key = export_key(_canvas_version(target, raw), format, target.stem, compact)
+    cached = cache.get(key) if cache is not None else None
+    if cached is None:
+        canvas = _parse_canvas(raw)
+        if format == "markdown":
+            chunks = iter_markdown(canvas, **options)
+        else:
+            chunks = iter_svg(canvas, fragments=_svg_fragments(), **options)
+    else:
+        chunks = iter([cached.decode("utf-8")])
+
+    if format == "svgz":
+        out = target.with_suffix(extension)
+        _write_chunks(out, _gzip_chunks(chunks))
+        return ExportResult(
+            format=format, mime_type=mime_type, content="", path=str(out)
+        )
+    if output == "file":
+        # Streamed straight to disk; the cache is only filled by inline exports,
+        # which already hold the whole document.
+        out = target.with_suffix(extension)
+        _write_chunks(out, chunks)
         return ExportResult(
-            format="markdown",
-            mime_type="text/markdown",
-            content=to_markdown(canvas, title=_safe_target(filename).stem),
+            format=format, mime_type=mime_type, content="", path=str(out)
+        )
+
+    content = "".join(chunks)
+    if cache is not None and cached is None:
+        cache.put(key, content.encode("utf-8"))
+    return ExportResult(format=format, mime_type=mime_type, content=content)
+
+
+def _export_png(target: Path, raw: bytes, scale: float) -> ExportResult:
+    """Rasterise a stored canvas, reusing a cached render of the same content."""
+    from jsoncanvas import raster
+    from jsoncanvas.cache import ExportCache
+    from jsoncanvas.export import to_svg
+
+    scale = raster.clamp_scale(scale)
+    cache = _png_cache()
+    key = ExportCache.key(_canvas_version(target, raw), "png", scale=scale)
+    png = cache.get(key)
+    if png is None:
+        svg = to_svg(_parse_canvas(raw), fragments=_svg_fragments())
+        timeout = float(os.environ.get("MCP_RASTER_TIMEOUT", "30"))
+        png = raster.render_png(svg, scale=scale, timeout=timeout)
+        cache.put(key, png)
+    out = target.with_suffix(".png")
+    _write_chunks(out, [png])
+    # The image itself is not base64 in structured output, which stays small.
+    result = ExportResult(
+        format="png", mime_type="image/png", content="", path=str(out)
+    )
+    result._png = png
+    return result
+
+
+def _with_image_content(fn: Callable[..., ExportResult]) -> Callable[..., Any]:
+    """Adapt an export handler so PNG results also carry an MCP image block."""
+
+    @functools.wraps(fn)
+    def handler(*args: Any, **kwargs: Any) -> Any:
+        result = fn(*args, **kwargs)
+        if result._png is None:
+            return result
+        return CallToolResult(
+            content=[
+                TextContent(type="text", text=result.model_dump_json(indent=2)),
+                ImageContent(
+                    type="image",
+                    data=base64.b64encode(result._png).decode("ascii"),
+                    mimeType="image/png",
+                ),
+            ],
+            structuredContent=result.model_dump(mode="json"),
         )
-    return ExportResult(format="svg", mime_type="image/svg+xml", content=to_svg(canvas))
+
+    return handler
+
+
+_adapt_tool("export_canvas", _with_image_content)
+
+
+@mcp.tool(
+    title="Batch Export Canvases",
+    description=(
+        "Export many stored canvases to one or more formats ('markdown', 'svg', "
+        "'svgz') in one call. Select canvases by filename glob (`pattern`, default "
+        "all) or an explicit `filenames` list. Outputs are rendered on a process "
+        "pool and written to `target_dir` under OUTPUT_PATH with a manifest.json; "
+        "canvases unchanged since the previous batch are skipped."
+    ),
+)
+def batch_export(
+    formats: list[Literal["markdown", "svg", "svgz"]],
+    pattern: str = "*.canvas",
+    filenames: list[str] | None = None,
+    target_dir: str = "exports",
+    compact: bool = False,
+) -> BatchExportResult:
+    """Export every selected canvas to every format in ``formats``.
+
+    Args:
+        formats: Formats to produce for each canvas.
+        pattern: Filename glob matched against canvases in OUTPUT_PATH; ignored
+            when ``filenames`` is given.
+        filenames: Explicit canvas filenames to export.
+        target_dir: Output directory, relative to OUTPUT_PATH.
+        compact: Emit compact SVG for the ``svg`` format.
+    """
+    from jsoncanvas import batch
+
+    out = _output_dir().resolve()
+    directory = (out / target_dir).resolve()
+    if directory == out or out not in directory.parents:
+        raise ValueError("target_dir must be a subdirectory of the output directory")
+    _settle_files()  # the exporter reads the files
+    if filenames is not None:
+        sources = [_safe_target(name) for name in filenames]
+    else:
+        sources = [out / name for name in fnmatch.filter(list_canvases(), pattern)]
+    workers = os.environ.get("MCP_BATCH_WORKERS")
+    manifest = batch.batch_export(
+        sources,
+        formats,
+        directory,
+        compact=compact,
+        cache=_export_cache(),
+        max_workers=int(workers) if workers else None,
+    )
+    entries = [BatchExportEntry(**entry) for entry in manifest["entries"]]
+    counts = {status: 0 for status in ("rendered", "cached", "skipped", "error")}
+    for entry in entries:
+        counts[entry.status] += 1
+    return BatchExportResult(
+        target_dir=str(directory),
+        manifest_path=str(directory / batch.MANIFEST_NAME),
+        rendered=counts["rendered"],
+        cached=counts["cached"],
+        skipped=counts["skipped"],
+        failed=counts["error"],
+        entries=entries,
+    )
 
 
-# Fields searched per element kind (camelCase JSON keys).
-_NODE_SEARCH_FIELDS = ("text", "label", "file", "subpath", "url", "id")
-_EDGE_SEARCH_FIELDS = ("label", "id")
 _SNIPPET_MAX = 200
 
 
@@ -446,28 +2054,49 @@ def _snippet(value: str) -> str:
 def search_canvases(query: str, filename: str | None = None) -> SearchResult:
     """Find nodes and edges whose text matches ``query``.
 
+    With ``MCP_STORE=sqlite`` the search is one full-text query against the
+    canvas store instead of a scan of every file.
+
     Args:
         query: Case-insensitive substring to search for.
         filename: Optional single canvas to restrict the search to (otherwise all).
     """
+    store = _canvas_store()
+    if store is not None:
+        return _search_store(store, query, filename)
+    buffer = _write_behind()
+    journal = _journal()
     if filename is not None:
         targets = [_safe_target(filename)]
     else:
-        targets = sorted(_output_dir().glob("*.canvas"))
+        out = _output_dir()
+        targets = sorted({*out.glob("*.canvas"), *(out / n for n in _pending_names())})
 
     needle = query.casefold()
     matches: list[SearchMatch] = []
+    limits = _limits()
     for target in targets:
-        if not target.is_file():
-            continue
+        raw = buffer.get(target.name) if buffer is not None else None
+        if raw is None:
+            if not target.is_file():
+                continue
+            try:
+                # Oversized canvases are skipped like unreadable ones.
+                limits.check_file_bytes(target.stat().st_size, target.name)
+                raw = journal.read(target) if journal is not None else None
+                if raw is None:
+                    raw = target.read_bytes()
+                    _count_file_bytes("read", len(raw))
+                else:
+                    limits.check_file_bytes(len(raw), target.name)
+            except (OSError, LimitExceededError):
+                continue
         try:
-            data = json.loads(target.read_text())
-        except (OSError, json.JSONDecodeError):
+            data = json.loads(raw)
+        except json.JSONDecodeError:
             continue
-        for kind, fields in (
-            ("node", _NODE_SEARCH_FIELDS),
-            ("edge", _EDGE_SEARCH_FIELDS),
-        ):
+        _count_elements(len(data.get("nodes", [])), len(data.get("edges", [])))
+        for kind, fields in SEARCH_FIELDS.items():
             for element in data.get(f"{kind}s", []):
                 for field in fields:
                     value = element.get(field)
@@ -484,6 +2113,30 @@ def search_canvases(query: str, filename: str | None = None) -> SearchResult:
     return SearchResult(matches=matches)
 
 
+def _search_store(store: CanvasStore, query: str, filename: str | None) -> SearchResult:
+    """Run ``search_canvases`` against the canvas store."""
+    name = None if filename is None else _safe_target(filename).name
+    buffer = _write_behind()
+    if buffer is not None:
+        buffer.flush(None if name is None else [name])
+    if not _WATCHING.is_set():
+        # Without the watcher, pick up files changed by other programs first
+        # (one stat per file; only changed files are re-read).
+        _sync_canvases(store, _output_dir().resolve(), None if name is None else [name])
+    return SearchResult(
+        matches=[
+            SearchMatch(
+                filename=match.filename,
+                kind=match.kind,
+                id=match.id,
+                field=match.field,
+                snippet=_snippet(match.value),
+            )
+            for match in store.search(query, name)
+        ]
+    )
+
+
 # --------------------------------------------------------------------------- #
 # Resources
 # --------------------------------------------------------------------------- #
@@ -561,6 +2214,181 @@ def canvas_viewer() -> str:
     return _load_ui_html()
 
 
+@mcp.custom_route("/ui/viewer.html", methods=["GET", "HEAD"])
+async def canvas_viewer_http(request: Request) -> Response:
+    """Serve the viewer bundle over HTTP with ETag revalidation and compression.
+
+    Hosts that fetch the viewer directly (rather than through ``resources/read``)
+    get a ``304`` when their cached copy is current, and otherwise the smallest
+    precompressed variant their ``Accept-Encoding`` allows.
+    """
+    from starlette.responses import Response
+
+    bundle = _ui_bundle()
+    headers = {
+        "ETag": bundle.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if bundle.etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    accepted = {
+        token.split(";")[0].strip().lower()
+        for token in request.headers.get("accept-encoding", "").split(",")
+    }
+    if bundle.brotli is not None and "br" in accepted:
+        body, headers["Content-Encoding"] = bundle.brotli, "br"
+    elif "gzip" in accepted:
+        body, headers["Content-Encoding"] = bundle.gzip, "gzip"
+    else:
+        body = bundle.html.encode("utf-8")
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
+
+@mcp.resource(
+    "canvas://thumbnail/{name}",
+    title="Canvas Thumbnail",
+    description=(
+        "A small, boxes-only SVG preview of a stored canvas, cached by content "
+        "and refreshed in the background after create_canvas/edit_canvas."
+    ),
+    mime_type="image/svg+xml",
+)
+def canvas_thumbnail(name: str) -> str:
+    """Return the thumbnail SVG for the canvas file ``name`` (percent-encoded)."""
+    target, raw = _read_canvas_bytes(unquote(name))
+    svg = _thumbnail(
+        _canvas_version(target, raw),
+        _thumbnail_cache(),
+        lambda: Canvas.from_dict(json.loads(raw)),
+    )
+    return svg.decode("utf-8")
+
+
+@mcp.resource(
+    "canvas://tiles/{name}/{z}/{x}/{y}",
+    title="Canvas SVG Tile",
+    description=(
+        "One 256px level-of-detail SVG tile of a stored canvas. Zoom 0 shows the "
+        "whole canvas in one tile and each level doubles the resolution; low zoom "
+        "levels drop text, merge tiny nodes, and skip short edges."
+    ),
+    mime_type="image/svg+xml",
+)
+def canvas_tile(name: str, z: str, x: str, y: str) -> str:
+    """Return SVG tile ``z/x/y`` for the canvas file ``name`` (percent-encoded)."""
+    from jsoncanvas.cache import ExportCache
+
+    try:
+        zoom, column, row = int(z), int(x), int(y)
+    except ValueError:
+        raise ValueError(
+            f"Tile address must be integers z/x/y, got {z}/{x}/{y}"
+        ) from None
+    target, raw = _read_canvas_bytes(unquote(name))
+    version = _canvas_version(target, raw)
+    cache = _tile_cache()
+    key = ExportCache.key(version, "tile", z=zoom, x=column, y=row)
+    svg = cache.get(key)
+    if svg is None:
+        tile = _tile_renderer(version, raw).render_tile(zoom, column, row)
+        svg = tile.encode("utf-8")
+        cache.put(key, svg)
+    return svg.decode("utf-8")
+
+
+@mcp.resource(
+    _CANVAS_URI_PREFIX + "{name}",
+    title="Canvas File",
+    description=(
+        "The JSON of a stored .canvas file. Subscribe (resources/subscribe) to get "
+        "notifications/resources/updated whenever it is written by a tool or, with "
+        "the file watcher on, changed by another program."
+    ),
+    mime_type="application/json",
+)
+def canvas_file(name: str) -> str:
+    """Return the stored canvas file ``name`` as JSON text."""
+    _, raw = _read_canvas_bytes(unquote(name))
+    return raw.decode("utf-8")
+
+
+async def _list_resources() -> list[Resource]:
+    """List the static resources plus one ``canvas://file/`` resource per canvas.
+
+    Also registers the session for ``list_changed`` notifications and records
+    the listing they are relative to.
+    """
+    _subscriptions().register(mcp._mcp_server.request_context.session)
+    out = _output_dir().resolve()
+    names = _canvas_names(out)
+    with _LISTED_LOCK:
+        _LISTED[out] = names
+    return await mcp.list_resources() + [
+        Resource(
+            uri=_canvas_uri(name),
+            name=name,
+            mimeType="application/json",
+        )
+        for name in sorted(names)
+    ]
+
+
+async def _subscribe(uri: AnyUrl) -> None:
+    _subscriptions().subscribe(mcp._mcp_server.request_context.session, str(uri))
+
+
+async def _unsubscribe(uri: AnyUrl) -> None:
+    _subscriptions().unsubscribe(mcp._mcp_server.request_context.session, str(uri))
+
+
+def _get_capabilities(*args: Any, **kwargs: Any) -> ServerCapabilities:
+    """Advertise resource subscriptions and list-change notifications.
+
+    The low-level server always reports ``subscribe: false`` and takes
+    ``listChanged`` from options FastMCP does not expose.
+    """
+    capabilities = _base_get_capabilities(*args, **kwargs)
+    if capabilities.resources is not None:
+        capabilities.resources = capabilities.resources.model_copy(
+            update={"subscribe": True, "listChanged": True}
+        )
+    return capabilities
+
+
+mcp._mcp_server.list_resources()(_list_resources)
+mcp._mcp_server.subscribe_resource()(_subscribe)
+mcp._mcp_server.unsubscribe_resource()(_unsubscribe)
+_base_get_capabilities = mcp._mcp_server.get_capabilities
+mcp._mcp_server.get_capabilities = _get_capabilities
+
+
+@mcp.resource(
+    "canvas://metrics",
+    title="Server Metrics",
+    description=(
+        "Prometheus text metrics: per-tool call counts and latency histograms, "
+        "payload and file bytes, nodes and edges processed, and cache hit rates."
+    ),
+    mime_type="text/plain",
+)
+def canvas_metrics() -> str:
+    """Return the server's metrics in the Prometheus text format."""
+    return _METRICS.render()
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def canvas_metrics_http(request: Request) -> Response:
+    """Serve the metrics for Prometheus scraping (Streamable HTTP transport)."""
+    from starlette.responses import Response
+
+    return Response(
+        _METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @mcp.resource(
     "canvas://examples/basic",
     title="Basic Canvas Example",
@@ -625,7 +2453,12 @@ def _run_streamable_http_with_cors(host: str, port: int) -> None:
     import uvicorn
     from starlette.middleware.cors import CORSMiddleware
 
+    from jsoncanvas.limits import RequestBodyLimit
+
     app = mcp.streamable_http_app()
+    # Refuses oversized bodies before anything reads them; added first so CORS
+    # (outermost) still decorates its 413 responses for browser clients.
+    app.add_middleware(RequestBodyLimit, max_bytes=lambda: _limits().max_request_bytes)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=_cors_origins(),
@@ -636,6 +2469,55 @@ def _run_streamable_http_with_cors(host: str, port: int) -> None:
     uvicorn.run(app, host=host, port=port)
 
 
+async def _run_stdio() -> None:
+    """Serve over stdio, refusing oversized messages before they are parsed."""
+    from jsoncanvas.transport import stdio_server
+
+    server = mcp._mcp_server
+    async with stdio_server(max_bytes=lambda: _limits().max_request_bytes) as (
+        read_stream,
+        write_stream,
+    ):
+        await server.run(
+            read_stream, write_stream, server.create_initialization_options()
+        )
+
+
+def _configure_tracing() -> None:
+    """Install the span processor selected by ``MCP_TRACE``, if any.
+
+    ``otel`` forwards spans to OpenTelemetry (``otel`` extra); any other
+    non-empty value is a file that finished spans are appended to as JSON
+    lines.
+    """
+    target = os.environ.get("MCP_TRACE", "").strip()
+    if not target:
+        return
+    if target == "otel":
+        tracing.set_processor(tracing.OpenTelemetryProcessor())
+    else:
+        tracing.set_processor(tracing.JsonLinesExporter(target))
+    print(f"Tracing spans to {target}", file=sys.stderr)
+
+
+def _configure_profiling(directory: str | None) -> None:
+    """Install a profiler writing to ``directory`` (or ``MCP_PROFILE``), if set.
+
+    ``MCP_PROFILE_SAMPLE`` is the fraction of tool calls profiled (default 1).
+    """
+    directory = directory or os.environ.get("MCP_PROFILE", "").strip()
+    if not directory:
+        return
+    from jsoncanvas import profiling
+
+    sample = float(os.environ.get("MCP_PROFILE_SAMPLE", "1"))
+    profiling.set_profiler(profiling.Profiler(directory, sample=sample))
+    print(
+        f"Profiling {sample:.0%} of tool calls to {Path(directory).resolve()}",
+        file=sys.stderr,
+    )
+
+
 def main() -> None:
     """Run the JSON Canvas MCP server."""
     parser = argparse.ArgumentParser(
@@ -659,9 +2541,36 @@ def main() -> None:
         default=int(os.environ.get("MCP_PORT", "8000")),
         help="Port for the streamable-http transport (default: 8000).",
     )
+    parser.add_argument(
+        "--watch",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help=(
+            "Watch OUTPUT_PATH for edits made by other programs and drop stale "
+            "caches (default: on for streamable-http, off for stdio; env MCP_WATCH)."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        default=None,
+        help=(
+            "Write cProfile stats and tracemalloc peaks for each tool call to DIR "
+            "(env MCP_PROFILE; sample a fraction with MCP_PROFILE_SAMPLE)."
+        ),
+    )
     args = parser.parse_args()
 
-    print(f"OUTPUT_PATH={_output_dir()}", file=sys.stderr)
+    # The directory is created lazily by the first tool call that needs it.
+    print(f"OUTPUT_PATH={_output_path()}", file=sys.stderr)
+    _configure_tracing()
+    _configure_profiling(args.profile)
+    watch = args.watch
+    if watch is None:
+        default = "1" if args.transport == "streamable-http" else "0"
+        watch = os.environ.get("MCP_WATCH", default).lower() in {"1", "true", "yes"}
+    if watch:
+        _start_watcher()
     if args.transport == "streamable-http":
         mcp.settings.host = args.host
         mcp.settings.port = args.port
@@ -672,7 +2581,7 @@ def main() -> None:
         )
         _run_streamable_http_with_cors(args.host, args.port)
         return
-    mcp.run(transport=args.transport)
+    anyio.run(_run_stdio)
 
 
 if __name__ == "__main__":
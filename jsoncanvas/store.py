@@ -0,0 +1,441 @@
+"""An optional SQLite index of the canvases in a directory.
+
+Every tool works on plain ``.canvas`` files, which keeps the output directory
+usable from Obsidian, but operations that span the whole directory — search
+above all — then have to read and parse every file. :class:`CanvasStore`
+mirrors those files into a SQLite database (stdlib :mod:`sqlite3`, no extra
+dependency) with one row per canvas, node and edge, and an FTS5 index of the
+searchable fields, so a search is one indexed query however many canvases
+there are.
+
+The files stay the source of truth and the store follows them both ways:
+
+- The server writes each canvas file and then records it with :meth:`put`,
+  replacing the canvas's rows in one transaction.
+- :meth:`sync` imports files created or changed by other programs (compared by
+  mtime and size, so unchanged files cost one ``stat``) and drops rows of
+  deleted files. Canvases are read as the server reads them, with any edit
+  journal (:mod:`jsoncanvas.journal`) replayed.
+- :meth:`export` writes stored canvases back out as ``.canvas`` files.
+
+Search matches the server's file scan exactly: a case-insensitive
+(:meth:`str.casefold`) substring of a field. The index holds the casefolded
+text under FTS5's ``trigram`` tokenizer, which answers ``GLOB '*...*'`` from
+the index for queries of three or more characters. Both need SQLite 3.34 or
+later built with FTS5; opening a store checks for them and raises an error
+naming what is missing otherwise.
+
+Run ``python -m jsoncanvas.store {sync,export} DIRECTORY`` to rebuild the
+index or restore the files from it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Mapping, NamedTuple, Sequence
+
+from .cache import content_hash
+from .journal import CanvasJournal, replace_file
+from .search import SEARCH_FIELDS
+
+DEFAULT_FILENAME = ".jsoncanvas.db"
+
+# Files imported per transaction by sync(); FTS5 indexes each commit's rows
+# as one segment, so fewer, larger commits import much faster.
+_SYNC_BATCH = 256
+
+# Fails without FTS5 ("no such module") or its trigram tokenizer.
+_FTS5_PROBE = "CREATE VIRTUAL TABLE temp.fts5_probe USING fts5 (x, tokenize='trigram')"
+
+# Node and edge rows are only read back per canvas, which their primary keys
+# cover, so they have no other index; the ones older stores had are dropped.
+_SCHEMA = """
+DROP INDEX IF EXISTS nodes_by_id;
+DROP INDEX IF EXISTS edges_by_from;
+DROP INDEX IF EXISTS edges_by_to;
+CREATE TABLE IF NOT EXISTS canvases (
+    name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    canvas TEXT NOT NULL REFERENCES canvases (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    type TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (canvas, position)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    canvas TEXT NOT NULL REFERENCES canvases (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    from_node TEXT,
+    to_node TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (canvas, position)
+);
+CREATE TABLE IF NOT EXISTS terms (
+    canvas TEXT NOT NULL REFERENCES canvases (name) ON DELETE CASCADE,
+    is_edge INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    folded TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS terms_by_canvas ON terms (canvas);
+CREATE VIRTUAL TABLE IF NOT EXISTS terms_fts USING fts5 (
+    folded, content='terms', tokenize='trigram', detail='none', columnsize=0
+);
+CREATE TRIGGER IF NOT EXISTS terms_insert AFTER INSERT ON terms BEGIN
+    INSERT INTO terms_fts (rowid, folded) VALUES (new.rowid, new.folded);
+END;
+CREATE TRIGGER IF NOT EXISTS terms_delete AFTER DELETE ON terms BEGIN
+    INSERT INTO terms_fts (terms_fts, rowid, folded)
+    VALUES ('delete', old.rowid, old.folded);
+END;
+"""
+
+
+class StoreMatch(NamedTuple):
+    """One searchable field of a stored element that matched a query."""
+
+    filename: str
+    kind: str
+    id: str
+    field: str
+    value: str
+
+
+class CanvasStore:
+    """A SQLite index of canvases: rows per node and edge plus full-text search.
+
+    One connection is shared by all threads and serialised by a lock; the
+    database runs in WAL mode so other processes can read it meanwhile.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        search_fields: Mapping[str, Sequence[str]],
+    ) -> None:
+        """Open (creating if needed) the store at ``path``.
+
+        Args:
+            path: Database file, or ``":memory:"``
+            search_fields: Fields indexed for search, by kind (``node``/``edge``)
+
+        Raises:
+            RuntimeError: If this Python's SQLite lacks FTS5 or its trigram
+                tokenizer
+        """
+        self.path = path
+        self.search_fields = {
+            kind: tuple(fields) for kind, fields in search_fields.items()
+        }
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        try:
+            self._db.execute(_FTS5_PROBE)
+        except sqlite3.OperationalError as exc:
+            self._db.close()
+            raise RuntimeError(
+                "The SQLite canvas store needs SQLite 3.34+ with FTS5 and its "
+                "trigram tokenizer, but this Python's SQLite "
+                f"{sqlite3.sqlite_version} reports: {exc}. Use MCP_STORE=files, "
+                "or a Python built against a newer SQLite."
+            ) from exc
+        self._db.execute("DROP TABLE temp.fts5_probe")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def put(
+        self, name: str, data: Mapping[str, Any], version: str, stat: os.stat_result
+    ) -> None:
+        """Replace the stored copy of canvas ``name`` in one transaction.
+
+        ``stat`` is the written file's status, so that :meth:`sync` recognises
+        the file as already imported.
+        """
+        with self._lock, self._db:
+            self._replace(name, data, version, stat)
+
+    def delete(self, name: str) -> None:
+        """Forget canvas ``name`` and its elements."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM canvases WHERE name = ?", (name,))
+
+    def names(self) -> list[str]:
+        """Return the stored canvas names in order."""
+        with self._lock:
+            rows = self._db.execute("SELECT name FROM canvases ORDER BY name")
+            return [name for (name,) in rows]
+
+    def load(self, name: str) -> dict[str, Any] | None:
+        """Rebuild the stored canvas ``name`` as a dictionary (None if unknown).
+
+        Like :meth:`jsoncanvas.Canvas.to_dict`, empty arrays are omitted.
+        """
+        with self._lock:
+            known = self._db.execute("SELECT 1 FROM canvases WHERE name = ?", (name,))
+            if known.fetchone() is None:
+                return None
+            canvas = {}
+            for table in ("nodes", "edges"):
+                rows = self._db.execute(
+                    f"SELECT data FROM {table} WHERE canvas = ? ORDER BY position",
+                    (name,),
+                )
+                elements = [json.loads(data) for (data,) in rows]
+                if elements:
+                    canvas[table] = elements
+        return canvas
+
+    def search(self, query: str, name: str | None = None) -> list[StoreMatch]:
+        """Return fields containing ``query`` (case-insensitively), in file order.
+
+        Matches are ordered by canvas name, then nodes before edges in their
+        stored order, then by field in ``search_fields`` order.
+        """
+        # GLOB (not LIKE ... ESCAPE) is what the trigram index can answer; it is
+        # case-sensitive, so both sides are casefolded.
+        pattern = "".join(
+            f"[{char}]" if char in "*?[" else char for char in query.casefold()
+        )
+        sql = (
+            "SELECT t.canvas, t.is_edge, t.id, t.field, t.value FROM terms_fts "
+            "JOIN terms t ON t.rowid = terms_fts.rowid "
+            "WHERE terms_fts.folded GLOB ?"
+        )
+        params: list[Any] = [f"*{pattern}*"]
+        if name is not None:
+            sql += " AND t.canvas = ?"
+            params.append(name)
+        sql += " ORDER BY t.canvas, t.is_edge, t.position, t.slot"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            StoreMatch(canvas, "edge" if is_edge else "node", id_, field, value)
+            for canvas, is_edge, id_, field, value in rows
+        ]
+
+    def sync(
+        self,
+        directory: Path,
+        names: Iterable[str] | None = None,
+        max_bytes: int = 0,
+        read: Callable[[Path], bytes | None] | None = None,
+    ) -> set[str]:
+        """Bring the store up to date with the ``.canvas`` files in ``directory``.
+
+        Files whose mtime or size differ from the stored copy are re-imported;
+        rows of files that no longer exist are dropped. With ``names``, only
+        those files are checked. Files over ``max_bytes`` (``0``: no limit)
+        are left out, and unparseable ones are stored without elements.
+        ``read`` returns a canvas's content in place of its file, or None to
+        read the file (:meth:`CanvasJournal.read
+        <jsoncanvas.journal.CanvasJournal.read>` replays edit journals).
+        Returns the names that were imported or dropped.
+        """
+        with self._lock:
+            known = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in self._db.execute(
+                    "SELECT name, mtime_ns, size FROM canvases"
+                )
+            }
+        if names is None:
+            candidates = set(known) | {
+                entry.name
+                for entry in os.scandir(directory)
+                if entry.name.endswith(".canvas")
+            }
+        else:
+            candidates = set(names)
+
+        changed: set[str] = set()
+        pending: list[tuple[str, dict[str, Any] | None, str, Any]] = []
+        for name in sorted(candidates):
+            path = directory / name
+            try:
+                stat = path.stat()
+                if (stat.st_mtime_ns, stat.st_size) == known.get(name):
+                    continue
+                if max_bytes and stat.st_size > max_bytes:
+                    raise OSError(f"{name} is over {max_bytes} bytes")
+                raw = read(path) if read is not None else None
+                if raw is None:
+                    raw = path.read_bytes()
+                elif max_bytes and len(raw) > max_bytes:
+                    raise OSError(f"{name} is over {max_bytes} bytes")
+            except OSError:
+                if name in known:
+                    pending.append((name, None, "", None))
+                continue
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = {}
+            pending.append((name, data, content_hash(raw), stat))
+            if len(pending) >= _SYNC_BATCH:
+                changed.update(self._apply(pending))
+        changed.update(self._apply(pending))
+        return changed
+
+    def _apply(
+        self, pending: list[tuple[str, dict[str, Any] | None, str, Any]]
+    ) -> list[str]:
+        """Import or drop (data None) a batch of canvases in one transaction."""
+        names = [name for name, *_ in pending]
+        with self._lock, self._db:
+            for name, data, version, stat in pending:
+                if data is None:
+                    self._db.execute("DELETE FROM canvases WHERE name = ?", (name,))
+                else:
+                    self._replace(name, data, version, stat)
+        pending.clear()
+        return names
+
+    def export(self, directory: Path, names: Iterable[str] | None = None) -> int:
+        """Write stored canvases to ``directory`` as ``.canvas`` files.
+
+        Files are written in the server's indented JSON form; returns how many
+        were written.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        count = 0
+        for name in self.names() if names is None else names:
+            canvas = self.load(name)
+            if canvas is None:
+                continue
+            target = directory / name
+            tmp = target.with_name(f".{name}.tmp")
+            tmp.write_text(json.dumps(canvas, indent=2), encoding="utf-8")
+            os.replace(tmp, target)
+            count += 1
+        return count
+
+    def _replace(
+        self, name: str, data: Mapping[str, Any], version: str, stat: os.stat_result
+    ) -> None:
+        db = self._db
+        db.execute("DELETE FROM canvases WHERE name = ?", (name,))
+        db.execute(
+            "INSERT INTO canvases (name, version, mtime_ns, size) VALUES (?, ?, ?, ?)",
+            (name, version, stat.st_mtime_ns, stat.st_size),
+        )
+        nodes = _elements(data, "nodes")
+        edges = _elements(data, "edges")
+        db.executemany(
+            "INSERT INTO nodes (canvas, position, id, type, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (name, i, str(n.get("id", "")), n.get("type"), json.dumps(n))
+                for i, n in enumerate(nodes)
+            ),
+        )
+        db.executemany(
+            "INSERT INTO edges (canvas, position, id, from_node, to_node, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    name,
+                    i,
+                    str(e.get("id", "")),
+                    e.get("fromNode"),
+                    e.get("toNode"),
+                    json.dumps(e),
+                )
+                for i, e in enumerate(edges)
+            ),
+        )
+        db.executemany(
+            "INSERT INTO terms "
+            "(canvas, is_edge, position, slot, id, field, value, folded) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            self._terms(name, nodes, edges),
+        )
+
+    def _terms(
+        self,
+        name: str,
+        nodes: list[Mapping[str, Any]],
+        edges: list[Mapping[str, Any]],
+    ) -> Iterator[tuple[Any, ...]]:
+        for is_edge, elements in ((0, nodes), (1, edges)):
+            fields = self.search_fields.get("edge" if is_edge else "node", ())
+            for position, element in enumerate(elements):
+                element_id = str(element.get("id", ""))
+                for slot, field in enumerate(fields):
+                    value = element.get(field)
+                    if isinstance(value, str):
+                        yield (
+                            name,
+                            is_edge,
+                            position,
+                            slot,
+                            element_id,
+                            field,
+                            value,
+                            value.casefold(),
+                        )
+
+
+def _elements(data: Mapping[str, Any], key: str) -> list[Mapping[str, Any]]:
+    elements = data.get(key)
+    if not isinstance(elements, list):
+        return []
+    return [element for element in elements if isinstance(element, Mapping)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Sync a directory's canvases into its store, or export them back out."""
+    parser = argparse.ArgumentParser(
+        prog="python -m jsoncanvas.store", description=main.__doc__
+    )
+    parser.add_argument("command", choices=["sync", "export"])
+    parser.add_argument("directory", type=Path, help="The canvas directory.")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        help=f"Database file (default: DIRECTORY/{DEFAULT_FILENAME}).",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        store = CanvasStore(args.db or args.directory / DEFAULT_FILENAME, SEARCH_FIELDS)
+    except RuntimeError as exc:
+        parser.exit(1, f"{exc}\n")
+    try:
+        if args.command == "sync":
+            # Edit journals are replayed, so journaled edits are indexed too.
+            journal = CanvasJournal(replace_file)
+            changed = store.sync(args.directory, read=journal.read)
+            print(f"Synced {len(changed)} changed canvases into {store.path}")
+        else:
+            count = store.export(args.directory)
+            print(f"Exported {count} canvases to {args.directory}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
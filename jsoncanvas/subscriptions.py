@@ -0,0 +1,123 @@
+"""Track MCP resource subscriptions and push change notifications.
+
+:class:`SubscriptionRegistry` remembers which client sessions subscribed to
+which resource URIs (``resources/subscribe``) and which sessions listed
+resources, and sends them ``notifications/resources/updated`` and
+``notifications/resources/list_changed``. Notifications may be published from
+any thread (tool handlers, the file watcher); each one is scheduled on the
+event loop that owns the session, without waiting for it to be sent.
+
+Sessions are held weakly and dropped once a send to them fails, so clients
+that disconnect without unsubscribing do not accumulate.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterable
+
+from pydantic import AnyUrl
+
+if TYPE_CHECKING:
+    from mcp.server.session import ServerSession
+
+
+@dataclass
+class _Client:
+    loop: asyncio.AbstractEventLoop
+    uris: set[str] = field(default_factory=set)
+
+
+class SubscriptionRegistry:
+    """Sessions interested in resource changes, and the URIs they subscribed to."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._clients: weakref.WeakKeyDictionary[ServerSession, _Client] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def register(self, session: ServerSession) -> None:
+        """Remember ``session`` for ``list_changed`` notifications.
+
+        Must be called from the session's event loop (i.e. in a request handler).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(session)
+            if client is None or client.loop is not loop:
+                self._clients[session] = _Client(loop)
+
+    def subscribe(self, session: ServerSession, uri: str) -> None:
+        """Subscribe ``session`` to updates of ``uri`` (from its event loop)."""
+        self.register(session)
+        with self._lock:
+            self._clients[session].uris.add(str(uri))
+
+    def unsubscribe(self, session: ServerSession, uri: str) -> None:
+        """Cancel ``session``'s subscription to ``uri``; unknown URIs are ignored."""
+        with self._lock:
+            client = self._clients.get(session)
+            if client is not None:
+                client.uris.discard(str(uri))
+
+    def subscribers(self, uri: str) -> int:
+        """Return how many sessions are subscribed to ``uri``."""
+        with self._lock:
+            return sum(str(uri) in client.uris for client in self._clients.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def resources_updated(self, uris: Iterable[str]) -> int:
+        """Notify each session subscribed to any of ``uris``; return sends scheduled."""
+        wanted = {str(uri) for uri in uris}
+        with self._lock:
+            targets = [
+                (session, client, uri)
+                for session, client in self._clients.items()
+                for uri in sorted(client.uris & wanted)
+            ]
+        for session, client, uri in targets:
+            self._send(
+                session,
+                client,
+                lambda session=session, uri=uri: session.send_resource_updated(
+                    AnyUrl(uri)
+                ),
+            )
+        return len(targets)
+
+    def list_changed(self) -> int:
+        """Notify every registered session that the resource list changed."""
+        with self._lock:
+            targets = list(self._clients.items())
+        for session, client in targets:
+            self._send(session, client, session.send_resource_list_changed)
+        return len(targets)
+
+    def _send(
+        self,
+        session: ServerSession,
+        client: _Client,
+        notify: Callable[[], Coroutine[Any, Any, None]],
+    ) -> None:
+        if client.loop.is_closed():
+            self._drop(session)
+            return
+        future = asyncio.run_coroutine_threadsafe(notify(), client.loop)
+        future.add_done_callback(lambda f: self._sent(session, f))
+
+    def _sent(self, session: ServerSession, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            self._drop(session)  # the client went away
+
+    def _drop(self, session: ServerSession) -> None:
+        with self._lock:
+            self._clients.pop(session, None)
@@ -0,0 +1,378 @@
+"""Tiled, level-of-detail SVG rendering for very large canvases.
+
+:func:`~jsoncanvas.export.to_svg` draws every element into one document sized
+to the whole canvas, which browsers struggle with once a board reaches tens of
+thousands of nodes. :class:`TileRenderer` instead cuts the canvas into a
+``z/x/y`` pyramid of fixed-size square tiles (zoom 0 fits the whole canvas in
+one tile; each level doubles the resolution) and renders one tile at a time:
+
+- a uniform-grid :class:`SpatialIndex` returns only the elements overlapping a
+  tile, so a tile costs O(visible elements) rather than O(canvas);
+- level-of-detail rules keep low zoom levels light: text is dropped while it
+  would be unreadably small, nodes smaller than a few pixels are merged into
+  one block per occupied pixel cell, and edges shorter than a few pixels are
+  skipped.
+
+Tiles use the canvas's own coordinates in their ``viewBox``, so at full detail
+they look like the matching region of ``to_svg``.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from .export import (
+    _anchor,
+    _auto_side,
+    _bounds,
+    _color,
+    _esc,
+    _node_title,
+    _normal,
+    _wrap,
+)
+
+if TYPE_CHECKING:
+    from .canvas import Canvas
+    from .edges import Edge
+    from .nodes import Node
+
+TILE_SIZE = 256
+# Below this many screen pixels per canvas unit, text is not drawn.
+TEXT_MIN_SCALE = 0.45
+# Nodes whose larger side is under this many pixels are merged into cells.
+MERGE_NODE_PX = 4.0
+# Edges whose endpoints are closer than this many pixels are skipped.
+MIN_EDGE_PX = 6.0
+# Zoom levels past full detail (each doubling the magnification) that exist.
+MAX_ZOOM_PAST_FULL_DETAIL = 8
+
+_Rect = tuple[float, float, float, float]  # (x0, y0, x1, y1)
+_Point = tuple[float, float]
+
+
+class SpatialIndex:
+    """A uniform-grid index of axis-aligned boxes.
+
+    Items are registered in every grid cell their box overlaps; a query visits
+    only the cells under the query box. Uniform grids suit canvases well: node
+    sizes vary little compared to how far the canvas spreads.
+    """
+
+    def __init__(self, cell_size: float) -> None:
+        """Initialize an empty index.
+
+        Args:
+            cell_size: Width and height of a grid cell, in canvas units
+        """
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], list[int]] = {}
+
+    def _cell_range(self, box: _Rect) -> Iterator[tuple[int, int]]:
+        c = self.cell_size
+        for cx in range(math.floor(box[0] / c), math.floor(box[2] / c) + 1):
+            for cy in range(math.floor(box[1] / c), math.floor(box[3] / c) + 1):
+                yield cx, cy
+
+    def insert(self, item: int, box: _Rect) -> None:
+        """Register ``item`` (an integer handle) under ``box``."""
+        for cell in self._cell_range(box):
+            self._cells.setdefault(cell, []).append(item)
+
+    def query(self, box: _Rect) -> set[int]:
+        """Return the handles of items whose cells overlap ``box``.
+
+        Results may include items that share a cell with ``box`` without
+        overlapping it; callers clip precisely if they need to.
+        """
+        found: set[int] = set()
+        for cell in self._cell_range(box):
+            items = self._cells.get(cell)
+            if items:
+                found.update(items)
+        return found
+
+
+def _overlaps(a: _Rect, b: _Rect) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class TileRenderer:
+    """Render ``z/x/y`` SVG tiles of one canvas.
+
+    Building the renderer indexes the canvas once (O(n)); each
+    :meth:`render_tile` call then touches only the elements under the tile.
+    """
+
+    def __init__(self, canvas: Canvas, tile_size: int = TILE_SIZE) -> None:
+        """Index ``canvas`` for tiled rendering.
+
+        Args:
+            canvas: The canvas to render (must not be mutated afterwards)
+            tile_size: Tile width and height in pixels
+        """
+        self.tile_size = tile_size
+        self._nodes: list[Node] = list(canvas.nodes)
+        # Per edge: (edge, from_side, to_side, from_anchor, to_anchor, box).
+        self._edges: list[tuple[Edge, str, str, _Point, _Point, _Rect]] = []
+        if self._nodes:
+            min_x, min_y, w, h = _bounds(self._nodes)
+        else:
+            min_x, min_y, w, h = 0, 0, tile_size, tile_size
+        self.origin = (float(min_x), float(min_y))
+        self.world_size = float(max(w, h))
+
+        # Roughly 64 x 64 cells over the canvas, but never finer than a typical
+        # node, so large nodes are not registered in hundreds of cells.
+        cell = max(self.world_size / 64, 256.0)
+        self._node_index = SpatialIndex(cell)
+        self._edge_index = SpatialIndex(cell)
+        nodes_by_id = {}
+        for i, node in enumerate(self._nodes):
+            nodes_by_id[node.id] = node
+            box = (node.x, node.y, node.x + node.width, node.y + node.height)
+            self._node_index.insert(i, box)
+        for edge in canvas.edges:
+            a = nodes_by_id.get(edge.from_node)
+            b = nodes_by_id.get(edge.to_node)
+            if a is None or b is None:
+                continue
+            from_side = edge.from_side or _auto_side(a, b)
+            to_side = edge.to_side or _auto_side(b, a)
+            start = _anchor(a, from_side, 0, 0)
+            end = _anchor(b, to_side, 0, 0)
+            (ax, ay), (bx, by) = start, end
+            # Bezier control points sit up to k units beyond the anchors.
+            k = max(40.0, math.hypot(bx - ax, by - ay) * 0.4)
+            box = (min(ax, bx) - k, min(ay, by) - k, max(ax, bx) + k, max(ay, by) + k)
+            self._edge_index.insert(len(self._edges), box)
+            self._edges.append((edge, from_side, to_side, start, end, box))
+
+    def scale(self, z: int) -> float:
+        """Screen pixels per canvas unit at zoom level ``z``."""
+        self._check_zoom(z)
+        return self.tile_size * (2**z) / self.world_size
+
+    def full_detail_zoom(self) -> int:
+        """The lowest zoom level at which the canvas renders at 1:1 or larger."""
+        return max(0, math.ceil(math.log2(max(1.0, self.world_size / self.tile_size))))
+
+    def max_zoom(self) -> int:
+        """The deepest zoom level of the pyramid."""
+        return self.full_detail_zoom() + MAX_ZOOM_PAST_FULL_DETAIL
+
+    def _check_zoom(self, z: int) -> None:
+        # Before any 2**z: a huge z would build a huge integer first.
+        if not 0 <= z <= self.max_zoom():
+            raise ValueError(
+                f"Zoom {z} is outside the tile pyramid (0 to {self.max_zoom()})"
+            )
+
+    def tile_box(self, z: int, x: int, y: int) -> _Rect:
+        """The canvas-coordinate box covered by tile ``z/x/y``."""
+        self._check_zoom(z)
+        extent = self.world_size / (2**z)
+        x0 = self.origin[0] + x * extent
+        y0 = self.origin[1] + y * extent
+        return (x0, y0, x0 + extent, y0 + extent)
+
+    def is_empty(self, z: int, x: int, y: int) -> bool:
+        """True when no node or edge overlaps tile ``z/x/y``."""
+        box = self.tile_box(z, x, y)
+        return not any(
+            _overlaps(box, self._node_box(i)) for i in self._node_index.query(box)
+        ) and not self._visible_edges(box, self.scale(z))
+
+    def _node_box(self, i: int) -> _Rect:
+        n = self._nodes[i]
+        return (n.x, n.y, n.x + n.width, n.y + n.height)
+
+    def _visible_edges(self, box: _Rect, scale: float) -> list[int]:
+        visible = []
+        for i in sorted(self._edge_index.query(box)):
+            _, _, _, (ax, ay), (bx, by), edge_box = self._edges[i]
+            if not _overlaps(box, edge_box):
+                continue
+            if math.hypot(bx - ax, by - ay) * scale < MIN_EDGE_PX:
+                continue
+            visible.append(i)
+        return visible
+
+    def render_tile(self, z: int, x: int, y: int) -> str:
+        """Render tile ``z/x/y`` as a standalone SVG string.
+
+        Raises:
+            ValueError: If the tile address is outside the pyramid
+        """
+        self._check_zoom(z)
+        n = 2**z
+        if not (0 <= x < n and 0 <= y < n):
+            raise ValueError(f"Tile {z}/{x}/{y} is outside the tile pyramid")
+        return "".join(self._iter_tile(z, x, y))
+
+    def _iter_tile(self, z: int, x: int, y: int) -> Iterator[str]:
+        size = self.tile_size
+        scale = self.scale(z)
+        box = self.tile_box(z, x, y)
+        extent = box[2] - box[0]
+        detailed = scale >= TEXT_MIN_SCALE
+
+        yield (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+            f'viewBox="{box[0]:g} {box[1]:g} {extent:g} {extent:g}" '
+            f'font-family="-apple-system, system-ui, sans-serif">'
+        )
+        yield (
+            f'<rect x="{box[0]:g}" y="{box[1]:g}" width="{extent:g}" '
+            f'height="{extent:g}" fill="#ffffff"/>'
+        )
+
+        edge_ids = self._visible_edges(box, scale)
+        # Arrow markers, one per distinct colour among this tile's edges.
+        marker_ids: dict[str, str] = {}
+        if detailed:
+            for i in edge_ids:
+                col = _color(self._edges[i][0].color)
+                marker_ids.setdefault(col, f"arrow{len(marker_ids)}")
+        if marker_ids:
+            yield (
+                "<defs>"
+                + "".join(
+                    f'<marker id="{mid}" viewBox="0 0 10 10" refX="8" refY="5" '
+                    f'markerWidth="7" markerHeight="7" orient="auto-start-reverse">'
+                    f'<path d="M0,0 L10,5 L0,10 z" fill="{col}"/></marker>'
+                    for col, mid in marker_ids.items()
+                )
+                + "</defs>"
+            )
+        for i in edge_ids:
+            yield from self._edge_svg(
+                *self._edges[i][:5], marker_ids if detailed else None
+            )
+
+        node_ids = sorted(
+            i for i in self._node_index.query(box) if _overlaps(box, self._node_box(i))
+        )
+        # Groups first so they sit behind, as in to_svg.
+        node_ids.sort(key=lambda i: 0 if self._nodes[i].type == "group" else 1)
+        merged: dict[tuple[int, int], str] = {}
+        cell = MERGE_NODE_PX / scale
+        for i in node_ids:
+            node = self._nodes[i]
+            if max(node.width, node.height) * scale < MERGE_NODE_PX:
+                # Too small to show: merge into a block per occupied pixel cell.
+                key = (int(node.x // cell), int(node.y // cell))
+                merged.setdefault(key, _color(node.color, "#c8ccd2"))
+                continue
+            yield from self._node_svg(node, detailed)
+        for (cx, cy), col in merged.items():
+            yield (
+                f'<rect x="{cx * cell:g}" y="{cy * cell:g}" width="{cell:g}" '
+                f'height="{cell:g}" fill="{col}"/>'
+            )
+        yield "</svg>"
+
+    @staticmethod
+    def _node_svg(node: Node, detailed: bool) -> Iterator[str]:
+        stroke = _color(node.color, "#c8ccd2")
+        common = (
+            f'x="{node.x}" y="{node.y}" width="{node.width}" height="{node.height}" '
+            f'stroke="{stroke}" stroke-width="2" vector-effect="non-scaling-stroke"'
+        )
+        if node.type == "group":
+            yield f'<rect {common} rx="10" fill="{stroke}" fill-opacity="0.06"/>'
+            label = getattr(node, "label", None)
+            if detailed and label:
+                yield (
+                    f'<text x="{node.x + 10}" y="{node.y + 20}" font-size="13" '
+                    f'font-weight="600" fill="#333">{_esc(label)}</text>'
+                )
+            return
+        yield f'<rect {common} rx="8" fill="#ffffff"/>'
+        if detailed:
+            lines = _wrap(_node_title(node), node.width, node.height)
+            for i, line in enumerate(lines):
+                yield (
+                    f'<text x="{node.x + 10}" y="{node.y + 24 + i * 18}" '
+                    f'font-size="13" fill="#1a1a1a">{_esc(line)}</text>'
+                )
+
+    @staticmethod
+    def _edge_svg(
+        edge: Edge,
+        from_side: str,
+        to_side: str,
+        start: _Point,
+        end: _Point,
+        marker_ids: dict[str, str] | None,
+    ) -> Iterator[str]:
+        """Draw an edge: a bezier with markers and label when ``marker_ids`` is
+        given (full detail), else a plain hairline segment."""
+        col = _color(edge.color)
+        (ax, ay), (bx, by) = start, end
+        if marker_ids is None:
+            # A straight segment reads the same at low zoom and is cheaper.
+            yield (
+                f'<path d="M{ax:.0f},{ay:.0f} L{bx:.0f},{by:.0f}" stroke="{col}" '
+                f'stroke-width="1" vector-effect="non-scaling-stroke"/>'
+            )
+            return
+        k = max(40.0, math.hypot(bx - ax, by - ay) * 0.4)
+        nax, nay = _normal(from_side)
+        nbx, nby = _normal(to_side)
+        markers = ""
+        if edge.to_end == "arrow":
+            markers += f' marker-end="url(#{marker_ids[col]})"'
+        if edge.from_end == "arrow":
+            markers += f' marker-start="url(#{marker_ids[col]})"'
+        yield (
+            f'<path d="M{ax:.1f},{ay:.1f} C{ax + nax * k:.1f},{ay + nay * k:.1f} '
+            f'{bx + nbx * k:.1f},{by + nby * k:.1f} {bx:.1f},{by:.1f}" fill="none" '
+            f'stroke="{col}" stroke-width="2"{markers}/>'
+        )
+        if edge.label:
+            yield (
+                f'<text x="{(ax + bx) / 2:.1f}" y="{(ay + by) / 2:.1f}" font-size="12" '
+                f'fill="#333" text-anchor="middle" paint-order="stroke" '
+                f'stroke="#ffffff" stroke-width="3">{_esc(edge.label)}</text>'
+            )
+
+    def iter_tiles(self, max_zoom: int | None = None) -> Iterator[tuple[int, int, int]]:
+        """Yield the addresses of every non-empty tile up to ``max_zoom``.
+
+        ``max_zoom`` defaults to :meth:`full_detail_zoom`. Only the children of
+        non-empty tiles are examined, so sparse canvases skip empty regions.
+        """
+        top = self.full_detail_zoom() if max_zoom is None else max_zoom
+        level = [(0, 0)] if not self.is_empty(0, 0, 0) else []
+        for z in range(top + 1):
+            for x, y in level:
+                yield z, x, y
+            if z == top:
+                break
+            level = [
+                (cx, cy)
+                for x, y in level
+                for cx in (2 * x, 2 * x + 1)
+                for cy in (2 * y, 2 * y + 1)
+                if not self.is_empty(z + 1, cx, cy)
+            ]
+
+
+def write_tiles(
+    canvas: Canvas,
+    directory: Path,
+    max_zoom: int | None = None,
+    tile_size: int = TILE_SIZE,
+) -> int:
+    """Write every non-empty tile to ``directory/z/x/y.svg``; return the count."""
+    renderer = TileRenderer(canvas, tile_size=tile_size)
+    count = 0
+    for z, x, y in renderer.iter_tiles(max_zoom):
+        target = Path(directory) / str(z) / str(x) / f"{y}.svg"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(renderer.render_tile(z, x, y), encoding="utf-8")
+        count += 1
+    return count
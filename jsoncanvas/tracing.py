@@ -0,0 +1,243 @@
+"""Lightweight span tracing for canvas parsing, building and writing.
+
+Code paths wrap their stages in :func:`span`::
+
+    with tracing.span("canvas.build", nodes=len(nodes)) as s:
+        ...
+        s.set(edges=len(canvas.edges))
+
+Spans nest through a context variable, so a tool call's parse, build,
+serialise and write stages appear as children of the call. Tracing is off
+until a processor is installed with :func:`set_processor`; until then
+:func:`span` returns one shared no-op object, so instrumented code pays a
+function call and nothing else.
+
+Two processors are included: :class:`JsonLinesExporter` writes one JSON
+object per finished span, and :class:`OpenTelemetryProcessor` forwards spans
+to an OpenTelemetry tracer (needs the ``otel`` extra). Anything else can
+subclass :class:`SpanProcessor`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import IO, Any
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """A timed, named stage with attributes, nested under the current span."""
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "parent",
+        "span_id",
+        "trace_id",
+        "start_ns",
+        "end_ns",
+        "handle",
+        "_token",
+    )
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        """Initialize a span; it starts when entered as a context manager."""
+        self.name = name
+        self.attributes = attributes
+        self.parent: Span | None = None
+        self.span_id = 0
+        self.trace_id = 0
+        self.start_ns = 0
+        self.end_ns = 0
+        # Free for processors, e.g. the OpenTelemetry span this one mirrors.
+        self.handle: Any = None
+        self._token: Token[Span | None] | None = None
+
+    @property
+    def duration_ns(self) -> int:
+        """Elapsed time in nanoseconds (0 until the span ends)."""
+        return max(self.end_ns - self.start_ns, 0)
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes, e.g. counts known only at the end."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> Span:
+        self.parent = _current.get()
+        self.span_id = next(_ids)
+        self.trace_id = self.parent.trace_id if self.parent else self.span_id
+        self._token = _current.set(self)
+        processor = _processor
+        if processor is not None:
+            processor.on_start(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.attributes["error"] = f"{type(exc).__name__}: {exc}"
+        if self._token is not None:
+            _current.reset(self._token)
+        processor = _processor
+        if processor is not None:
+            processor.on_end(self)
+
+
+class _NoopSpan:
+    """Stand-in returned by :func:`span` while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        pass
+
+
+class SpanProcessor:
+    """Receives spans as they start and end; override either hook."""
+
+    def on_start(self, span: Span) -> None:
+        """Called when ``span`` is entered, before its work runs."""
+
+    def on_end(self, span: Span) -> None:
+        """Called when ``span`` is exited, with its final attributes."""
+
+    def shutdown(self) -> None:
+        """Flush and release resources when tracing is switched off."""
+
+
+_NOOP = _NoopSpan()
+_current: ContextVar[Span | None] = ContextVar("jsoncanvas_span", default=None)
+_processor: SpanProcessor | None = None
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Return a context manager timing the stage ``name``.
+
+    Attributes should be cheap to compute (counts, sizes); use :meth:`Span.set`
+    for values known only once the stage has run.
+    """
+    if _processor is None:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def enabled() -> bool:
+    """Return whether a processor is installed (spans are being recorded)."""
+    return _processor is not None
+
+
+def set_processor(processor: SpanProcessor | None) -> None:
+    """Install ``processor`` for all new spans; None turns tracing off."""
+    global _processor
+    previous, _processor = _processor, processor
+    if previous is not None and previous is not processor:
+        previous.shutdown()
+
+
+class JsonLinesExporter(SpanProcessor):
+    """Write each finished span as one JSON object per line.
+
+    Fields: ``name``, ``trace_id``, ``span_id``, ``parent_id`` (null for a
+    root), ``start`` (Unix seconds), ``duration_ms`` and ``attributes``.
+    Children finish, and are therefore written, before their parents.
+    """
+
+    def __init__(self, target: str | Path | IO[str]) -> None:
+        """Initialize an exporter.
+
+        Args:
+            target: File path to append to, or an open text stream
+        """
+        if isinstance(target, (str, Path)):
+            self._stream: IO[str] = open(target, "a", encoding="utf-8")
+            self._owned = True
+        else:
+            self._stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        """Write ``span`` as a JSON line."""
+        record = {
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent.span_id if span.parent else None,
+            "start": span.start_ns / 1e9,
+            "duration_ms": span.duration_ns / 1e6,
+            "attributes": span.attributes,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._stream.write(line)
+            self._stream.flush()
+
+    def shutdown(self) -> None:
+        """Close the file if this exporter opened it."""
+        if self._owned:
+            with self._lock:
+                self._stream.close()
+
+
+class OpenTelemetryProcessor(SpanProcessor):
+    """Mirror spans onto an OpenTelemetry tracer.
+
+    Root spans become children of whatever OpenTelemetry span is current when
+    they start, so canvas stages nest under an application's own traces.
+    Exporting is left to the OpenTelemetry SDK configured by the application.
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        """Initialize the adapter.
+
+        Args:
+            tracer: An OpenTelemetry ``Tracer``; defaults to the global
+                tracer provider's tracer for ``jsoncanvas``
+
+        Raises:
+            RuntimeError: If ``opentelemetry-api`` is not installed
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as exc:
+            raise RuntimeError(
+                "OpenTelemetry tracing needs the optional 'otel' extra: "
+                'pip install "mcp-server-jsoncanvas[otel]"'
+            ) from exc
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("jsoncanvas")
+
+    def on_start(self, span: Span) -> None:
+        """Start the matching OpenTelemetry span under the parent's."""
+        parent = span.parent.handle if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent else None
+        span.handle = self._tracer.start_span(
+            span.name, context=context, start_time=time.time_ns()
+        )
+
+    def on_end(self, span: Span) -> None:
+        """Copy the attributes and end the OpenTelemetry span."""
+        handle = span.handle
+        if handle is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (bool, int, float, str)):
+                handle.set_attribute(key, value)
+            else:
+                handle.set_attribute(key, str(value))
+        if "error" in span.attributes:
+            handle.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        handle.end(end_time=span.end_ns)
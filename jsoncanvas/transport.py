@@ -0,0 +1,193 @@
+"""A stdio transport that measures, and can refuse, messages before parsing.
+
+The SDK's stdio transport decodes and parses every line before the server
+sees it. That has two costs. A handler can only learn a request's size by
+serialising it again. An oversized request is fully parsed and materialised
+before any limit can reject it.
+
+:func:`stdio_server` reads stdin as bytes instead. It attaches each
+message's size on the wire to the message as a :class:`RawMessage`, in the
+metadata slot where the Streamable HTTP transport puts the HTTP request.
+:func:`message_size` reads either one from a request context.
+
+With ``max_bytes``, a line that passes the limit is not kept. The rest of
+the line is discarded as it is read, and the request is answered with the
+same ``INVALID_REQUEST`` error that :class:`~jsoncanvas.limits.RequestBodyLimit`
+sends over HTTP. Only the first and last few bytes of such a line are kept.
+They are used to find the request's ``id``, which MCP SDKs write either
+first or last in a message, so the client can match the error to its call.
+If no ``id`` is found there, the error's ``id`` is null.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+import anyio
+import anyio.lowlevel
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from mcp import types
+from mcp.shared.message import ServerMessageMetadata, SessionMessage
+
+from .limits import request_too_large
+
+_CHUNK = 1 << 16
+# Bytes kept from each end of an oversized line to find its id in.
+_EDGE = 256
+# A request id that opens or closes the message. Only the outermost object
+# starts at the first brace or ends at the last, so neither can be the id of
+# a nested object (such as a node).
+_ID = rb'"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")'
+_LEADING_ID = re.compile(rb'\s*\{\s*(?:"jsonrpc"\s*:\s*"2\.0"\s*,\s*)?' + _ID)
+_TRAILING_ID = re.compile(rb"[{,]\s*" + _ID + rb"\s*\}\s*$")
+
+
+@dataclass(frozen=True)
+class RawMessage:
+    """What the stdio transport knew about a message before parsing it."""
+
+    size: int  # bytes on the wire, without the newline
+
+
+def message_size(request: Any) -> int | None:
+    """Return the wire size of the message behind a request context.
+
+    ``request`` is ``RequestContext.request``: a :class:`RawMessage` over
+    stdio, or the HTTP request (its ``Content-Length``) over Streamable HTTP.
+    Returns None when the transport does not say, for example a chunked HTTP
+    body or an in-memory session.
+    """
+    if isinstance(request, RawMessage):
+        return request.size
+    headers = getattr(request, "headers", None)
+    length = headers.get("content-length") if headers is not None else None
+    return int(length) if length and length.isdigit() else None
+
+
+async def _read_lines(
+    stdin: anyio.AsyncFile[bytes], max_bytes: Callable[[], int]
+) -> AsyncIterator[tuple[bytes, int, bytes | None]]:
+    """Yield ``(line, size, tail)`` for each line of ``stdin``.
+
+    ``tail`` is None for a line within ``max_bytes()`` (``0``: unlimited).
+    A longer line is not buffered: ``line`` holds only its first bytes and
+    ``tail`` its last, and ``size`` is its full length.
+    """
+    buffer = bytearray()
+    tail: bytearray | None = None
+    size = 0
+    limit = max_bytes()
+    while True:
+        chunk = await stdin.read1(_CHUNK)
+        if not chunk:
+            break
+        start = 0
+        while start <= len(chunk):
+            end = chunk.find(b"\n", start)
+            stop = len(chunk) if end < 0 else end
+            size += stop - start
+            if tail is None and limit and size > limit:
+                tail = buffer[-_EDGE:]
+                del buffer[_EDGE:]
+            if tail is None:
+                buffer += chunk[start:stop]
+            else:
+                if len(buffer) < _EDGE:
+                    buffer += chunk[start : start + _EDGE - len(buffer)]
+                tail += chunk[max(start, stop - _EDGE) : stop]
+                del tail[:-_EDGE]
+            if end < 0:
+                break
+            if tail is None:
+                yield bytes(buffer.rstrip(b"\r")), size, None
+            else:
+                yield bytes(buffer), size, bytes(tail.rstrip(b"\r"))
+            buffer.clear()
+            tail = None
+            size = 0
+            limit = max_bytes()
+            start = end + 1
+    if size:
+        yield bytes(buffer), size, None if tail is None else bytes(tail)
+
+
+@asynccontextmanager
+async def stdio_server(
+    stdin: anyio.AsyncFile[bytes] | None = None,
+    stdout: anyio.AsyncFile[bytes] | None = None,
+    max_bytes: Callable[[], int] = lambda: 0,
+) -> AsyncIterator[
+    tuple[
+        MemoryObjectReceiveStream[SessionMessage | Exception],
+        MemoryObjectSendStream[SessionMessage],
+    ]
+]:
+    """Serve newline-delimited JSON-RPC over stdin and stdout.
+
+    A drop-in for :func:`mcp.server.stdio.stdio_server` whose messages carry
+    a :class:`RawMessage` with their size. ``max_bytes`` returns the current
+    message size limit (``0`` for none).
+    """
+    if stdin is None:
+        stdin = anyio.wrap_file(sys.stdin.buffer)
+    if stdout is None:
+        stdout = anyio.wrap_file(sys.stdout.buffer)
+
+    read_writer, read_stream = anyio.create_memory_object_stream[
+        SessionMessage | Exception
+    ](0)
+    write_stream, write_reader = anyio.create_memory_object_stream[SessionMessage](0)
+    stdout_lock = anyio.Lock()
+
+    async def write_line(data: str) -> None:
+        async with stdout_lock:
+            await stdout.write(data.encode("utf-8") + b"\n")
+            await stdout.flush()
+
+    async def reject(head: bytes, tail: bytes, size: int) -> None:
+        match = _LEADING_ID.match(head) or _TRAILING_ID.search(tail)
+        request_id = json.loads(match.group(1)) if match else None
+        error = request_too_large(max_bytes(), size)
+        response = {"jsonrpc": "2.0", "id": request_id, "error": error.to_dict()}
+        await write_line(json.dumps(response))
+
+    async def stdin_reader() -> None:
+        try:
+            async with read_writer:
+                async for line, size, tail in _read_lines(stdin, max_bytes):
+                    if tail is not None:
+                        await reject(line, tail, size)
+                        continue
+                    if not line.strip():
+                        continue
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as exc:  # noqa: BLE001 - reported to the server
+                        await read_writer.send(exc)
+                        continue
+                    metadata = ServerMessageMetadata(request_context=RawMessage(size))
+                    await read_writer.send(SessionMessage(message, metadata=metadata))
+        except anyio.ClosedResourceError:  # pragma: no cover - server shut down
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer() -> None:
+        try:
+            async with write_reader:
+                async for session_message in write_reader:
+                    await write_line(
+                        session_message.message.model_dump_json(
+                            by_alias=True, exclude_none=True
+                        )
+                    )
+        except anyio.ClosedResourceError:  # pragma: no cover - server shut down
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
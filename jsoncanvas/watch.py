@@ -0,0 +1,226 @@
+"""Watch a directory of ``.canvas`` files for changes made outside the server.
+
+:class:`CanvasWatcher` reports the names of ``.canvas`` files that were
+created, modified, renamed or deleted. On Linux it uses inotify (through
+``ctypes``, no extra dependency); elsewhere, or if inotify is unavailable, it
+falls back to polling the directory with :func:`os.scandir` and diffing each
+file's mtime and size.
+
+Editors and sync tools tend to write in bursts (temp file, rename, touch), so
+events are debounced: names accumulate until the directory has been quiet for
+``debounce`` seconds (or ``max_delay`` has passed since the first event) and
+are then delivered to the callback as one coalesced set.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Literal
+
+# inotify(7) constants.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_SUFFIX = ".canvas"
+
+
+def _inotify_open(directory: Path) -> int | None:
+    """Return an inotify fd watching ``directory``, or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+        os.close(fd)  # e.g. max_user_watches exhausted
+        return None
+    return fd
+
+
+def _parse_events(data: bytes) -> tuple[set[str], bool, bool]:
+    """Decode inotify events into ``(canvas names, overflowed, watch gone)``."""
+    names: set[str] = set()
+    overflow = gone = False
+    pos = 0
+    while pos + _EVENT_HEADER.size <= len(data):
+        _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+        start = pos + _EVENT_HEADER.size
+        name = os.fsdecode(data[start : start + length].rstrip(b"\0"))
+        pos = start + length
+        if mask & _IN_Q_OVERFLOW:
+            overflow = True
+        if mask & (_IN_IGNORED | _IN_DELETE_SELF | _IN_MOVE_SELF):
+            gone = True
+        if name.endswith(_SUFFIX) and not name.startswith("."):
+            names.add(name)
+    return names, overflow, gone
+
+
+def _snapshot(directory: Path) -> dict[str, tuple[int, int]]:
+    """Map each ``.canvas`` file in ``directory`` to its ``(mtime_ns, size)``."""
+    state = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(_SUFFIX) or entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        state[entry.name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue  # deleted between listing and stat
+    except OSError:
+        pass
+    return state
+
+
+class CanvasWatcher:
+    """Report changed ``.canvas`` files in one directory to a callback.
+
+    The callback runs on the watcher's own daemon thread with a set of file
+    names; exceptions it raises are logged and do not stop the watcher.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        callback: Callable[[set[str]], None],
+        debounce: float = 0.2,
+        max_delay: float = 2.0,
+        poll_interval: float = 1.0,
+        backend: Literal["auto", "inotify", "poll"] = "auto",
+    ) -> None:
+        """Initialize a watcher (call :meth:`start` to begin watching).
+
+        Args:
+            directory: Directory to watch (not recursive)
+            callback: Called with the set of changed file names
+            debounce: Quiet period that ends a burst of events, in seconds
+            max_delay: Longest a change is held back during a continuous burst
+            poll_interval: Scan interval for the polling backend, in seconds
+            backend: ``inotify``, ``poll``, or ``auto`` (inotify if available)
+        """
+        self.directory = Path(directory)
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._requested = backend
+        self.backend: str | None = None
+        self._fd: int | None = None
+        self._state: dict[str, tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> CanvasWatcher:
+        """Start watching on a background thread; returns ``self``."""
+        if self._requested != "poll":
+            self._fd = _inotify_open(self.directory)
+            if self._fd is None and self._requested == "inotify":
+                raise OSError(f"inotify is not available for {self.directory}")
+        if self._fd is not None:
+            self.backend = "inotify"
+        else:
+            self.backend = "poll"
+            self._state = _snapshot(self.directory)
+        self._thread = threading.Thread(
+            target=self._run, name="jsoncanvas-watch", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop watching and release the inotify descriptor."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self) -> None:
+        pending: set[str] = set()
+        first = last = 0.0
+        while not self._stop.is_set():
+            wait = self.debounce if pending else self.poll_interval
+            names = self._next_events(wait)
+            now = time.monotonic()
+            if names:
+                if not pending:
+                    first = now
+                pending |= names
+                last = now
+            if pending and (
+                now - last >= self.debounce or now - first >= self.max_delay
+            ):
+                self._deliver(pending)
+                pending = set()
+
+    def _next_events(self, wait: float) -> set[str]:
+        """Block for up to ``wait`` seconds; return names seen meanwhile."""
+        if self._fd is None:
+            self._stop.wait(wait)
+            current = _snapshot(self.directory)
+            changed = {
+                name
+                for name in current.keys() | self._state.keys()
+                if current.get(name) != self._state.get(name)
+            }
+            self._state = current
+            return changed
+
+        readable, _, _ = select.select([self._fd], [], [], min(wait, 0.1))
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names, overflow, gone = _parse_events(data)
+        if overflow:
+            # The kernel dropped events: treat every current file as changed.
+            names |= _snapshot(self.directory).keys()
+        if gone:
+            # The directory itself was removed or moved; keep going by polling.
+            os.close(self._fd)
+            self._fd = None
+            self.backend = "poll"
+            self._state = _snapshot(self.directory)
+        return names
+
+    def _deliver(self, names: set[str]) -> None:
+        try:
+            self.callback(names)
+        except Exception as exc:  # noqa: BLE001 - a bad hook must not kill the thread
+            print(f"Canvas watcher callback failed: {exc!r}", file=sys.stderr)
@@ -0,0 +1,242 @@
+"""Keep recently written canvases in memory and flush them to disk later.
+
+Agents tend to make many small edits to one canvas in a row, and writing the
+whole file for each of them costs far more than the edit. A
+:class:`WriteBehindBuffer` holds the latest content of each canvas written
+through it and is the source of truth for those canvases. A background
+thread writes a canvas to disk once it has not been written for ``interval``
+seconds, so a burst of edits becomes one file write. A canvas that keeps
+being edited is still flushed every ``max_delay`` seconds.
+
+Dirty canvases are also flushed when the buffer goes over ``max_bytes`` and
+evicts its least recently used entries, when :meth:`~WriteBehindBuffer.flush`
+is called (before anything that reads the files directly), and at
+:meth:`~WriteBehindBuffer.close`.
+
+Flushed canvases stay in memory until evicted. A flushed entry is only
+served while its file is unchanged (same mtime and size), so edits made by
+other programs after a flush are seen. A canvas that is still dirty wins
+over such an edit when it is flushed.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+
+@dataclass
+class _Entry:
+    raw: bytes
+    version: str
+    dirty_since: float | None  # None once flushed
+    written_at: float
+    stat: tuple[int, int] | None = None  # (mtime_ns, size) after the last flush
+
+
+class WriteBehindBuffer:
+    """An LRU of canvas contents by file name, written to disk in the background.
+
+    The buffer and its flusher thread are safe to use from any thread. Flushes
+    run one at a time, so a file is never overwritten by older content.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        write: Callable[[Path, bytes, str], None],
+        interval: float = 1.0,
+        max_delay: float = 10.0,
+        max_bytes: int = 256 << 20,
+    ) -> None:
+        """Initialize a buffer (call :meth:`start` to begin flushing).
+
+        Args:
+            directory: Directory the canvas files live in
+            write: Writes ``(path, raw, version)`` to disk
+            interval: Quiet period after a write before it is flushed, in seconds
+            max_delay: Longest a write is held back while edits keep coming
+            max_bytes: Memory budget; least recently used canvases beyond it are
+                flushed (if dirty) and dropped
+        """
+        self.directory = Path(directory)
+        self.write = write
+        self.interval = interval
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self.flushes = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> WriteBehindBuffer:
+        """Start the background flusher; returns ``self``."""
+        self._thread = threading.Thread(
+            target=self._run, name="jsoncanvas-write-behind", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the flusher and write every dirty canvas."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def get(self, name: str) -> bytes | None:
+        """Return the latest content of canvas ``name``, or None if not held.
+
+        A flushed entry whose file was changed since is dropped (None).
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            self._entries.move_to_end(name)
+            if entry.dirty_since is not None:
+                return entry.raw
+            expected, raw = entry.stat, entry.raw
+        try:
+            st = os.stat(self.directory / name)
+            current: tuple[int, int] | None = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            current = None
+        if current == expected:
+            return raw
+        with self._lock:
+            if self._entries.get(name) is entry:
+                self._drop(name)
+        return None
+
+    def put(self, name: str, raw: bytes, version: str) -> None:
+        """Make ``raw`` the content of canvas ``name``, to be flushed later."""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None:
+                self._size -= len(previous.raw)
+            dirty_since = now
+            if previous is not None and previous.dirty_since is not None:
+                dirty_since = previous.dirty_since
+            self._entries[name] = _Entry(raw, version, dirty_since, now)
+            self._size += len(raw)
+            evicted = self._trim()
+        self._wake.set()
+        if evicted:
+            # Memory pressure: write the oldest dirty canvases now, then let
+            # them go.
+            self._flush_entries(evicted)
+            with self._lock:
+                self._trim()
+
+    def names(self) -> set[str]:
+        """Return the names of the canvases held in memory."""
+        with self._lock:
+            return set(self._entries)
+
+    def pending(self) -> set[str]:
+        """Return the names of canvases not yet written to disk."""
+        with self._lock:
+            return {n for n, e in self._entries.items() if e.dirty_since is not None}
+
+    def flush(self, names: Iterable[str] | None = None) -> None:
+        """Write dirty canvases (all, or just ``names``) to disk now."""
+        with self._lock:
+            wanted = self._entries.keys() if names is None else names
+            dirty = [
+                (name, self._entries[name])
+                for name in wanted
+                if name in self._entries and self._entries[name].dirty_since is not None
+            ]
+        self._flush_entries(dirty)
+
+    def _trim(self) -> list[tuple[str, _Entry]]:
+        """Drop least recently used clean entries until within ``max_bytes``.
+
+        Dirty entries are never dropped before they are flushed (reads must
+        keep seeing them); those that would be are returned for flushing. The
+        newest entry is always kept. Called with the lock held.
+        """
+        if not self.max_bytes or self._size <= self.max_bytes:
+            return []
+        to_flush = []
+        size = self._size
+        for name, entry in list(self._entries.items())[:-1]:
+            if size <= self.max_bytes:
+                break
+            size -= len(entry.raw)
+            if entry.dirty_since is None:
+                self._drop(name)
+            else:
+                to_flush.append((name, entry))
+        return to_flush
+
+    def _drop(self, name: str) -> None:
+        entry = self._entries.pop(name)
+        self._size -= len(entry.raw)
+
+    def _flush_entries(self, entries: list[tuple[str, _Entry]]) -> None:
+        with self._flush_lock:
+            for name, entry in entries:
+                with self._lock:
+                    if (
+                        self._entries.get(name) is not entry
+                        or entry.dirty_since is None
+                    ):
+                        continue  # superseded or already written meanwhile
+                path = self.directory / name
+                try:
+                    self.write(path, entry.raw, entry.version)
+                    st = os.stat(path)
+                except Exception as exc:  # noqa: BLE001 - retried after a pause
+                    print(
+                        f"Write-behind flush of {name} failed: {exc!r}", file=sys.stderr
+                    )
+                    with self._lock:
+                        if entry.dirty_since is not None:
+                            entry.dirty_since = entry.written_at = time.monotonic()
+                    continue
+                self.flushes += 1
+                with self._lock:
+                    # A put() meanwhile replaced the entry; that one stays dirty.
+                    if self._entries.get(name) is entry:
+                        entry.dirty_since = None
+                        entry.stat = (st.st_mtime_ns, st.st_size)
+
+    def _due(self, now: float) -> tuple[list[tuple[str, _Entry]], float]:
+        """Return the dirty entries due for flushing and the wait until the next."""
+        due = []
+        wait = self.interval
+        with self._lock:
+            for name, entry in self._entries.items():
+                if entry.dirty_since is None:
+                    continue
+                deadline = min(
+                    entry.written_at + self.interval, entry.dirty_since + self.max_delay
+                )
+                if deadline <= now:
+                    due.append((name, entry))
+                else:
+                    wait = min(wait, deadline - now)
+        return due, wait
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            due, wait = self._due(time.monotonic())
+            if due:
+                self._flush_entries(due)
+                continue
+            self._wake.wait(wait)
+            self._wake.clear()
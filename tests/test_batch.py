@@ -0,0 +1,73 @@
+"""Tests for batch export."""
+
+import gzip
+import json
+
+import pytest
+
+from jsoncanvas import Canvas, Edge, TextNode
+from jsoncanvas.batch import batch_export, export_key, read_manifest
+from jsoncanvas.cache import ExportCache, content_hash
+from jsoncanvas.export import to_markdown, to_svg
+
+
+def _write_canvas(directory, name: str, text: str):
+    canvas = Canvas()
+    canvas.add_node(TextNode(id="a", x=0, y=0, width=200, height=80, text=text))
+    canvas.add_node(TextNode(id="b", x=300, y=0, width=200, height=80, text="B"))
+    canvas.add_edge(Edge(id="e", from_node="a", to_node="b"))
+    path = directory / f"{name}.canvas"
+    path.write_text(json.dumps(canvas.to_dict()))
+    return path, canvas
+
+
+def test_batch_export_writes_every_format_and_a_manifest(tmp_path):
+    one, canvas_one = _write_canvas(tmp_path, "one", "# One")
+    two, _ = _write_canvas(tmp_path, "two", "# Two")
+    out = tmp_path / "out"
+
+    manifest = batch_export([one, two], ["markdown", "svg", "svgz"], out, max_workers=2)
+    assert [e["status"] for e in manifest["entries"]] == ["rendered"] * 6
+    assert (out / "one.md").read_text() == to_markdown(canvas_one, title="one")
+    assert (out / "one.svg").read_text() == to_svg(canvas_one)
+    svgz = gzip.decompress((out / "one.svgz").read_bytes()).decode()
+    assert svgz == to_svg(canvas_one, compact=True)
+    assert read_manifest(out) == manifest
+
+
+def test_batch_export_skips_unchanged_and_reuses_cache(tmp_path):
+    one, _ = _write_canvas(tmp_path, "one", "# One")
+    two, _ = _write_canvas(tmp_path, "two", "# Two")
+    out = tmp_path / "out"
+    cache = ExportCache()
+    batch_export([one, two], ["svg"], out, cache=cache, max_workers=1)
+
+    # Only the edited canvas is re-rendered; the other is skipped.
+    _write_canvas(tmp_path, "two", "# Two, edited")
+    manifest = batch_export([one, two], ["svg"], out, cache=cache, max_workers=1)
+    assert [e["status"] for e in manifest["entries"]] == ["skipped", "rendered"]
+    assert "Two, edited" in (out / "two.svg").read_text()
+
+    # A fresh target directory is filled from the cache without rendering.
+    manifest = batch_export([one, two], ["svg"], tmp_path / "fresh", cache=cache)
+    assert [e["status"] for e in manifest["entries"]] == ["cached", "cached"]
+    key = export_key(content_hash(one.read_bytes()), "svg", "one")
+    assert manifest["entries"][0]["key"] == key
+
+
+def test_batch_export_reports_bad_canvases_per_entry(tmp_path):
+    good, _ = _write_canvas(tmp_path, "good", "# Good")
+    bad = tmp_path / "bad.canvas"
+    bad.write_text("{not json")
+    manifest = batch_export(
+        [good, bad, tmp_path / "missing.canvas"], ["markdown"], tmp_path / "out"
+    )
+    statuses = [(e["canvas"], e["status"]) for e in manifest["entries"]]
+    assert statuses == [
+        ("good.canvas", "rendered"),
+        ("bad.canvas", "error"),
+        ("missing.canvas", "error"),
+    ]
+    assert "JSONDecodeError" in manifest["entries"][1]["error"]
+    with pytest.raises(ValueError, match="Unsupported"):
+        batch_export([good], ["png"], tmp_path / "out")
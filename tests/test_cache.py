@@ -0,0 +1,45 @@
+"""Tests for the export caches."""
+
+from jsoncanvas.cache import ExportCache, FragmentCache, content_hash
+
+
+def test_content_hash_is_stable_and_content_sensitive():
+    assert content_hash("abc") == content_hash(b"abc")
+    assert content_hash("abc") != content_hash("abd")
+    assert len(content_hash("abc")) == 16
+
+
+def test_key_depends_on_hash_format_and_options():
+    key = ExportCache.key("h1", "markdown", title="A")
+    assert key == ExportCache.key("h1", "markdown", title="A")
+    assert key != ExportCache.key("h2", "markdown", title="A")
+    assert key != ExportCache.key("h1", "svg", title="A")
+    assert key != ExportCache.key("h1", "markdown", title="B")
+
+
+def test_memory_tier_is_lru_bounded():
+    cache = ExportCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"  # refreshes "a"
+    cache.put("c", b"3")  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ExportCache(directory=tmp_path).put("k", b"rendered")
+    fresh = ExportCache(directory=tmp_path)
+    assert fresh.get("k") == b"rendered"
+    assert not list(tmp_path.glob(".tmp-*"))  # atomic write left no temp files
+
+
+def test_fragment_cache_is_lru_bounded():
+    cache = FragmentCache(max_entries=2)
+    cache.put(("node", 1), "<a/>")
+    cache.put(("node", 2), "<b/>")
+    assert cache.get(("node", 1)) == "<a/>"
+    cache.put(("node", 3), "<c/>")  # evicts ("node", 2)
+    assert cache.get(("node", 2)) is None
+    assert len(cache) == 2 and (cache.hits, cache.misses) == (1, 1)
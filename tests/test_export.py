@@ -1,7 +1,10 @@
 """Tests for the canvas exporters."""
 
+import pytest
+
 from jsoncanvas import Canvas, Edge, GroupNode, LinkNode, TextNode
-from jsoncanvas.export import to_markdown, to_svg
+from jsoncanvas.cache import FragmentCache
+from jsoncanvas.export import iter_markdown, iter_svg, to_markdown, to_svg
 
 
 def _sample() -> Canvas:
@@ -79,6 +82,56 @@ def test_to_svg_escapes_color_as_backstop():
     assert "&quot;" in svg and "&lt;script&gt;" in svg  # escaped instead
 
 
+def test_compact_svg_is_smaller_and_class_styled():
+    canvas = _sample()
+    canvas.add_edge(Edge(id="e2", from_node="lnk", to_node="root", to_end="none"))
+    default, compact = to_svg(canvas), to_svg(canvas, compact=True)
+    assert len(compact) < len(default)
+    assert "<style>" in compact and 'class="n s' in compact
+    assert "font-size=" not in compact and "stroke-width=" not in compact
+    assert "." not in compact.split('<path class="e')[1].split('"/>')[0]  # integers
+    # Only colours with an arrowhead get a marker definition.
+    assert compact.count("<marker") == 1
+    # Same text and element counts as the default form.
+    assert compact.count("<rect") == default.count("<rect")
+    assert compact.count("<text") == default.count("<text")
+    assert compact.count('<path class="e') == default.count('fill="none"')
+    assert "".join(iter_svg(canvas, compact=True)) == compact
+    assert to_svg(Canvas(), compact=True) == to_svg(Canvas())
+
+
+def test_compact_svg_keeps_the_colour_backstop():
+    canvas = Canvas()
+    node = TextNode(id="x", x=0, y=0, width=200, height=80, text="hi")
+    node.color = "#fff}*{display:none"  # bypass __init__ validation
+    canvas.add_node(node)
+    svg = to_svg(canvas, compact=True)
+    assert "display:none" not in svg and "}*{" not in svg
+
+
+def test_svg_fragments_rerender_only_changed_elements():
+    for compact in (False, True):
+        data = _sample().to_dict()
+        fragments = FragmentCache()
+        cold = to_svg(Canvas.from_dict(data), compact, fragments)
+        assert cold == to_svg(Canvas.from_dict(data), compact)
+        assert fragments.misses == 5  # 4 nodes + 1 edge
+
+        # A text change re-renders that node only; its edge geometry is unchanged.
+        data["nodes"][0]["text"] = "# Renamed"
+        misses = fragments.misses
+        edited = to_svg(Canvas.from_dict(data), compact, fragments)
+        assert fragments.misses - misses == 1
+        assert edited == to_svg(Canvas.from_dict(data), compact)
+
+        # A move inside the bounds re-renders the node and its attached edge.
+        data["nodes"][0]["y"] += 5
+        misses = fragments.misses
+        moved = to_svg(Canvas.from_dict(data), compact, fragments)
+        assert fragments.misses - misses == 2
+        assert moved == to_svg(Canvas.from_dict(data), compact)
+
+
 def test_to_markdown_deep_chain_does_not_recurse():
     # A long edge chain must not blow the Python recursion limit (the DFS is
     # iterative). 5000 >> sys.getrecursionlimit() (~1000).
@@ -92,3 +145,73 @@ def test_to_markdown_deep_chain_does_not_recurse():
     ]
     md = to_markdown(Canvas(nodes=nodes, edges=edges))
     assert "## node 0" in md and f"## node {n - 1}" in md
+
+
+def test_iter_variants_stream_the_same_documents():
+    canvas = _sample()
+    md_chunks = list(iter_markdown(canvas, title="Demo"))
+    svg_chunks = list(iter_svg(canvas))
+    assert len(md_chunks) > 1 and len(svg_chunks) > 1  # genuinely incremental
+    assert "".join(md_chunks) == to_markdown(canvas, title="Demo")
+    assert "".join(svg_chunks) == to_svg(canvas)
+    assert "".join(iter_svg(Canvas())) == to_svg(Canvas())
+
+
+def test_iter_markdown_ends_with_a_single_newline():
+    canvas = Canvas()
+    canvas.add_node(TextNode(id="a", x=0, y=0, width=10, height=10, text="A"))
+    canvas.add_node(TextNode(id="b", x=20, y=0, width=10, height=10, text="B"))
+    canvas.add_edge(Edge(id="e", from_node="a", to_node="b", label="trailing\n\n"))
+    md = "".join(iter_markdown(canvas))
+    assert md.endswith("trailing\n") and not md.endswith("\n\n")
+
+
+def _png_size(png: bytes) -> tuple[int, int]:
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    return int.from_bytes(png[16:20], "big"), int.from_bytes(png[20:24], "big")
+
+
+def test_svg_to_png_renders_at_scale():
+    pytest.importorskip("resvg_py")
+    from jsoncanvas.raster import svg_size, svg_to_png
+
+    svg = to_svg(_sample())
+    width, height = svg_size(svg)
+    assert _png_size(svg_to_png(svg, scale=1.0)) == (round(width), round(height))
+    assert _png_size(svg_to_png(svg, scale=2.0)) == (
+        round(width * 2),
+        round(height * 2),
+    )
+    # Out-of-range scales are clamped to 1.0-3.0.
+    assert _png_size(svg_to_png(svg, scale=10)) == _png_size(svg_to_png(svg, 3.0))
+
+
+def test_svg_to_png_caps_dimensions():
+    pytest.importorskip("resvg_py")
+    from jsoncanvas.raster import MAX_DIMENSION, svg_to_png
+
+    canvas = Canvas()
+    canvas.add_node(TextNode(id="w", x=0, y=0, width=20000, height=100, text="w"))
+    width, height = _png_size(svg_to_png(to_svg(canvas), scale=3.0))
+    assert width <= MAX_DIMENSION and height < 100
+
+
+def test_render_png_times_out():
+    pytest.importorskip("resvg_py")
+    from jsoncanvas import raster
+
+    # The worker never gets to reply within a zero timeout; it is killed.
+    with pytest.raises(TimeoutError):
+        raster.render_png(to_svg(_sample()), timeout=0)
+
+
+def test_to_thumbnail_svg_draws_boxes_and_culls_tiny_nodes():
+    from jsoncanvas.export import to_thumbnail_svg
+
+    canvas = _sample()
+    canvas.add_node(TextNode(id="dot", x=5000, y=5000, width=4, height=4, text="."))
+    svg = to_thumbnail_svg(canvas, size=128)
+    assert svg.startswith("<svg") and 'width="128"' in svg
+    assert "<text" not in svg and "<path" not in svg  # boxes only
+    # Background + 4 visible nodes; the 4px node is below 2px at this scale.
+    assert svg.count("<rect") == 5
@@ -0,0 +1,162 @@
+"""Tests for append-only canvas edit journals."""
+
+import json
+import os
+
+import pytest
+
+from jsoncanvas.journal import (
+    CanvasJournal,
+    apply_record,
+    journal_path,
+    main,
+    serialise,
+)
+
+
+def _node(node_id, text="t"):
+    return {"id": node_id, "type": "text", "x": 0, "y": 0, "width": 1,
+            "height": 1, "text": text}  # fmt: skip
+
+
+BASE = {
+    "nodes": [_node("a"), _node("b"), _node("c")],
+    "edges": [{"id": "e", "fromNode": "a", "toNode": "b"}],
+}
+EDIT = {"update_nodes": [_node("b", "new")], "add_nodes": [_node("d")]}
+
+
+def _write(target, content):
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, target)
+
+
+@pytest.fixture
+def target(tmp_path):
+    return tmp_path / "a.canvas"
+
+
+def _edited(data, *records):
+    data = json.loads(json.dumps(data))
+    for record in records:
+        apply_record(data, record)
+    return serialise(data)
+
+
+def test_apply_record_matches_canvas_edit_order():
+    data = json.loads(json.dumps(BASE))
+    apply_record(data, EDIT)
+    assert [n["id"] for n in data["nodes"]] == ["a", "b", "c", "d"]
+    assert data["nodes"][1]["text"] == "new"
+
+    apply_record(data, {"remove_node_ids": ["a"], "remove_edge_ids": ["e"]})
+    assert [n["id"] for n in data["nodes"]] == ["b", "c", "d"]
+    assert "edges" not in data
+
+
+def test_edits_are_appended_and_replayed(target):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    assert journal.save(target, base) == 0  # first save writes the file
+    assert journal.read(target) == base
+
+    first = _edited(BASE, EDIT)
+    appended = journal.save(target, first, EDIT, previous=base)
+    assert 0 < appended < len(first) / 2
+    assert target.read_bytes() == base
+    assert journal.read(target) == first
+
+    # A fresh journal (a restarted server) replays the log from disk.
+    assert CanvasJournal(_write).read(target) == first
+
+
+def test_journal_is_compacted_past_its_limits(target):
+    journal = CanvasJournal(_write, max_records=2)
+    content = serialise(BASE)
+    journal.save(target, content)
+    records = [{"add_nodes": [_node(f"n{i}")]} for i in range(3)]
+    appended = []
+    for i, record in enumerate(records):
+        new = _edited(BASE, *records[: i + 1])
+        appended.append(journal.save(target, new, record, previous=content))
+        content = new
+    assert [bool(n) for n in appended] == [True, True, False]
+    assert target.read_bytes() == content
+    assert journal_path(target).read_bytes().count(b"\n") == 1  # header only
+
+
+def test_stale_previous_content_forces_a_rewrite(target):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    journal.save(target, base)
+    first = _edited(BASE, EDIT)
+    journal.save(target, first, EDIT, previous=base)
+
+    # A second edit computed from the old content must not be appended on
+    # top of the first.
+    other = _edited(BASE, {"remove_node_ids": ["c"]})
+    assert journal.save(target, other, {"remove_node_ids": ["c"]}, base) == 0
+    assert target.read_bytes() == other
+    assert CanvasJournal(_write).read(target) == other  # journal restarted
+
+
+def test_torn_record_is_ignored_after_a_crash(target):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    journal.save(target, base)
+    first = _edited(BASE, EDIT)
+    journal.save(target, first, EDIT, previous=base)
+    with journal_path(target).open("ab") as fh:
+        fh.write(b'{"remove_node_ids":["a"')  # crash mid-append
+
+    recovered = CanvasJournal(_write)
+    assert recovered.read(target) == first
+    # The next save rewrites instead of appending after the torn bytes.
+    second = _edited(BASE, EDIT, {"remove_node_ids": ["d"]})
+    assert recovered.save(target, second, {"remove_node_ids": ["d"]}, first) == 0
+    assert target.read_bytes() == second
+    assert CanvasJournal(_write).read(target) == second
+
+
+def test_crash_between_compaction_steps_keeps_the_latest_content(target):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    journal.save(target, base)
+    first = _edited(BASE, EDIT)
+    journal.save(target, first, EDIT, previous=base)
+
+    # Compaction wrote the file, then crashed before restarting the journal:
+    # the old journal no longer matches the file and must not be replayed.
+    _write(target, first)
+    assert CanvasJournal(_write).read(target) is None
+    assert target.read_bytes() == first
+
+
+def test_external_edit_invalidates_the_journal(target):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    journal.save(target, base)
+    journal.save(target, _edited(BASE, EDIT), EDIT, previous=base)
+
+    target.write_text(json.dumps({"nodes": [_node("x")]}))
+    assert journal.read(target) is None
+
+
+def test_compact_all_and_cli_fold_journals(target, tmp_path, capsys):
+    journal = CanvasJournal(_write)
+    base = serialise(BASE)
+    journal.save(target, base)
+    first = _edited(BASE, EDIT)
+    journal.save(target, first, EDIT, previous=base)
+
+    assert main(["compact", str(tmp_path)]) == 0
+    assert "Compacted 1 journals" in capsys.readouterr().out
+    assert target.read_bytes() == first
+
+    second = _edited(BASE, EDIT, {"remove_node_ids": ["d"]})
+    journal.read(target)
+    journal.save(target, second, {"remove_node_ids": ["d"]}, previous=first)
+    journal.compact_all()
+    assert target.read_bytes() == second
+    assert journal_path(target).read_bytes().count(b"\n") == 1
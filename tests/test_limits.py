@@ -0,0 +1,104 @@
+"""Tests for request and canvas size limits."""
+
+import json
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from jsoncanvas.errors import ErrorCode, LimitExceededError
+from jsoncanvas.limits import Limits, RequestBodyLimit
+
+
+def test_from_env_overrides_defaults():
+    limits = Limits.from_env({"MCP_MAX_NODES": "10", "MCP_MAX_FILE_BYTES": "0"})
+    assert limits.max_nodes == 10
+    assert limits.max_file_bytes == 0
+    assert limits.max_edges == Limits().max_edges
+
+
+def test_node_array_length_is_checked_before_its_elements():
+    limits = Limits(max_nodes=2)
+
+    class Untouchable(dict):
+        def get(self, *args):
+            raise AssertionError("elements of an oversized array were read")
+
+    with pytest.raises(LimitExceededError) as info:
+        limits.check_arguments({"nodes": [Untouchable()] * 3})
+    assert info.value.code == ErrorCode.INVALID_PARAMS
+    assert info.value.data == {"limit": "max_nodes", "max": 2, "actual": 3}
+    assert "MCP_MAX_NODES" in info.value.message
+
+
+def test_nested_arrays_are_checked():
+    limits = Limits(max_edges=1)
+    operations = {"operations": [{"op": "edit", "add_edges": [{}, {}]}]}
+    with pytest.raises(LimitExceededError, match="'add_edges'"):
+        limits.check_arguments(operations)
+    limits.check_arguments({"canvas": {"edges": [{}]}})
+
+
+def test_text_limit_counts_utf8_bytes():
+    limits = Limits(max_text_bytes=8)
+    limits.check_arguments({"nodes": [{"id": "a", "text": "abcdefgh"}]})
+    with pytest.raises(LimitExceededError) as info:
+        limits.check_arguments({"add_nodes": [{"id": "a", "text": "éééé" + "a"}]})
+    assert info.value.data["actual"] == 9
+
+
+def test_zero_disables_a_limit():
+    limits = Limits(max_nodes=0, max_file_bytes=0)
+    limits.check_arguments({"nodes": [{}] * 1000})
+    limits.check_file_bytes(10**12, "huge.canvas")
+    with pytest.raises(LimitExceededError):
+        Limits(max_edges=1).check_counts(0, 2)
+
+
+@pytest.fixture
+def http_client():
+    async def echo(request: Request) -> JSONResponse:
+        return JSONResponse({"received": len(await request.body())})
+
+    app = Starlette(routes=[Route("/", echo, methods=["POST"])])
+    app.add_middleware(RequestBodyLimit, max_bytes=lambda: 100)
+    return TestClient(app)
+
+
+def test_body_limit_passes_small_bodies(http_client):
+    resp = http_client.post("/", content=b"x" * 100)
+    assert resp.status_code == 200
+    assert resp.json() == {"received": 100}
+
+
+def test_body_limit_rejects_declared_length(http_client):
+    resp = http_client.post("/", content=b"x" * 101)
+    assert resp.status_code == 413
+    error = resp.json()["error"]
+    assert error["code"] == ErrorCode.INVALID_REQUEST
+    assert error["data"] == {"limit": "max_request_bytes", "max": 100, "actual": 101}
+
+
+async def test_body_limit_stops_reading_a_streamed_body():
+    chunks = [b"x" * 30] * 10
+    received = []
+    sent = []
+
+    async def receive():
+        received.append(chunks[len(received)])
+        return {"type": "http.request", "body": received[-1], "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        raise AssertionError("oversized body reached the app")
+
+    middleware = RequestBodyLimit(app, max_bytes=lambda: 100)
+    await middleware({"type": "http", "headers": []}, receive, send)
+    assert len(received) == 4  # stopped at 120 bytes of 300
+    assert sent[0]["status"] == 413
+    assert json.loads(sent[1]["body"])["error"]["data"]["actual"] == 120
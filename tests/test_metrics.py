@@ -0,0 +1,44 @@
+"""Tests for the metrics registry and Prometheus text rendering."""
+
+import pytest
+
+from jsoncanvas.metrics import Gauge, MetricsRegistry
+
+
+def test_render_counters_histograms_and_collectors():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ["tool"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["tool"], [0.1, 1])
+    calls.inc(tool="a")
+    calls.inc(2, tool='b"x')
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, tool="a")
+
+    @registry.collector
+    def _collect():
+        ratio = Gauge("ratio", "Ratio.")
+        ratio.set(0.25)
+        return [ratio]
+
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{tool="a"} 1' in text
+    assert 'calls_total{tool="b\\"x"} 2' in text
+    # Buckets are cumulative and inclusive of their upper bound.
+    assert 'latency_seconds_bucket{tool="a",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{tool="a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{tool="a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{tool="a"} 4' in text
+    assert "ratio 0.25" in text
+    assert latency.count(tool="a") == 4
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls.", ["tool"])
+    with pytest.raises(ValueError):
+        calls.inc(status="ok")
+    with pytest.raises(ValueError):
+        calls.inc(-1, tool="a")
+    with pytest.raises(ValueError):
+        registry.counter("calls_total", "Again.")
@@ -0,0 +1,91 @@
+"""Tests for per-call profiling."""
+
+import json
+
+import pytest
+
+from jsoncanvas import profiling
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    """Install a profiler writing to a temporary directory."""
+    installed = profiling.Profiler(tmp_path / "profiles")
+    profiling.set_profiler(installed)
+    try:
+        yield installed
+    finally:
+        profiling.set_profiler(None)
+
+
+def _records(directory):
+    return [json.loads(p.read_text()) for p in sorted(directory.glob("*.json"))]
+
+
+def test_disabled_profiling_is_a_shared_noop():
+    assert not profiling.enabled()
+    first = profiling.call("a", {})
+    assert first is profiling.call("b", {"x": 1})
+    with first as record:
+        record.set(status="ok")
+        profiling.note(nodes=1)
+
+
+def test_call_writes_stats_and_allocation_record(profiler):
+    with profiling.call("edit_canvas", {"filename": "a.canvas", "nodes": [1, 2]}) as p:
+        retained = [bytearray(1024) for _ in range(200)]
+        profiling.note(nodes=3, edges=1)
+        profiling.note(nodes=2, edges=0)
+        p.set(status="ok")
+
+    (record,) = _records(profiler.directory)
+    assert record["tool"] == "edit_canvas"
+    assert record["arguments"] == {"filename": "a.canvas", "nodes": "list[2]"}
+    assert (record["nodes"], record["edges"]) == (5, 1)
+    assert record["status"] == "ok"
+    assert record["duration_ms"] >= 0
+    assert record["peak_bytes"] >= 200 * 1024
+    assert record["top_allocations"][0]["size_bytes"] >= 200 * 1024
+    assert (profiler.directory / record["profile"]).exists()
+    assert len(retained) == 200
+
+
+def test_concurrent_and_unsampled_calls_are_skipped(profiler, tmp_path):
+    with profiling.call("outer", {}):
+        assert profiling.call("inner", {}) is profiling._NOOP
+    assert [r["tool"] for r in _records(profiler.directory)] == ["outer"]
+
+    profiling.set_profiler(profiling.Profiler(tmp_path / "none", sample=0.0))
+    with profiling.call("skipped", {}):
+        pass
+    assert not (tmp_path / "none").exists()
+
+
+def test_errors_are_recorded(profiler):
+    with pytest.raises(ValueError):
+        with profiling.call("boom", {}):
+            raise ValueError("bad canvas")
+    (record,) = _records(profiler.directory)
+    assert record["error"] == "ValueError: bad canvas"
+
+
+def test_summarise_arguments_truncates_and_sizes():
+    summary = profiling.summarise_arguments(
+        {"query": "q" * 100, "canvas": {"nodes": []}, "scale": 2.0}, limit=10
+    )
+    assert summary == {"query": "q" * 10 + "...", "canvas": "dict[1]", "scale": 2.0}
+
+
+def test_cli_summarises_dumps(profiler, capsys):
+    for tool in ("read_canvas", "read_canvas", "export_canvas"):
+        with profiling.call(tool, {}):
+            sorted(range(1000), key=str)
+
+    assert profiling.main([str(profiler.directory), "--top", "5"]) == 0
+    out = capsys.readouterr().out
+    assert "read_canvas" in out and "export_canvas" in out
+    assert "Slowest calls (of 3)" in out
+    assert "cumulative" in out
+
+    assert profiling.main([str(profiler.directory), "--tool", "missing"]) == 0
+    assert "No profiles" in capsys.readouterr().out
@@ -1,13 +1,26 @@
 """Tests for the MCP server layer."""
 
+import gzip
+import io
+import json
+import subprocess
+import sys
+
+import anyio
 import pytest
+from mcp import types
+from mcp.shared.exceptions import McpError
 from mcp.shared.memory import (
     create_connected_server_and_client_session as client_session,
 )
+from pydantic import BaseModel
 
 from jsoncanvas import server
-from jsoncanvas.errors import DuplicateIdError
+from jsoncanvas.errors import DuplicateIdError, LimitExceededError
 from jsoncanvas.server import (
+    CanvasOperation,
+    batch_canvas_ops,
+    batch_export,
     create_canvas,
     edit_canvas,
     export_canvas,
@@ -33,7 +46,12 @@ TEXT_NODE = {
 def _output_dir(tmp_path, monkeypatch):
     """Point OUTPUT_PATH at a temp dir for every test."""
     monkeypatch.setenv("OUTPUT_PATH", str(tmp_path))
-    return tmp_path
+    # Versions are recorded by file name; forget those of earlier tests.
+    monkeypatch.setattr(server, "_VERSIONS", {})
+    monkeypatch.setattr(server, "_VERSION_NAMES", {})
+    yield tmp_path
+    # Let background jobs (thumbnails, evictions) finish inside this test.
+    server._background().submit(lambda: None).result()
 
 
 def test_create_read_list_round_trip(_output_dir):
@@ -124,6 +142,8 @@ async def test_tools_exposed_over_protocol(_output_dir):
             "list_canvases",
             "edit_canvas",
             "export_canvas",
+            "batch_export",
+            "batch_canvas_ops",
             "search_canvases",
         }
 
@@ -167,6 +187,102 @@ async def test_canvas_viewer_ui_wiring(_output_dir):
         assert "nodes" in read.content[0].text
 
 
+async def test_canvas_results_are_prebuilt_and_match_their_models(_output_dir):
+    edge = {"id": "e", "fromNode": "a", "toNode": "b"}
+    async with client_session(mcp) as client:
+        created = await client.call_tool(
+            "create_canvas",
+            {"nodes": [TEXT_NODE, NODE_B], "edges": [edge], "filename": "pre"},
+        )
+        name = created.structuredContent["path"].split("/")[-1]
+        read = await client.call_tool("read_canvas", {"filename": name})
+        full = await client.call_tool(
+            "edit_canvas", {"filename": name, "update_nodes": [{"id": "a", "x": 9}]}
+        )
+        delta = await client.call_tool(
+            "edit_canvas",
+            {"filename": name, "remove_edge_ids": ["e"], "response": "delta"},
+        )
+
+    for result, model in (
+        (created, server.CreateCanvasResult),
+        (read, server.CanvasDocument),
+        (full, server.CreateCanvasResult),
+        (delta, server.CreateCanvasResult),
+    ):
+        assert not result.isError
+        assert json.loads(result.content[0].text) == result.structuredContent
+        dumped = model.model_validate(result.structuredContent).model_dump(mode="json")
+        assert dumped == result.structuredContent
+    assert delta.structuredContent["delta"]["removed_edge_ids"] == ["e"]
+    assert delta.structuredContent["canvas"] is None
+
+
+async def test_read_canvas_text_reuses_file_without_revalidating(
+    _output_dir, monkeypatch
+):
+    name = _seed_two_node_canvas()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("output was re-validated")
+
+    monkeypatch.setattr(server.CanvasDocument, "model_validate", fail)
+    async with client_session(mcp) as client:
+        read = await client.call_tool("read_canvas", {"filename": name})
+    assert read.content[0].text == (_output_dir / name).read_text()
+    assert [n["id"] for n in read.structuredContent["nodes"]] == ["a", "b"]
+
+
+async def test_large_canvas_text_fallback_is_summarised(_output_dir, monkeypatch):
+    name = _seed_two_node_canvas()
+    monkeypatch.setenv("MCP_LARGE_RESULT_BYTES", "100")
+    async with client_session(mcp) as client:
+        read = await client.call_tool("read_canvas", {"filename": name})
+        edited = await client.call_tool(
+            "edit_canvas", {"filename": name, "update_nodes": [{"id": "a", "x": 5}]}
+        )
+        monkeypatch.setenv("MCP_LARGE_RESULT", "summary")
+        summary = await client.call_tool("read_canvas", {"filename": name})
+        monkeypatch.setenv("MCP_LARGE_RESULT", "full")
+        full = await client.call_tool("read_canvas", {"filename": name})
+
+    text, link = read.content
+    assert f"{name}: 2 nodes, 1 edges" in text.text
+    assert link.type == "resource_link"
+    assert str(link.uri) == f"canvas://file/{name}"
+    assert link.size == len((_output_dir / name).read_text())
+    assert len(read.structuredContent["nodes"]) == 2
+
+    # create/edit keep the result fields as JSON ahead of the note.
+    head = edited.content[0].text.split("\n\n")[0]
+    assert json.loads(head)["node_count"] == 2
+    assert edited.structuredContent["canvas"]["nodes"][0]["x"] == 5
+
+    assert [block.type for block in summary.content] == ["text"]
+    assert "canvas://" not in summary.content[0].text
+    assert json.loads(full.content[0].text) == full.structuredContent
+
+
+def test_result_text_splices_the_canvas_into_valid_json():
+    data = {"nodes": [TEXT_NODE], "edges": []}
+    canvas = server._canvas_document(data, json.dumps(data, indent=2))
+
+    class OnlyCanvas(BaseModel):
+        canvas: server.CanvasDocument
+
+    class Around(BaseModel):
+        note: str
+        canvas: server.CanvasDocument
+        count: int
+
+    for result in (
+        OnlyCanvas(canvas=canvas),
+        Around(note='"canvas": }', canvas=canvas, count=1),
+    ):
+        structured = server._json_fields(result)
+        assert json.loads(server._result_text(result, structured)) == structured
+
+
 def test_load_ui_html_returns_bundle():
     html = server._load_ui_html()
     assert "<html" in html.lower()
@@ -305,3 +421,714 @@ def test_search_canvases_finds_and_misses(_output_dir):
     assert match.filename.endswith(".canvas")
 
     assert search_canvases(query="absolutely-not-present").matches == []
+
+
+def test_edit_canvas_delta_response(_output_dir):
+    name = _seed_two_node_canvas()
+    full = edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "v1"}])
+    result = edit_canvas(
+        filename=name,
+        add_nodes=[{**TEXT_NODE, "id": "c", "x": 600, "text": "third"}],
+        update_nodes=[{"id": "a", "text": "v2"}, {"id": "b", "text": "world"}],
+        remove_node_ids=["b"],  # cascades edge "e"
+        response="delta",
+    )
+    assert result.canvas is None
+    delta = result.delta
+    assert [n["id"] for n in delta.added_nodes] == ["c"]
+    assert [n["text"] for n in delta.updated_nodes] == ["v2"]
+    assert delta.removed_node_ids == ["b"]
+    assert delta.removed_edge_ids == ["e"]
+    assert delta.added_edges == [] and delta.updated_edges == []
+    # The version token tracks the file content.
+    assert result.version != full.version
+    assert result.node_count == 2 and result.edge_count == 0
+
+
+def test_ui_bundle_is_loaded_once():
+    server._ui_bundle.cache_clear()
+    first = server._load_ui_html()
+    assert server._load_ui_html() is first  # served from memory, not re-read
+    assert server._ui_bundle.cache_info().misses == 1
+
+
+def test_viewer_http_route_compresses_and_revalidates():
+    from starlette.testclient import TestClient
+
+    client = TestClient(mcp.streamable_http_app())
+    resp = client.get("/ui/viewer.html", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "<html" in resp.text.lower()  # the client transparently decompresses
+    etag = resp.headers["etag"]
+
+    cached = client.get("/ui/viewer.html", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+async def test_tool_calls_are_measured(_output_dir):
+    calls = server._TOOL_CALLS
+    before = calls.value(tool="create_canvas", status="ok")
+    written = server._FILE_BYTES.value(tool="create_canvas", op="write")
+    async with client_session(mcp) as client:
+        await client.call_tool(
+            "create_canvas", {"nodes": [TEXT_NODE], "filename": "metered"}
+        )
+        failed = await client.call_tool("read_canvas", {"filename": "missing"})
+        assert failed.isError is True
+        text = (await client.read_resource("canvas://metrics")).contents[0].text
+
+    assert calls.value(tool="create_canvas", status="ok") == before + 1
+    assert calls.value(tool="read_canvas", status="error") >= 1
+    assert server._FILE_BYTES.value(tool="create_canvas", op="write") > written
+    assert server._ELEMENTS.value(tool="create_canvas", kind="node") >= 1
+    assert server._PAYLOAD_BYTES.value(tool="create_canvas", direction="out") > 0
+    assert 'jsoncanvas_tool_duration_seconds_count{tool="create_canvas"}' in text
+    assert 'jsoncanvas_cache_hits_total{cache="thumbnail"}' in text
+
+
+async def test_tool_call_handler_runs_outside_a_session(_output_dir):
+    # As the benchmarks call it: no request context, so no size to count.
+    handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
+    received = server._PAYLOAD_BYTES.value(tool="list_canvases", direction="in")
+    response = await handler(
+        types.CallToolRequest(
+            params=types.CallToolRequestParams(name="list_canvases", arguments={})
+        )
+    )
+    assert response.root.isError is False
+    assert server._PAYLOAD_BYTES.value(tool="list_canvases", direction="in") == received
+
+
+def test_metrics_scrape_builds_no_caches(tmp_path, monkeypatch):
+    out = tmp_path / "fresh"
+    monkeypatch.setenv("OUTPUT_PATH", str(out))
+    text = server.canvas_metrics()
+    assert not out.exists()
+    assert 'cache="tile"' not in text
+
+    server._tile_cache()
+    assert 'jsoncanvas_cache_misses_total{cache="tile"} 0' in server.canvas_metrics()
+
+
+async def test_tool_call_traces_each_stage(_output_dir):
+    name = _seed_two_node_canvas()
+    stream = io.StringIO()
+    server.tracing.set_processor(server.tracing.JsonLinesExporter(stream))
+    try:
+        async with client_session(mcp) as client:
+            await client.call_tool(
+                "edit_canvas",
+                {"filename": name, "update_nodes": [{"id": "a", "text": "x"}]},
+            )
+    finally:
+        server.tracing.set_processor(None)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    root = next(r for r in records if r["name"] == "tool.edit_canvas")
+    children = {r["name"]: r for r in records if r["parent_id"] == root["span_id"]}
+    assert list(children) == [
+        "file.read",
+        "json.parse",
+        "canvas.from_dict",
+        "canvas.edit",
+        "canvas.to_dict",
+        "json.serialise",
+        "file.write",
+    ]
+    assert children["canvas.from_dict"]["attributes"] == {"nodes": 2, "edges": 1}
+    assert children["canvas.edit"]["attributes"]["update_nodes"] == 1
+    assert children["file.write"]["attributes"]["bytes"] > 0
+    assert root["attributes"]["status"] == "ok"
+
+
+async def test_tool_calls_are_profiled(_output_dir, tmp_path):
+    from jsoncanvas import profiling
+
+    name = _seed_two_node_canvas()
+    profiling.set_profiler(profiling.Profiler(tmp_path / "prof"))
+    try:
+        async with client_session(mcp) as client:
+            await client.call_tool("read_canvas", {"filename": name})
+    finally:
+        profiling.set_profiler(None)
+
+    (dump,) = (tmp_path / "prof").glob("*-read_canvas.json")
+    record = json.loads(dump.read_text())
+    assert record["arguments"] == {"filename": name}
+    assert (record["nodes"], record["edges"]) == (2, 1)
+    assert record["status"] == "ok"
+    assert (tmp_path / "prof" / record["profile"]).exists()
+
+
+async def test_oversized_arguments_are_rejected_before_validation(monkeypatch):
+    monkeypatch.setenv("MCP_MAX_NODES", "1")
+    async with client_session(mcp) as client:
+        with pytest.raises(McpError) as info:
+            await client.call_tool(
+                "create_canvas",
+                {"filename": "big", "nodes": [TEXT_NODE, {**TEXT_NODE, "id": "b"}]},
+            )
+    assert info.value.error.code == types.INVALID_PARAMS
+    assert info.value.error.data == {"limit": "max_nodes", "max": 1, "actual": 2}
+    assert list_canvases() == []
+
+
+def test_oversized_canvas_files_are_not_read(_output_dir, monkeypatch):
+    name = _seed_two_node_canvas()
+    monkeypatch.setenv("MCP_MAX_FILE_BYTES", "10")
+    with pytest.raises(LimitExceededError, match="MCP_MAX_FILE_BYTES"):
+        read_canvas(name)
+    assert search_canvases("a").matches == []
+
+    monkeypatch.setenv("MCP_MAX_FILE_BYTES", "0")
+    monkeypatch.setenv("MCP_MAX_EDGES", "0")
+    monkeypatch.setenv("MCP_MAX_NODES", "1")
+    with pytest.raises(LimitExceededError, match="Node count"):
+        edit_canvas(name, update_nodes=[{"id": "a", "text": "x"}])
+
+
+def test_metrics_http_route():
+    from starlette.testclient import TestClient
+
+    resp = TestClient(mcp.streamable_http_app()).get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE jsoncanvas_tool_calls_total counter" in resp.text
+
+
+async def test_docstring_and_instructions_list_every_tool():
+    async with client_session(mcp) as client:
+        names = [tool.name for tool in (await client.list_tools()).tools]
+    assert len(names) == 9
+    assert "Exposes nine tools" in " ".join(server.__doc__.split())
+    for name in names:
+        assert name in mcp.instructions
+
+
+def test_server_import_defers_export_module():
+    # Cold start matters for spawn-per-session stdio clients; the exporters and
+    # the optional subsystems are only imported when first used.
+    deferred = [
+        "jsoncanvas.export",
+        "jsoncanvas.profiling",
+        "tracemalloc",
+        "jsoncanvas.cache",
+        "jsoncanvas.limits",
+        "jsoncanvas.subscriptions",
+        "jsoncanvas.store",
+        "jsoncanvas.journal",
+        "jsoncanvas.writebehind",
+        "gzip",
+    ]
+    code = (
+        "import sys, jsoncanvas.server; "
+        f"print([m for m in {deferred!r} if m in sys.modules])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_export_canvas_is_cached_by_content_hash(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_EXPORT_CACHE", "disk")
+    name = _seed_two_node_canvas()
+    cache = server._export_cache()
+    first = export_canvas(filename=name, format="svg")
+    hits = cache.hits
+    assert export_canvas(filename=name, format="svg").content == first.content
+    assert cache.hits == hits + 1
+    assert list((_output_dir / ".cache" / "exports").iterdir())
+
+    # Editing the canvas changes its hash, so the next export re-renders.
+    edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "renamed"}])
+    assert "renamed" in export_canvas(filename=name, format="svg").content
+
+
+def test_export_canvas_svg_rerenders_only_edited_elements(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_EXPORT_CACHE", "off")  # exercise the fragment tier
+    name = _seed_two_node_canvas()
+    fragments = server._svg_fragments()
+    fragments.clear()
+    export_canvas(filename=name, format="svg")
+    misses = fragments.misses
+    edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "renamed"}])
+    svg = export_canvas(filename=name, format="svg").content
+    assert "renamed" in svg
+    assert fragments.misses - misses == 1  # only node "a"
+
+
+def test_batch_canvas_ops_creates_and_edits_many_files(_output_dir):
+    ops = [
+        CanvasOperation(op="create", filename=f"c{i}", nodes=[TEXT_NODE])
+        for i in range(5)
+    ]
+    created = batch_canvas_ops(ops)
+    assert (created.succeeded, created.failed) == (5, 0)
+    names = list_canvases()
+    assert len(names) == 5
+
+    result = batch_canvas_ops(
+        [
+            CanvasOperation(op="edit", filename=names[0], add_nodes=[NODE_B]),
+            CanvasOperation(
+                op="edit",
+                filename=names[0],
+                add_edges=[{"id": "e", "fromNode": "a", "toNode": "b"}],
+            ),
+            CanvasOperation(op="create", filename="fresh", nodes=[TEXT_NODE]),
+        ]
+    )
+    assert [r.ok for r in result.results] == [True, True, True]
+    first = result.results[0]
+    assert (first.node_count, first.edge_count) == (2, 1)
+    assert first.version == result.results[1].version  # one write per file
+    assert len(read_canvas(names[0]).edges) == 1
+
+
+@pytest.mark.parametrize(
+    ("env", "classes"),
+    [
+        (
+            {"MCP_WRITE_BEHIND_MS": "60000", "MCP_STORE": "sqlite"},
+            [("writebehind", "WriteBehindBuffer"), ("store", "CanvasStore")],
+        ),
+        ({"MCP_JOURNAL": "1"}, [("journal", "CanvasJournal")]),
+    ],
+)
+def test_batch_canvas_ops_builds_shared_state_once(
+    _output_dir, monkeypatch, env, classes
+):
+    import importlib
+    import time
+
+    for i in range(8):
+        (_output_dir / f"f{i}.canvas").write_text(json.dumps({"nodes": [TEXT_NODE]}))
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    built = []
+    for module, name in classes:
+        cls = getattr(importlib.import_module(f"jsoncanvas.{module}"), name)
+
+        def init(self, *args, __init__=cls.__init__, **kwargs):
+            built.append(type(self).__name__)
+            time.sleep(0.05)  # widen the window for a second build
+            __init__(self, *args, **kwargs)
+
+        monkeypatch.setattr(cls, "__init__", init)
+
+    result = batch_canvas_ops(
+        [
+            CanvasOperation(op="edit", filename=f"f{i}.canvas", add_nodes=[NODE_B])
+            for i in range(8)
+        ]
+    )
+    assert result.succeeded == 8
+    assert sorted(built) == sorted(name for _, name in classes)
+    server._settle_files()
+
+
+def test_batch_canvas_ops_is_all_or_nothing_per_file(_output_dir):
+    name = _seed_two_node_canvas()
+    before = (_output_dir / name).read_text()
+    result = batch_canvas_ops(
+        [
+            CanvasOperation(
+                op="edit", filename=name, update_nodes=[{"id": "a", "text": "x"}]
+            ),
+            CanvasOperation(op="edit", filename=name, remove_node_ids=["missing"]),
+            CanvasOperation(op="create", filename="ok", nodes=[TEXT_NODE]),
+            CanvasOperation(op="edit", filename="../escape", add_nodes=[NODE_B]),
+        ]
+    )
+    assert [r.ok for r in result.results] == [False, False, True, False]
+    assert "operation 1" in result.results[0].error
+    assert "missing" in result.results[1].error
+    assert "escape" in result.results[3].error
+    assert (_output_dir / name).read_text() == before  # untouched
+    assert (result.succeeded, result.failed) == (1, 3)
+
+
+async def test_batch_canvas_ops_over_protocol(_output_dir):
+    async with client_session(mcp) as client:
+        result = await client.call_tool(
+            "batch_canvas_ops",
+            {
+                "operations": [
+                    {"op": "create", "filename": f"p{i}", "nodes": [TEXT_NODE]}
+                    for i in range(3)
+                ]
+            },
+        )
+    assert result.isError is False
+    assert result.structuredContent["succeeded"] == 3
+    assert "canvas" not in result.structuredContent["results"][0]
+
+
+def test_external_edit_evicts_renders_of_the_old_content(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_EXPORT_CACHE", "disk")
+    name = _seed_two_node_canvas()
+    export_canvas(filename=name, format="svg")
+    exports = _output_dir / ".cache" / "exports"
+    old = {p.name for p in exports.iterdir()}
+    assert old
+
+    # Another program rewrites the file; the watcher reports it.
+    path = _output_dir / name
+    path.write_text(path.read_text().replace("hello", "bonjour"))
+    server._canvases_changed({name})
+    server._background().submit(lambda: None).result()
+
+    assert not {p.name for p in exports.iterdir()} & old  # old renders dropped
+    thumbnails = list((_output_dir / ".cache" / "thumbnails").iterdir())
+    assert len(thumbnails) == 1  # only the new content's, pre-rendered
+    assert "bonjour" in export_canvas(filename=name, format="svg").content
+
+
+def test_edit_keeps_renders_shared_with_an_identical_file(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_EXPORT_CACHE", "disk")
+    name = _seed_two_node_canvas()
+    copy = "copy.canvas"
+    (_output_dir / copy).write_bytes((_output_dir / name).read_bytes())
+    export_canvas(filename=copy, format="svg")
+    exports = _output_dir / ".cache" / "exports"
+    shared = {p.name for p in exports.iterdir()}
+
+    # The copy still has the old content, so its renders must survive.
+    edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "renamed"}])
+    server._background().submit(lambda: None).result()
+    assert shared <= {p.name for p in exports.iterdir()}
+
+    edit_canvas(filename=copy, update_nodes=[{"id": "a", "text": "renamed"}])
+    server._background().submit(lambda: None).result()
+    assert not shared & {p.name for p in exports.iterdir()}
+
+
+async def test_canvas_resources_notify_subscribers(_output_dir):
+    notifications = []
+
+    async def on_message(message):
+        if isinstance(message, types.ServerNotification):
+            notifications.append(message.root)
+
+    async def wait_for(kind, uri=None):
+        for _ in range(100):
+            for note in notifications:
+                if isinstance(note, kind) and (
+                    uri is None or str(note.params.uri) == uri
+                ):
+                    notifications.remove(note)
+                    return note
+            await anyio.sleep(0.01)
+        raise AssertionError(f"no {kind.__name__} received")
+
+    name = _seed_two_node_canvas()
+    uri = f"canvas://file/{name}"
+    async with client_session(mcp, message_handler=on_message) as client:
+        caps = client.get_server_capabilities().resources
+        assert caps.subscribe is True and caps.listChanged is True
+        listed = await client.list_resources()
+        assert uri in {str(r.uri) for r in listed.resources}
+        read = await client.read_resource(uri)
+        assert '"hello"' in read.contents[0].text
+
+        await client.subscribe_resource(uri)
+        await client.call_tool(
+            "edit_canvas",
+            {"filename": name, "update_nodes": [{"id": "a", "text": "x"}]},
+        )
+        await wait_for(types.ResourceUpdatedNotification, uri)
+        assert not any(
+            isinstance(n, types.ResourceListChangedNotification) for n in notifications
+        )
+
+        # A new file changes the list; an external edit reaches subscribers too.
+        await client.call_tool(
+            "create_canvas", {"nodes": [TEXT_NODE], "filename": "new"}
+        )
+        await wait_for(types.ResourceListChangedNotification)
+        path = _output_dir / name
+        path.write_text(path.read_text().replace('"x"', '"bonjour"'))
+        server._canvases_changed({name})
+        await wait_for(types.ResourceUpdatedNotification, uri)
+
+        await client.unsubscribe_resource(uri)
+        assert server._subscriptions().subscribers(uri) == 0
+
+
+def test_export_canvas_to_file(_output_dir):
+    name = _seed_two_node_canvas()
+    inline = export_canvas(filename=name, format="markdown")
+    result = export_canvas(filename=name, format="markdown", output="file")
+    assert result.content == ""
+    written = _output_dir / (name.removesuffix(".canvas") + ".md")
+    assert result.path == str(written.resolve())
+    assert written.read_text() == inline.content
+    assert not list(_output_dir.glob(".*.tmp"))
+    # The export does not show up as a canvas.
+    assert list_canvases() == [name]
+
+
+def test_export_canvas_svgz_and_compact(_output_dir):
+    name = _seed_two_node_canvas()
+    compact = export_canvas(filename=name, format="svg", compact=True)
+    assert "<style>" in compact.content
+    assert len(compact.content) < len(
+        export_canvas(filename=name, format="svg").content
+    )
+
+    result = export_canvas(filename=name, format="svgz")
+    written = _output_dir / (name.removesuffix(".canvas") + ".svgz")
+    assert result.path == str(written.resolve())
+    assert result.content == ""
+    assert gzip.decompress(written.read_bytes()).decode() == compact.content
+
+
+def test_batch_export_tool_writes_outputs_and_reuses_cache(_output_dir):
+    server._export_cache().clear()
+    name = _seed_two_node_canvas()
+    create_canvas(nodes=[TEXT_NODE], filename="other")
+    inline = export_canvas(filename=name, format="svg").content  # fills the cache
+
+    result = batch_export(formats=["svg", "markdown"], pattern="*edit*")
+    assert (result.rendered, result.cached, result.skipped) == (1, 1, 0)
+    stem = name.removesuffix(".canvas")
+    assert (_output_dir / "exports" / f"{stem}.svg").read_text() == inline
+    assert (_output_dir / "exports" / "manifest.json").is_file()
+    assert len(list_canvases()) == 2  # outputs never show up as canvases
+
+    again = batch_export(formats=["svg", "markdown"], filenames=[name])
+    assert again.skipped == 2 and again.rendered == 0
+
+    with pytest.raises(ValueError, match="subdirectory"):
+        batch_export(formats=["svg"], target_dir="../escape")
+
+
+async def test_export_canvas_png_returns_image_and_file(_output_dir):
+    pytest.importorskip("resvg_py")
+    name = _seed_two_node_canvas()
+    async with client_session(mcp) as client:
+        result = await client.call_tool(
+            "export_canvas", {"filename": name, "format": "png", "scale": 1.0}
+        )
+    assert result.isError is False
+    image = next(block for block in result.content if block.type == "image")
+    assert image.mimeType == "image/png"
+    written = _output_dir / (name.removesuffix(".canvas") + ".png")
+    assert result.structuredContent["path"] == str(written.resolve())
+    assert result.structuredContent["content"] == ""
+    assert written.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+    # The render is cached by content hash and scale.
+    assert list((_output_dir / ".cache" / "png").iterdir())
+
+
+def test_export_canvas_png_without_extra_is_actionable(_output_dir, monkeypatch):
+    import importlib.util
+
+    name = _seed_two_node_canvas()
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda mod, *a: None if mod == "resvg_py" else real_find_spec(mod, *a),
+    )
+    with pytest.raises(RuntimeError, match=r"mcp-server-jsoncanvas\[png\]"):
+        export_canvas(filename=name, format="png")
+
+
+async def test_canvas_thumbnail_resource(_output_dir):
+    name = _seed_two_node_canvas()
+    server._background().submit(lambda: None).result()  # drain the worker
+    cached = list((_output_dir / ".cache" / "thumbnails").iterdir())
+    assert len(cached) == 1  # pre-rendered after create_canvas
+
+    async with client_session(mcp) as client:
+        templates = await client.list_resource_templates()
+        uris = {t.uriTemplate for t in templates.resourceTemplates}
+        assert "canvas://thumbnail/{name}" in uris
+        result = await client.read_resource(f"canvas://thumbnail/{name}")
+    svg = result.contents[0].text
+    assert svg.startswith("<svg") and "<text" not in svg
+    assert cached[0].read_text() == svg
+
+
+async def test_canvas_thumbnail_resource_decodes_percent_encoded_names(_output_dir):
+    name = _seed_two_node_canvas()
+    (_output_dir / "my canvas.canvas").write_bytes((_output_dir / name).read_bytes())
+    async with client_session(mcp) as client:
+        result = await client.read_resource("canvas://thumbnail/my%20canvas.canvas")
+    assert result.contents[0].text.startswith("<svg")
+
+
+async def test_canvas_tile_resource(_output_dir):
+    name = _seed_two_node_canvas()
+    async with client_session(mcp) as client:
+        templates = await client.list_resource_templates()
+        uris = {t.uriTemplate for t in templates.resourceTemplates}
+        assert "canvas://tiles/{name}/{z}/{x}/{y}" in uris
+        result = await client.read_resource(f"canvas://tiles/{name}/0/0/0")
+        svg = result.contents[0].text
+        assert svg.startswith("<svg")
+        again = await client.read_resource(f"canvas://tiles/{name}/0/0/0")
+        assert again.contents[0].text == svg
+    cache = server._tile_cache()
+    assert cache.hits >= 1
+    assert len(list((_output_dir / ".cache" / "tiles").iterdir())) == 1
+
+
+async def test_canvas_tile_resource_checks_its_address(_output_dir):
+    name = _seed_two_node_canvas()
+    (_output_dir / "my canvas.canvas").write_bytes((_output_dir / name).read_bytes())
+    async with client_session(mcp) as client:
+        result = await client.read_resource("canvas://tiles/my%20canvas.canvas/0/0/0")
+        assert result.contents[0].text.startswith("<svg")
+        with pytest.raises(McpError, match="must be integers"):
+            await client.read_resource(f"canvas://tiles/{name}/0/a/0")
+        with pytest.raises(McpError, match="Zoom 1100 is outside"):
+            await client.read_resource(f"canvas://tiles/{name}/1100/0/0")
+
+
+def test_sqlite_store_search_matches_file_scan(_output_dir, monkeypatch):
+    name = _seed_two_node_canvas()
+    edit_canvas(
+        filename=name, add_nodes=[{**TEXT_NODE, "id": "c", "text": "World again"}]
+    )
+    (_output_dir / "other.canvas").write_text(
+        json.dumps({"nodes": [{**TEXT_NODE, "id": "o", "text": "old world"}]})
+    )
+    scanned = search_canvases(query="WORLD")
+
+    monkeypatch.setenv("MCP_STORE", "sqlite")
+    assert search_canvases(query="WORLD") == scanned
+    assert (_output_dir / ".jsoncanvas.db").is_file()
+
+    # Writes go through to the store; external edits are picked up on search.
+    edit_canvas(filename=name, remove_node_ids=["c"])
+    (_output_dir / "other.canvas").unlink()
+    monkeypatch.setenv("MCP_STORE", "files")
+    expected = search_canvases(query="world")
+    monkeypatch.setenv("MCP_STORE", "sqlite")
+    assert search_canvases(query="world") == expected
+    assert [m.id for m in search_canvases(query="world", filename=name).matches] == [
+        "b"
+    ]
+
+
+def test_sqlite_store_without_fts5_falls_back_to_the_scan(
+    _output_dir, monkeypatch, capsys
+):
+    from jsoncanvas import store
+
+    _seed_two_node_canvas()
+    scanned = search_canvases(query="world")
+    monkeypatch.setattr(
+        store,
+        "_FTS5_PROBE",
+        "CREATE VIRTUAL TABLE temp.fts5_probe USING fts5 (x, tokenize='missing')",
+    )
+    monkeypatch.setenv("MCP_STORE", "sqlite")
+    assert server._canvas_store() is None
+    assert search_canvases(query="world") == scanned
+    # Reported once, when the store is first opened.
+    assert capsys.readouterr().err.count("Searching the .canvas files instead") == 1
+
+
+def test_sqlite_store_indexes_journaled_edits(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_JOURNAL", "1")
+    name = _seed_two_node_canvas()
+    edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "journaled"}])
+    assert (_output_dir / f".{name}.journal").stat().st_size > 0
+
+    # The store is first opened (and synced) with the edit still in the journal.
+    monkeypatch.setenv("MCP_STORE", "sqlite")
+    assert [m.id for m in search_canvases(query="journaled").matches] == ["a"]
+
+
+def test_write_behind_coalesces_edits_and_serves_latest(_output_dir, monkeypatch):
+    monkeypatch.setenv("MCP_WRITE_BEHIND_MS", "60000")
+    create_canvas(nodes=[TEXT_NODE], filename="hot")
+    (name,) = list_canvases()
+    target = _output_dir / name
+    assert not target.exists()
+
+    for i in range(20):
+        edit_canvas(filename=name, update_nodes=[{"id": "a", "text": f"v{i}"}])
+    assert not target.exists()
+    assert read_canvas(name).nodes[0]["text"] == "v19"
+    assert search_canvases(query="v19").matches[0].filename == name
+
+    server._write_behind().flush()
+    assert json.loads(target.read_text())["nodes"][0]["text"] == "v19"
+
+
+def test_journaled_edits_append_and_match_full_rewrites(_output_dir, monkeypatch):
+    def run_edits(filename):
+        create_canvas(
+            nodes=[TEXT_NODE, {**TEXT_NODE, "id": "b"}, {**TEXT_NODE, "id": "c"}],
+            edges=[{"id": "e", "fromNode": "a", "toNode": "b"}],
+            filename=filename,
+        )
+        (name,) = [n for n in list_canvases() if n.endswith(f"-{filename}.canvas")]
+        edit_canvas(filename=name, update_nodes=[{"id": "a", "text": "changed"}])
+        edit_canvas(
+            filename=name,
+            add_nodes=[{**TEXT_NODE, "id": "d"}],
+            remove_node_ids=["b"],  # cascades edge "e"
+        )
+        result = edit_canvas(
+            filename=name,
+            update_nodes=[
+                {
+                    "id": "c",
+                    "type": "link",
+                    "x": 0,
+                    "y": 0,
+                    "width": 100,
+                    "height": 50,
+                    "url": "https://x.test",
+                }
+            ],
+            response="delta",
+        )
+        return _output_dir / name, result.version
+
+    plain, plain_version = run_edits("plain")
+
+    monkeypatch.setenv("MCP_JOURNAL", "1")
+    journaled, version = run_edits("journaled")
+    base = journaled.read_bytes()
+    journal = _output_dir / f".{journaled.name}.journal"
+    assert len(journal.read_bytes().splitlines()) == 4  # header + 3 edits
+    assert version == plain_version
+    assert (
+        read_canvas(journaled.name).model_dump() == read_canvas(plain.name).model_dump()
+    )
+
+    server._journal().compact_all()
+    assert journaled.read_bytes() == plain.read_bytes() != base
+
+
+def test_journaled_canvases_are_versioned_and_limited_as_replayed(
+    _output_dir, monkeypatch
+):
+    monkeypatch.setenv("MCP_JOURNAL", "1")
+    create_canvas(nodes=[TEXT_NODE], filename="j")
+    (name,) = list_canvases()
+    result = edit_canvas(
+        filename=name, add_nodes=[{**TEXT_NODE, "id": "b", "text": "x" * 500}]
+    )
+    base = (_output_dir / name).stat().st_size
+
+    # The watcher sees the journal's canvas, which is what was last written.
+    published = []
+    monkeypatch.setattr(server, "_publish_changes", published.append)
+    server._refresh_versions({name})
+    assert server._VERSIONS[name] == result.version
+    assert published == [set()]
+
+    monkeypatch.setenv("MCP_MAX_FILE_BYTES", str(base + 100))
+    with pytest.raises(LimitExceededError):
+        read_canvas(name)
+    assert search_canvases(query="hello").matches == []
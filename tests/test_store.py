@@ -0,0 +1,155 @@
+"""Tests for the SQLite canvas store."""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from jsoncanvas import store as store_module
+from jsoncanvas.journal import CanvasJournal, apply_record, replace_file, serialise
+from jsoncanvas.store import CanvasStore, main
+
+FIELDS = {"node": ("text", "label", "id"), "edge": ("label", "id")}
+CANVAS = {
+    "nodes": [
+        {"id": "a", "type": "text", "x": 0, "y": 0, "width": 1, "height": 1,
+         "text": "Straße 50%"},
+        {"id": "g", "type": "group", "x": 0, "y": 0, "width": 1, "height": 1,
+         "label": "Hello group"},
+    ],
+    "edges": [{"id": "e", "fromNode": "a", "toNode": "g", "label": "says hello"}],
+}  # fmt: skip
+
+
+@pytest.fixture
+def store(tmp_path):
+    opened = CanvasStore(tmp_path / "store.db", FIELDS)
+    yield opened
+    opened.close()
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data, indent=2))
+    return path
+
+
+def test_put_load_and_search(store, tmp_path):
+    path = _write(tmp_path / "a.canvas", CANVAS)
+    store.put("a.canvas", CANVAS, "v1", path.stat())
+
+    assert store.names() == ["a.canvas"]
+    assert store.load("a.canvas") == CANVAS
+    assert store.load("missing.canvas") is None
+    hits = store.search("HELLO")
+    assert [(m.kind, m.id, m.field) for m in hits] == [
+        ("node", "g", "label"),
+        ("edge", "e", "label"),
+    ]
+    # Full casefolding, and SQL and glob wildcards in the query are literal.
+    assert [m.value for m in store.search("strasse")] == ["Straße 50%"]
+    assert [m.id for m in store.search("50%")] == ["a"]
+    assert store.search("5*") == [] and store.search("[s]") == []
+    assert store.search("hello", name="other.canvas") == []
+
+
+def test_put_replaces_previous_rows(store, tmp_path):
+    path = _write(tmp_path / "a.canvas", CANVAS)
+    store.put("a.canvas", CANVAS, "v1", path.stat())
+    store.put("a.canvas", {"nodes": CANVAS["nodes"][:1]}, "v2", path.stat())
+
+    assert store.search("hello") == []
+    assert store.load("a.canvas") == {"nodes": CANVAS["nodes"][:1]}
+    store.delete("a.canvas")
+    assert store.names() == [] and store.search("a") == []
+
+
+def test_sync_imports_changed_and_drops_deleted_files(store, tmp_path):
+    first = _write(tmp_path / "a.canvas", CANVAS)
+    _write(tmp_path / "b.canvas", {"nodes": []})
+    (tmp_path / "broken.canvas").write_text("{not json")
+
+    assert store.sync(tmp_path) == {"a.canvas", "b.canvas", "broken.canvas"}
+    assert store.sync(tmp_path) == set()
+    assert store.load("broken.canvas") == {}
+
+    _write(first, {"edges": CANVAS["edges"]})
+    os.utime(first, ns=(1, 1))
+    (tmp_path / "b.canvas").unlink()
+    assert store.sync(tmp_path) == {"a.canvas", "b.canvas"}
+    assert store.names() == ["a.canvas", "broken.canvas"]
+    assert [m.kind for m in store.search("hello")] == ["edge"]
+
+
+def test_sync_leaves_out_oversized_files(store, tmp_path):
+    _write(tmp_path / "a.canvas", CANVAS)
+    assert store.sync(tmp_path, max_bytes=10) == set()
+    assert store.names() == []
+
+
+def test_cli_exports_stored_canvases(tmp_path, capsys):
+    source = tmp_path / "source"
+    source.mkdir()
+    _write(source / "a.canvas", CANVAS)
+    assert main(["sync", str(source)]) == 0
+    assert "Synced 1" in capsys.readouterr().out
+
+    restored = tmp_path / "restored"
+    db = source / ".jsoncanvas.db"
+    assert main(["export", str(restored), "--db", str(db)]) == 0
+    assert json.loads((restored / "a.canvas").read_text()) == CANVAS
+
+
+def test_missing_trigram_tokenizer_is_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(
+        store_module,
+        "_FTS5_PROBE",
+        "CREATE VIRTUAL TABLE temp.fts5_probe USING fts5 (x, tokenize='missing')",
+    )
+    with pytest.raises(RuntimeError, match="MCP_STORE=files"):
+        CanvasStore(tmp_path / "store.db", FIELDS)
+
+    with pytest.raises(SystemExit) as info:
+        main(["sync", str(tmp_path)])
+    assert info.value.code == 1
+    assert "trigram tokenizer" in capsys.readouterr().err
+
+
+def test_sync_and_cli_replay_edit_journals(store, tmp_path):
+    journal = CanvasJournal(replace_file)
+    target = tmp_path / "a.canvas"
+    base = serialise(CANVAS)
+    journal.save(target, base)
+    edit = {"update_nodes": [{**CANVAS["nodes"][0], "text": "journaled"}]}
+    edited = serialise(apply_record(json.loads(base), edit))
+    assert journal.save(target, edited, edit, previous=base)
+
+    assert store.sync(tmp_path, read=journal.read) == {"a.canvas"}
+    assert [m.id for m in store.search("journaled")] == ["a"]
+
+    assert main(["sync", str(tmp_path)]) == 0
+    rebuilt = CanvasStore(tmp_path / ".jsoncanvas.db", FIELDS)
+    try:
+        assert [m.id for m in rebuilt.search("journaled")] == ["a"]
+    finally:
+        rebuilt.close()
+
+
+def test_unused_element_indexes_are_dropped(tmp_path):
+    path = tmp_path / "store.db"
+    CanvasStore(path, FIELDS).close()
+    db = sqlite3.connect(path)
+    db.execute("CREATE INDEX nodes_by_id ON nodes (canvas, id)")
+    db.commit()
+    db.close()
+
+    CanvasStore(path, FIELDS).close()
+    db = sqlite3.connect(path)
+    indexes = {
+        name
+        for (name,) in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        )
+    }
+    db.close()
+    assert indexes == {"terms_by_canvas"}
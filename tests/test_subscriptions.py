@@ -0,0 +1,47 @@
+"""Tests for resource subscription bookkeeping."""
+
+import asyncio
+
+from jsoncanvas.subscriptions import SubscriptionRegistry
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    async def send_resource_updated(self, uri):
+        if self.fail:
+            raise ConnectionError("gone")
+        self.sent.append(("updated", str(uri)))
+
+    async def send_resource_list_changed(self):
+        if self.fail:
+            raise ConnectionError("gone")
+        self.sent.append(("list_changed", None))
+
+
+async def test_notifies_subscribers_and_drops_dead_sessions():
+    registry = SubscriptionRegistry()
+    alive, dead, lister = FakeSession(), FakeSession(fail=True), FakeSession()
+    registry.subscribe(alive, "canvas://file/a.canvas")
+    registry.subscribe(dead, "canvas://file/a.canvas")
+    registry.register(lister)
+    assert registry.subscribers("canvas://file/a.canvas") == 2
+
+    # Publishing from another thread schedules the sends on this loop.
+    sent = await asyncio.to_thread(
+        registry.resources_updated, ["canvas://file/a.canvas", "canvas://file/b"]
+    )
+    assert sent == 2
+    await asyncio.sleep(0.05)
+    assert alive.sent == [("updated", "canvas://file/a.canvas")]
+    assert lister.sent == []
+    assert len(registry) == 2  # the failing session was dropped
+
+    assert registry.list_changed() == 2
+    await asyncio.sleep(0.05)
+    assert ("list_changed", None) in alive.sent and lister.sent
+
+    registry.unsubscribe(alive, "canvas://file/a.canvas")
+    assert registry.subscribers("canvas://file/a.canvas") == 0
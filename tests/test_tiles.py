@@ -0,0 +1,95 @@
+"""Tests for tiled level-of-detail SVG rendering."""
+
+import pytest
+
+from jsoncanvas import Canvas, Edge, GroupNode, TextNode
+from jsoncanvas.tiles import (
+    MAX_ZOOM_PAST_FULL_DETAIL,
+    SpatialIndex,
+    TileRenderer,
+    write_tiles,
+)
+
+
+def _grid(columns: int, rows: int, size: int = 200) -> Canvas:
+    canvas = Canvas()
+    for r in range(rows):
+        for c in range(columns):
+            canvas.add_node(
+                TextNode(
+                    id=f"n{r}-{c}",
+                    x=c * size * 2,
+                    y=r * size * 2,
+                    width=size,
+                    height=size,
+                    text=f"Node {r}-{c}",
+                )
+            )
+    return canvas
+
+
+def test_spatial_index_query_returns_overlapping_cells():
+    index = SpatialIndex(100)
+    index.insert(1, (0, 0, 50, 50))
+    index.insert(2, (250, 250, 300, 300))
+    index.insert(3, (0, 0, 400, 20))  # spans several cells
+    assert index.query((10, 10, 20, 20)) == {1, 3}
+    assert index.query((260, 260, 270, 270)) == {2}
+    assert index.query((1000, 1000, 1100, 1100)) == set()
+
+
+def test_zoom_zero_drops_text_and_full_detail_keeps_it():
+    canvas = _grid(4, 4)
+    canvas.add_edge(Edge(id="e", from_node="n0-0", to_node="n0-1", label="link"))
+    renderer = TileRenderer(canvas)
+
+    overview = renderer.render_tile(0, 0, 0)
+    assert overview.startswith("<svg") and "<text" not in overview
+
+    z = renderer.full_detail_zoom()
+    assert renderer.scale(z) >= 1
+    detailed = renderer.render_tile(z, 0, 0)
+    assert "Node 0-0" in detailed
+    assert "Node 3-3" not in detailed  # outside this tile
+
+
+def test_tiny_nodes_are_merged_at_low_zoom():
+    canvas = _grid(60, 60, size=20)
+    canvas.add_node(GroupNode(id="g", x=0, y=0, width=4800, height=4800, label="All"))
+    renderer = TileRenderer(canvas)
+    overview = renderer.render_tile(0, 0, 0)
+    # 3600 tiny nodes collapse into far fewer aggregate rectangles.
+    assert 0 < overview.count("<rect") < 3600
+    assert "Node" not in overview
+
+
+def test_render_tile_rejects_addresses_outside_the_pyramid():
+    renderer = TileRenderer(_grid(2, 2))
+    with pytest.raises(ValueError, match="outside the tile pyramid"):
+        renderer.render_tile(1, 2, 0)
+    with pytest.raises(ValueError):
+        renderer.render_tile(-1, 0, 0)
+
+
+def test_render_tile_caps_the_zoom_level():
+    renderer = TileRenderer(_grid(2, 2))
+    top = renderer.max_zoom()
+    assert top == renderer.full_detail_zoom() + MAX_ZOOM_PAST_FULL_DETAIL
+    assert renderer.render_tile(top, 0, 0).startswith("<svg")
+    for z in (top + 1, 10**9):
+        with pytest.raises(ValueError, match=f"Zoom {z} is outside"):
+            renderer.render_tile(z, 0, 0)
+
+
+def test_iter_tiles_skips_empty_regions(tmp_path):
+    canvas = Canvas()
+    canvas.add_node(TextNode(id="a", x=0, y=0, width=100, height=100, text="A"))
+    canvas.add_node(TextNode(id="b", x=4000, y=4000, width=100, height=100, text="B"))
+    renderer = TileRenderer(canvas)
+    tiles = list(renderer.iter_tiles(max_zoom=3))
+    assert tiles[0] == (0, 0, 0)
+    assert len([t for t in tiles if t[0] == 3]) < 64  # the sparse middle is skipped
+
+    count = write_tiles(canvas, tmp_path, max_zoom=3)
+    assert count == len(tiles)
+    assert (tmp_path / "0" / "0" / "0.svg").read_text().startswith("<svg")
@@ -0,0 +1,147 @@
+"""Tests for span tracing."""
+
+import importlib.util
+import io
+import json
+
+import pytest
+
+from jsoncanvas import Canvas, tracing
+
+
+@pytest.fixture
+def spans():
+    """Record finished spans as JSON-lines records for the test's duration."""
+    stream = io.StringIO()
+    tracing.set_processor(tracing.JsonLinesExporter(stream))
+    records = []
+
+    def read():
+        records[:] = [json.loads(line) for line in stream.getvalue().splitlines()]
+        return records
+
+    try:
+        yield read
+    finally:
+        tracing.set_processor(None)
+
+
+def test_disabled_tracing_is_a_shared_noop():
+    assert not tracing.enabled()
+    first = tracing.span("a", n=1)
+    assert first is tracing.span("b")
+    with first as span:
+        span.set(ignored=True)
+
+
+def test_spans_nest_and_record_attributes_and_errors(spans):
+    with tracing.span("outer", n=1) as outer:
+        with tracing.span("inner"):
+            pass
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+        outer.set(done=True)
+
+    inner, failing, root = spans()
+    assert [r["name"] for r in (inner, failing, root)] == ["inner", "failing", "outer"]
+    assert root["parent_id"] is None
+    assert inner["parent_id"] == failing["parent_id"] == root["span_id"]
+    assert {r["trace_id"] for r in (inner, failing, root)} == {root["span_id"]}
+    assert root["attributes"] == {"n": 1, "done": True}
+    assert failing["attributes"]["error"] == "ValueError: boom"
+    assert root["duration_ms"] >= inner["duration_ms"] >= 0
+
+
+def test_canvas_round_trip_emits_stage_spans(spans):
+    data = {
+        "nodes": [
+            {
+                "id": i,
+                "type": "text",
+                "x": 0,
+                "y": 0,
+                "width": 1,
+                "height": 1,
+                "text": i,
+            }
+            for i in ("a", "b")
+        ],
+        "edges": [{"id": "e", "fromNode": "a", "toNode": "b"}],
+    }
+    Canvas.from_dict(data).to_dict()
+
+    by_name = {r["name"]: r for r in spans()}
+    assert by_name["canvas.from_dict"]["attributes"] == {"nodes": 2, "edges": 1}
+    assert (
+        by_name["canvas.validate"]["parent_id"]
+        == by_name["canvas.from_dict"]["span_id"]
+    )
+    assert by_name["canvas.to_dict"]["attributes"] == {"nodes": 2, "edges": 1}
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("opentelemetry") is not None,
+    reason="opentelemetry is installed",
+)
+def test_opentelemetry_adapter_without_extra_is_actionable():
+    with pytest.raises(RuntimeError, match=r"\[otel\]"):
+        tracing.OpenTelemetryProcessor()
+
+
+class RecordingTracer:
+    """Just enough of an OpenTelemetry ``Tracer`` to observe the adapter."""
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, context=None, start_time=None):
+        from opentelemetry import trace
+
+        parent = trace.get_current_span(context) if context is not None else None
+        span = _recorded_span(name, parent)
+        self.spans.append(span)
+        return span
+
+
+def _recorded_span(name, parent):
+    from opentelemetry.trace import INVALID_SPAN_CONTEXT, NonRecordingSpan
+
+    class RecordedSpan(NonRecordingSpan):
+        def __init__(self):
+            super().__init__(INVALID_SPAN_CONTEXT)
+            self.name, self.parent = name, parent
+            self.attributes, self.status, self.ended = {}, None, False
+
+        def set_attribute(self, key, value):
+            self.attributes[key] = value
+
+        def set_status(self, status, description=None):
+            self.status = status
+
+        def end(self, end_time=None):
+            self.ended = True
+
+    return RecordedSpan()
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("opentelemetry") is None,
+    reason="needs the otel extra",
+)
+def test_opentelemetry_adapter_mirrors_nesting_and_attributes():
+    tracer = RecordingTracer()
+    tracing.set_processor(tracing.OpenTelemetryProcessor(tracer))
+    try:
+        with tracing.span("outer", nodes=3):
+            with pytest.raises(KeyError):
+                with tracing.span("inner", ids=["a"]):
+                    raise KeyError("a")
+    finally:
+        tracing.set_processor(None)
+
+    outer, inner = tracer.spans
+    assert outer.parent is None and inner.parent is outer
+    assert outer.attributes == {"nodes": 3} and inner.attributes["ids"] == "['a']"
+    assert inner.status is not None and outer.status is None
+    assert outer.ended and inner.ended
@@ -0,0 +1,147 @@
+"""Tests for the stdio transport that measures and limits messages."""
+
+import io
+import json
+import os
+import sys
+
+import anyio
+import pytest
+from mcp import types
+from mcp.client.session import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.shared.exceptions import McpError
+
+from jsoncanvas.transport import RawMessage, message_size, stdio_server
+
+
+def _request(request_id, method="ping", params=None):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+    if params is not None:
+        message["params"] = params
+    return json.dumps(message).encode("utf-8")
+
+
+class _Headers:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_message_size_reads_the_transport_size():
+    assert message_size(RawMessage(42)) == 42
+    assert message_size(_Headers({"content-length": "17"})) == 17
+    assert message_size(_Headers({})) is None  # chunked HTTP body
+    assert message_size(None) is None  # in-memory session
+
+
+async def test_stdio_server_attaches_message_sizes():
+    lines = [_request(1), b"not json", _request(2, params={"x": "é"})]
+    stdin = anyio.wrap_file(io.BytesIO(b"\n".join(lines) + b"\n"))
+    stdout = anyio.wrap_file(io.BytesIO())
+    async with stdio_server(stdin, stdout) as (read_stream, write_stream):
+        first = await read_stream.receive()
+        assert first.message.root.id == 1
+        assert first.metadata.request_context == RawMessage(len(lines[0]))
+        assert isinstance(await read_stream.receive(), Exception)
+        third = await read_stream.receive()
+        assert third.metadata.request_context.size == len(lines[2])
+        await write_stream.aclose()
+
+
+async def test_stdio_tool_calls_count_request_bytes(tmp_path):
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "jsoncanvas.server"],
+        env={**os.environ, "OUTPUT_PATH": str(tmp_path)},
+    )
+    with open(os.devnull, "w") as devnull:
+        async with (
+            stdio_client(params, errlog=devnull) as (read, write),
+            ClientSession(read, write) as client,
+        ):
+            await client.initialize()
+            await client.call_tool("list_canvases", {})
+            metrics = await client.read_resource("canvas://metrics")
+    (content,) = metrics.contents
+    assert isinstance(content, types.TextResourceContents)
+    (line,) = [
+        line
+        for line in content.text.splitlines()
+        if line.startswith("jsoncanvas_payload_bytes_total")
+        and 'direction="in"' in line
+    ]
+    assert float(line.rsplit(" ", 1)[1]) > 0
+
+
+async def _messages(data, max_bytes):
+    stdin = anyio.wrap_file(io.BytesIO(data))
+    stdout = io.BytesIO()
+    received = []
+    async with stdio_server(stdin, anyio.wrap_file(stdout), lambda: max_bytes) as (
+        read_stream,
+        write_stream,
+    ):
+        async with read_stream:
+            async for message in read_stream:
+                received.append(message)
+        await write_stream.aclose()
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    return received, replies
+
+
+async def test_oversized_lines_are_refused_before_parsing():
+    big = _request(7, "tools/call", {"name": "x", "arguments": {"t": "x" * 200_000}})
+    # The Python SDK writes the id last.
+    trailing = b'{"method": "ping", "params": {"t": "%s"}, "jsonrpc": "2.0", "id": "r"}'
+    trailing %= b"y" * 100_000
+    # An id in a nested object is not the request's.
+    nested = b'{"method": "ping", "params": {"nodes": [{"id": "a", "t": "zzzz"}]}}'
+    received, replies = await _messages(
+        b"\n".join([big, trailing, nested, _request(9)]) + b"\n", max_bytes=60
+    )
+    # Only the small request reaches the server.
+    assert [m.message.root.id for m in received] == [9]
+    assert [reply["id"] for reply in replies] == [7, "r", None]
+    error = replies[0]["error"]
+    assert error["code"] == types.INVALID_REQUEST
+    assert error["data"] == {
+        "limit": "max_request_bytes",
+        "max": 60,
+        "actual": len(big),
+    }
+
+
+async def test_line_sizes_are_counted_across_reads():
+    line = _request(1, params={"t": "x" * 200_000})
+    received, replies = await _messages(line + b"\r\n" + _request(2), max_bytes=0)
+    assert [m.metadata.request_context.size for m in received] == [
+        len(line) + 1,  # the \r is on the wire too
+        len(_request(2)),
+    ]
+    assert replies == []
+
+
+async def test_stdio_oversized_tool_call_gets_an_error(tmp_path):
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "jsoncanvas.server"],
+        env={
+            **os.environ,
+            "OUTPUT_PATH": str(tmp_path),
+            "MCP_MAX_REQUEST_BYTES": "4096",
+        },
+    )
+    with open(os.devnull, "w") as devnull:
+        async with (
+            stdio_client(params, errlog=devnull) as (read, write),
+            ClientSession(read, write) as client,
+        ):
+            await client.initialize()
+            with pytest.raises(McpError) as info:
+                await client.call_tool(
+                    "validate_canvas", {"canvas": {"nodes": [], "pad": "x" * 5000}}
+                )
+            assert info.value.error.code == types.INVALID_REQUEST
+            # The session keeps working.
+            assert (await client.call_tool("list_canvases", {})).isError is False
+    assert not list(tmp_path.iterdir())
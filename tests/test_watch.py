@@ -0,0 +1,101 @@
+"""Tests for the canvas directory watcher."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from jsoncanvas.watch import CanvasWatcher
+
+
+class _Recorder:
+    def __init__(self):
+        self.batches: list[set[str]] = []
+        self._event = threading.Event()
+
+    def __call__(self, names):
+        self.batches.append(set(names))
+        self._event.set()
+
+    def wait(self, timeout=5.0):
+        assert self._event.wait(timeout), "watcher did not report a change"
+        self._event.clear()
+
+    @property
+    def names(self):
+        return set().union(*self.batches)
+
+
+@pytest.fixture(params=["poll", "inotify"])
+def watcher(request, tmp_path):
+    recorder = _Recorder()
+    try:
+        watcher = CanvasWatcher(
+            tmp_path, recorder, debounce=0.1, poll_interval=0.05, backend=request.param
+        ).start()
+    except OSError:
+        pytest.skip("inotify is not available here")
+    yield watcher, recorder
+    watcher.stop()
+
+
+def test_reports_create_modify_and_delete(watcher, tmp_path):
+    watcher, recorder = watcher
+    target = tmp_path / "a.canvas"
+    target.write_text("{}")
+    recorder.wait()
+    assert recorder.names == {"a.canvas"}
+
+    recorder.batches.clear()
+    time.sleep(0.02)  # let the mtime move on coarse-clock filesystems
+    target.write_text('{"nodes": []}')
+    recorder.wait()
+    assert recorder.names == {"a.canvas"}
+
+    recorder.batches.clear()
+    target.unlink()
+    recorder.wait()
+    assert recorder.names == {"a.canvas"}
+
+
+def test_coalesces_bursts_and_ignores_other_files(watcher, tmp_path):
+    watcher, recorder = watcher
+    for i in range(20):
+        (tmp_path / f"n{i % 4}.canvas").write_text(str(i))
+        (tmp_path / "notes.md").write_text(str(i))
+    # An atomic write (temp file + rename) reports only the final name.
+    (tmp_path / ".x.canvas.tmp").write_text("{}")
+    os.replace(tmp_path / ".x.canvas.tmp", tmp_path / "x.canvas")
+    recorder.wait()
+    time.sleep(0.3)
+    assert recorder.names == {
+        "n0.canvas",
+        "n1.canvas",
+        "n2.canvas",
+        "n3.canvas",
+        "x.canvas",
+    }
+    assert len(recorder.batches) < 5  # 41 writes delivered in a few batches
+
+
+def test_failing_callback_does_not_stop_the_watcher(tmp_path):
+    calls = []
+
+    def callback(names):
+        calls.append(names)
+        raise RuntimeError("boom")
+
+    watcher = CanvasWatcher(tmp_path, callback, debounce=0.05, poll_interval=0.05)
+    watcher.start()
+    try:
+        (tmp_path / "a.canvas").write_text("1")
+        deadline = time.monotonic() + 5
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.02)
+        (tmp_path / "b.canvas").write_text("2")
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        watcher.stop()
+    assert len(calls) == 2
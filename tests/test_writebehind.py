@@ -0,0 +1,108 @@
+"""Tests for the write-behind canvas buffer."""
+
+import os
+import time
+
+import pytest
+
+from jsoncanvas.writebehind import WriteBehindBuffer
+
+
+class Disk:
+    """A ``write`` callback that records and performs each file write."""
+
+    def __init__(self, fail=False):
+        self.writes = []
+        self.fail = fail
+
+    def __call__(self, path, raw, version):
+        if self.fail:
+            raise OSError("disk full")
+        path.write_bytes(raw)
+        self.writes.append((path.name, raw))
+
+
+@pytest.fixture
+def disk():
+    return Disk()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_burst_of_writes_is_flushed_once(tmp_path, disk):
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=0.05).start()
+    try:
+        for i in range(20):
+            buffer.put("a.canvas", b"v%d" % i, f"v{i}")
+            assert buffer.get("a.canvas") == b"v%d" % i
+        assert not (tmp_path / "a.canvas").exists()
+        assert buffer.pending() == {"a.canvas"}
+
+        _wait_for(lambda: not buffer.pending())
+        assert disk.writes == [("a.canvas", b"v19")]
+        assert buffer.get("a.canvas") == b"v19"
+    finally:
+        buffer.close()
+
+
+def test_continuous_writes_are_flushed_after_max_delay(tmp_path, disk):
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=0.2, max_delay=0.3).start()
+    try:
+        deadline = time.monotonic() + 1.0
+        i = 0
+        while time.monotonic() < deadline and not disk.writes:
+            buffer.put("a.canvas", b"%d" % i, str(i))
+            i += 1
+            time.sleep(0.01)
+        assert disk.writes, "never flushed during a continuous burst"
+    finally:
+        buffer.close()
+
+
+def test_close_flushes_pending_writes(tmp_path, disk):
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=60).start()
+    buffer.put("a.canvas", b"a", "a")
+    buffer.put("b.canvas", b"b", "b")
+    buffer.close()
+    assert sorted(disk.writes) == [("a.canvas", b"a"), ("b.canvas", b"b")]
+
+
+def test_memory_pressure_flushes_and_evicts_oldest(tmp_path, disk):
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=60, max_bytes=10)
+    buffer.put("a.canvas", b"aaaaaa", "a")
+    buffer.put("b.canvas", b"bbbbbb", "b")
+    assert disk.writes == [("a.canvas", b"aaaaaa")]
+    assert buffer.names() == {"b.canvas"}
+    assert buffer.pending() == {"b.canvas"}
+
+
+def test_failed_flush_keeps_the_canvas(tmp_path, capsys):
+    disk = Disk(fail=True)
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=60, max_bytes=10)
+    buffer.put("a.canvas", b"aaaaaa", "a")
+    buffer.put("b.canvas", b"bbbbbb", "b")
+    assert buffer.get("a.canvas") == b"aaaaaa"
+    assert buffer.pending() == {"a.canvas", "b.canvas"}
+    assert "disk full" in capsys.readouterr().err
+
+    disk.fail = False
+    buffer.flush()
+    assert not buffer.pending()
+
+
+def test_flushed_entry_is_dropped_when_the_file_changes(tmp_path, disk):
+    buffer = WriteBehindBuffer(tmp_path, disk, interval=60)
+    buffer.put("a.canvas", b"ours", "ours")
+    buffer.flush()
+    assert buffer.get("a.canvas") == b"ours"
+
+    path = tmp_path / "a.canvas"
+    path.write_bytes(b"theirs!")
+    os.utime(path, ns=(1, 1))
+    assert buffer.get("a.canvas") is None
+    assert buffer.names() == set()